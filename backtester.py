@@ -0,0 +1,270 @@
+## File: backtester.py
+"""
+Event-driven backtest of the live strategy on historical OHLCV.
+
+Entries use the same model features, signal mapping, position sizer and
+bracket SL/TP as EntryManager; open positions are managed bar by bar with
+exit_strat.should_exit and update_trailing_levels as PositionManager does,
+against a simple fill engine. Output is a trades CSV (and SL/TP update log)
+in the TradeLogger layout, so calc_perf-style analysis works unchanged.
+
+    python backtester.py --data ./history --timeframe 5m --workers 8
+
+Bars are read from <data>/<SYMBOL>_<timeframe>.csv with columns timestamp
+(ms), open, high, low, close, volume - the replay_server layout.
+
+Simplifications against live trading:
+  * one position per symbol, sized from that symbol's own running balance
+    (symbols are simulated independently, in parallel processes)
+  * entries and management run on the same bars (live manages on 3m)
+  * a signal on bar t fills at bar t+1's open plus slippage; SL/TP levels
+    are computed from bar t's close, as live does from the last price
+  * SL and TP are checked against each bar's low/high; a bar touching both
+    is counted as a stop-out, and a gap through a level fills at the open
+  * trailing levels set on a bar's close take effect from the next bar
+"""
+
+import argparse
+import contextlib
+import io
+import logging
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from config_setup import TIMEFRAME, ADVERSE_CLOSE_EXIT
+from data_and_indicators import compute_indicators
+from feature_pipeline import FEATURES, compute_features
+from position_sizer import calculate_position_size
+from order_execution import bracket_levels
+from exit_strat import update_trailing_levels, should_exit
+from trade_store import TRADE_COLUMNS, SL_TP_COLUMNS
+from trade_logger import performance
+import hybrid_signal
+
+logger = logging.getLogger(__name__)
+
+FEE_BPS = 5.5       # taker fee per side
+SLIPPAGE_BPS = 2.0  # adverse slippage on every market fill
+SCORE_CHUNK = 100_000  # feature rows per predict_proba call
+ATR_14 = FEATURES.index('atr_14')
+
+
+def load_bars(data_dir, symbol, timeframe=TIMEFRAME):
+    """(timestamps ms, OHLCV rows) for one symbol, sorted and de-duplicated."""
+    df = pd.read_csv(os.path.join(data_dir, f'{symbol}_{timeframe}.csv'),
+                     usecols=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+    df = df.drop_duplicates('timestamp').sort_values('timestamp')
+    return (df['timestamp'].to_numpy(dtype=np.int64),
+            df[['open', 'high', 'low', 'close', 'volume']].to_numpy(dtype=float))
+
+
+def score(ts, values, timeframe=TIMEFRAME):
+    """Model class, confidence and entry ATR for every bar, in large batches."""
+    features = compute_features(ts, values, timeframe)
+    preds = np.empty(len(features), dtype=object)
+    confidence = np.zeros(len(features))
+    for start in range(0, len(features), SCORE_CHUNK):
+        chunk = slice(start, start + SCORE_CHUNK)
+        preds[chunk], confidence[chunk] = hybrid_signal.score_features(features[chunk])
+    return preds, confidence, features[:, ATR_14]
+
+
+def _iso(ts):
+    """ISO strings (as datetime.isoformat writes them) for an array of ms timestamps."""
+    return np.datetime_as_string(np.asarray(ts, dtype='datetime64[ms]'), unit='s')
+
+
+def simulate(symbol, ts, values, preds, confidence, entry_atr,
+             balance=1000.0, fee_bps=FEE_BPS, slippage_bps=SLIPPAGE_BPS):
+    """
+    Walk the bars of one symbol and return (trades, sl_tp_updates) as lists
+    of dicts in the TRADE_COLUMNS / SL_TP_COLUMNS layouts.
+    """
+    open_, high, low, close, volume = values.T
+    index = pd.DatetimeIndex(pd.to_datetime(ts, unit='ms'))
+    ind = compute_indicators(pd.DataFrame(
+        {'open': open_, 'high': high, 'low': low, 'close': close, 'volume': volume}, index=index))
+    # Bars where the live mapping would produce a signal; flat stretches are skipped
+    candidates = np.flatnonzero(np.isin(preds, (0, 2)) & (confidence > 0))
+
+    # The bar loop runs on plain floats; numpy scalars are several times slower
+    atr = ind['atr'].tolist()
+    ema_fast = ind['ema_fast'].tolist()
+    ema_slow = ind['ema_slow'].tolist()
+    dif, dea = ind['dif'].tolist(), ind['dea'].tolist()
+    confidence = confidence.tolist()
+    entry_atr = entry_atr.tolist()
+    open_, high, low, close = (col.tolist() for col in (open_, high, low, close))
+
+    fee = fee_bps / 1e4
+    slip = slippage_bps / 1e4
+    n = len(close)
+    trades, updates = [], []
+    t = 0
+    while True:
+        k = np.searchsorted(candidates, t)
+        if k >= len(candidates) or candidates[k] + 1 >= n:
+            break
+        t = candidates[k]
+        signal, conf = hybrid_signal._to_signal(preds[t], confidence[t])
+        a = entry_atr[t]
+        if not signal or not conf or not math.isfinite(a) or a <= 0:
+            t += 1
+            continue
+        side = 'buy' if 'buy' in signal else 'sell'
+        price = close[t]
+        size = calculate_position_size(balance, conf, price, a)
+        levels = bracket_levels(side, price, a)
+        if size <= 0 or levels is None:
+            t += 1
+            continue
+        sl, tp = levels
+        direction = 1 if side == 'buy' else -1
+        pos_side = 'long' if side == 'buy' else 'short'
+        order_id = f'bt-{symbol}-{len(trades) + 1}'
+        entry = open_[t + 1] * (1 + direction * slip)
+
+        exit_price = close_type = None
+        j = t + 1
+        while j < n:
+            # Intrabar: stop first when a bar touches both levels
+            if direction == 1:
+                if low[j] <= sl:
+                    exit_price, close_type = min(open_[j], sl), 'stop_loss'
+                elif high[j] >= tp:
+                    exit_price, close_type = max(open_[j], tp), 'take_profit'
+            else:
+                if high[j] >= sl:
+                    exit_price, close_type = max(open_[j], sl), 'stop_loss'
+                elif low[j] <= tp:
+                    exit_price, close_type = min(open_[j], tp), 'take_profit'
+            if exit_price is not None:
+                break
+            # On the close: exit rule, then trail the levels
+            if j + 1 >= ADVERSE_CLOSE_EXIT and should_exit(
+                    pos_side, close[j + 1 - ADVERSE_CLOSE_EXIT:j + 1],
+                    dif[j + 1 - ADVERSE_CLOSE_EXIT:j + 1], dea[j + 1 - ADVERSE_CLOSE_EXIT:j + 1],
+                    ema_fast[j + 1 - ADVERSE_CLOSE_EXIT:j + 1], ema_slow[j + 1 - ADVERSE_CLOSE_EXIT:j + 1]):
+                exit_price, close_type = close[j], 'manual'
+                break
+            if math.isfinite(atr[j]):
+                new_sl, new_tp = update_trailing_levels(
+                    side=pos_side, close=close[j], prev_sl=sl, prev_tp=tp,
+                    mark_price=close[j], atr=atr[j], ema=ema_fast[j])
+                threshold = close[j] * 0.000000005
+                if abs(new_sl - sl) > threshold or abs(new_tp - tp) > threshold:
+                    updates.append({'order_id': order_id, 'timestamp': ts[j],
+                                    'old_sl': sl, 'new_sl': new_sl, 'old_tp': tp, 'new_tp': new_tp})
+                    sl, tp = new_sl, new_tp
+            j += 1
+        if exit_price is None:
+            j = n - 1
+            exit_price, close_type = close[j], 'end_of_data'
+        exit_price *= (1 - direction * slip)
+
+        pnl = size * (exit_price - entry) * direction - size * (entry + exit_price) * fee
+        balance += pnl
+        trades.append({
+            'order_id': order_id,
+            'entry_time': ts[t + 1],
+            'exit_time': ts[j],
+            'symbol': symbol,
+            'side': side,
+            'size': size,
+            'entry_price': entry,
+            'exit_price': exit_price,
+            'pnl': pnl,
+            'duration': (ts[j] - ts[t + 1]) / 3_600_000,
+            'atr': a,
+            'rr_ratio': abs(pnl) / (a * size),
+            'confidence': conf,
+            'close_type': close_type,
+        })
+        t = j + 1
+
+    for records, columns in ((trades, ('entry_time', 'exit_time')), (updates, ('timestamp',))):
+        for col in columns:
+            for record, iso in zip(records, _iso([r[col] for r in records])):
+                record[col] = str(iso)
+    return trades, updates
+
+
+def run_symbol(data_dir, symbol, timeframe=TIMEFRAME, balance=1000.0,
+               fee_bps=FEE_BPS, slippage_bps=SLIPPAGE_BPS):
+    """Load, score and simulate one symbol; safe to run in a worker process."""
+    ts, values = load_bars(data_dir, symbol, timeframe)
+    preds, confidence, entry_atr = score(ts, values, timeframe)
+    # exit_strat prints whenever it clamps a level; keep the console readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        trades, updates = simulate(symbol, ts, values, preds, confidence, entry_atr,
+                                   balance, fee_bps, slippage_bps)
+    return symbol, len(ts), trades, updates
+
+
+def _init_worker(model_path):
+    # Parallelism comes from the process pool; one model thread per worker
+    # avoids every worker's OpenMP pool competing for all cores
+    os.environ['OMP_NUM_THREADS'] = '1'
+    if model_path:
+        hybrid_signal.registry.path = model_path
+
+
+def symbols_in(data_dir, timeframe=TIMEFRAME):
+    suffix = f'_{timeframe}.csv'
+    return sorted(name[:-len(suffix)] for name in os.listdir(data_dir) if name.endswith(suffix))
+
+
+def run(data_dir, symbols=None, timeframe=TIMEFRAME, balance=1000.0, workers=None,
+        fee_bps=FEE_BPS, slippage_bps=SLIPPAGE_BPS, model_path=None):
+    """Backtest `symbols` across worker processes; returns (trades, updates) frames."""
+    symbols = symbols or symbols_in(data_dir, timeframe)
+    trades, updates, bars = [], [], 0
+    started = time.perf_counter()
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(model_path,)) as pool:
+        futures = [pool.submit(run_symbol, data_dir, s, timeframe, balance, fee_bps, slippage_bps)
+                   for s in symbols]
+        for future in futures:
+            try:
+                symbol, n, sym_trades, sym_updates = future.result()
+            except Exception as e:
+                logger.error(f"Backtest failed: {e}")
+                continue
+            bars += n
+            trades.extend(sym_trades)
+            updates.extend(sym_updates)
+    elapsed = time.perf_counter() - started
+    logger.info(f"Backtest: {len(symbols)} symbols, {bars} bars, {len(trades)} trades "
+                f"in {elapsed:.1f}s ({bars / max(elapsed, 1e-9):,.0f} bars/s)")
+    trades = pd.DataFrame(trades, columns=TRADE_COLUMNS).sort_values('entry_time', kind='stable')
+    return trades.reset_index(drop=True), pd.DataFrame(updates, columns=SL_TP_COLUMNS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backtest the live strategy on historical bars.')
+    parser.add_argument('--data', required=True, help='directory of <SYMBOL>_<timeframe>.csv files')
+    parser.add_argument('--timeframe', default=TIMEFRAME)
+    parser.add_argument('--symbols', nargs='*', help='default: every symbol found in --data')
+    parser.add_argument('--balance', type=float, default=1000.0, help='starting balance per symbol')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--fee-bps', type=float, default=FEE_BPS)
+    parser.add_argument('--slippage-bps', type=float, default=SLIPPAGE_BPS)
+    parser.add_argument('--model', help='model artifact (default: MODEL_PATH / newest in MODEL_DIR)')
+    parser.add_argument('--out', default='logs/backtest_trades.csv')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s:%(message)s')
+    trades, updates = run(args.data, args.symbols, args.timeframe, args.balance, args.workers,
+                          args.fee_bps, args.slippage_bps, args.model)
+    os.makedirs(os.path.dirname(args.out) or '.', exist_ok=True)
+    trades.to_csv(args.out, index=False)
+    updates.to_csv(os.path.splitext(args.out)[0] + '_sl_tp_updates.csv', index=False)
+    n_symbols = trades['symbol'].nunique() or 1
+    print(f"{len(trades)} trades -> {args.out}")
+    print(performance(trades, args.balance * n_symbols))
+
+
+if __name__ == '__main__':
+    main()
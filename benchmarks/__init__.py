@@ -0,0 +1,12 @@
+## File: benchmarks/__init__.py
+"""
+Micro-benchmarks for the bot's hot path, on synthetic data.
+
+    python -m benchmarks.run                    # run and compare to baseline.json
+    python -m benchmarks.run --save             # record a new baseline
+    python -m benchmarks.run -k indicators      # only cases whose name contains 'indicators'
+
+A case regresses when its best per-call time exceeds the baseline by more
+than --threshold (default 25%); the run then exits non-zero. Baselines are
+machine-specific: record one on the machine that runs the comparison.
+"""
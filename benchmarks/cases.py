@@ -0,0 +1,195 @@
+## File: benchmarks/cases.py
+"""
+Benchmark cases. Each case's setup runs (untimed) in its own scratch
+directory and returns the zero-argument callable that is timed; `max_calls`
+caps cases that consume state (e.g. closing one open trade per call).
+"""
+
+import itertools
+import os
+import subprocess
+import sys
+from benchmarks import synthetic
+
+CASES = {}
+
+
+def case(name, max_calls=None):
+    def register(setup):
+        CASES[name] = (setup, max_calls)
+        return setup
+    return register
+
+
+# ----------------------------------------------------------------------
+# Market data and indicators
+# ----------------------------------------------------------------------
+class _BarsExchange:
+    """Just enough exchange for fetch_ohlcv: returns pre-built bars."""
+
+    def __init__(self, n):
+        self._bars = synthetic.bars(n)
+
+    def fetch_ohlcv(self, symbol, timeframe=None, since=None, limit=None):
+        return self._bars
+
+
+def _fetch_ohlcv(n):
+    from data_and_indicators import fetch_ohlcv
+    exchange = _BarsExchange(n)
+    return lambda: fetch_ohlcv(exchange, 'SYM000USDT', limit=n)
+
+
+def _compute_indicators(n):
+    from data_and_indicators import compute_indicators
+    df = synthetic.ohlcv_frame(n)
+    # compute_indicators adds columns in place; each call starts from raw OHLCV
+    return lambda: compute_indicators(df.copy())
+
+
+for _n in (300, 1000):
+    case(f'fetch_ohlcv_frame[{_n}]')(lambda n=_n: _fetch_ohlcv(n))
+for _n in (100, 300, 1000, 5000):
+    case(f'compute_indicators[{_n}]')(lambda n=_n: _compute_indicators(n))
+
+
+# ----------------------------------------------------------------------
+# Signal model
+# ----------------------------------------------------------------------
+_model_paths = {}
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _artifact(flat=False):
+    """A synthetic model trained once per run, pickled or exported as a flat .npz."""
+    if not _model_paths:
+        from feature_pipeline import FEATURES
+        from model_training import export_trees
+        path = synthetic.train_model(os.path.join(os.getcwd(), 'model.pkl'))
+        _model_paths['pickle'] = path
+        _model_paths['flat'] = os.path.splitext(path)[0] + '.npz'
+        import joblib
+        export_trees(joblib.load(path), _model_paths['flat'], FEATURES,
+                     synthetic.features(1300).dropna().to_numpy())
+    return _model_paths['flat' if flat else 'pickle']
+
+
+def _registry(flat=False):
+    """The live registry, serving the synthetic model."""
+    import hybrid_signal
+    hybrid_signal.registry.path = _artifact(flat)
+    hybrid_signal.registry.refresh()
+    hybrid_signal.registry.get()
+    return hybrid_signal
+
+
+def _generate_signal(flat):
+    hybrid_signal = _registry(flat)
+    df = synthetic.features(300)
+    return lambda: hybrid_signal.generate_signal(df)
+
+
+def _generate_signals(n, flat):
+    hybrid_signal = _registry(flat)
+    matrix = synthetic.features(n + 300).to_numpy()[300:]
+    frames = {f'SYM{i:03d}USDT': row for i, row in enumerate(matrix)}
+    return lambda: hybrid_signal.generate_signals(frames)
+
+
+def _startup(flat):
+    """A fresh interpreter importing hybrid_signal and scoring one row."""
+    env = {**os.environ, 'PYTHONPATH': REPO, 'MODEL_PATH': _artifact(flat)}
+    script = ('import numpy as np, hybrid_signal; '
+              'hybrid_signal.score_features(np.zeros((1, len(hybrid_signal.FEATURES))))')
+    return lambda: subprocess.run([sys.executable, '-c', script], env=env, check=True)
+
+
+for _flat, _label in ((False, ''), (True, ',flat')):
+    case(f'generate_signal[single{_label}]')(lambda f=_flat: _generate_signal(f))
+    for _n in (50, 500):
+        case(f'generate_signals[batch={_n}{_label}]')(lambda n=_n, f=_flat: _generate_signals(n, f))
+    case(f'signal_startup[{_label[1:] or "pickle"}]')(lambda f=_flat: _startup(f))
+
+
+# ----------------------------------------------------------------------
+# Exit logic
+# ----------------------------------------------------------------------
+@case('update_trailing_levels')
+def _update_trailing_levels():
+    from exit_strat import update_trailing_levels
+
+    # Levels that trail without hitting the mark-price clamps (which print)
+    def call():
+        update_trailing_levels('long', 100.0, 95.0, 110.0, 100.0, 1.0, 97.0)
+        update_trailing_levels('short', 100.0, 105.0, 90.0, 100.0, 1.0, 103.0)
+    return call
+
+
+@case('should_exit')
+def _should_exit():
+    from data_and_indicators import compute_indicators
+    from exit_strat import should_exit
+    df = compute_indicators(synthetic.ohlcv_frame(300))
+    arrays = {k: df[c].to_numpy() for k, c in (('closes', 'close'), ('macd', 'dif'), ('macd_signal', 'dea'),
+                                                ('ema_fast', 'ema_fast'), ('ema_slow', 'ema_slow'))}
+
+    def call():
+        should_exit('long', **arrays)
+        should_exit('short', **arrays)
+    return call
+
+
+def _exit_bars(positions, panel):
+    """PositionManager's indicator stage for `positions` symbols' cached 3m bars."""
+    from ohlcv_cache import OHLCVCache
+    from position_manager import PositionManager
+    cache = OHLCVCache(base_timeframe=None)
+    frames = {}
+    for i in range(positions):
+        symbol = f'SYM{i:03d}USDT'
+        cache.merge(symbol, '3m', synthetic.bars(300, seed=i))
+        frames[symbol] = cache.buffer(symbol, '3m').frame()
+    # exit_bars touches neither the trade log nor the exchange snapshot
+    manager = PositionManager(None, ohlcv=cache, trade_logger=object(), snapshot=object())
+    manager.exit_bars(frames, panel)  # seeds the incremental engine
+    return lambda: manager.exit_bars(frames, panel)
+
+
+for _n in (5, 100, 400):
+    for _panel in (False, True):
+        case(f'exit_bars[positions={_n},{"panel" if _panel else "engine"}]')(
+            lambda n=_n, p=_panel: _exit_bars(n, p))
+
+
+# ----------------------------------------------------------------------
+# Trade log
+# ----------------------------------------------------------------------
+OPEN_TRADES = 500
+
+
+def _trade_logger(store, rows):
+    """A TradeLogger over `rows` synthetic trades in the current directory."""
+    import trade_logger
+    trades = synthetic.write_trades(trade_logger.filename, rows, OPEN_TRADES)
+    return trade_logger.TradeLogger(None, 1000.0, store=store), trades
+
+
+def _update_trade_exit(store, rows):
+    logger, trades = _trade_logger(store, rows)
+    open_ids = iter(trades['order_id'].iloc[-OPEN_TRADES:].tolist())
+    return lambda: logger.update_trade_exit(next(open_ids), 101.0, 'take_profit')
+
+
+def _open_trade_by_symbol(store, rows):
+    logger, trades = _trade_logger(store, rows)
+    symbols = trades['symbol'].iloc[-OPEN_TRADES:].unique().tolist()
+    cycle = itertools.cycle(symbols)
+    return lambda: logger.get_open_trade_by_symbol(next(cycle))
+
+
+for _store in ('sqlite', 'csv'):
+    for _rows, _label in ((1_000, '1k'), (100_000, '100k')):
+        case(f'update_trade_exit[{_store},{_label}]', max_calls=OPEN_TRADES)(
+            lambda s=_store, r=_rows: _update_trade_exit(s, r))
+        case(f'get_open_trade_by_symbol[{_store},{_label}]')(
+            lambda s=_store, r=_rows: _open_trade_by_symbol(s, r))
@@ -0,0 +1,134 @@
+## File: benchmarks/run.py
+"""Run the benchmark cases and compare them with the stored baseline."""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from benchmarks.cases import CASES
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+THRESHOLD = 0.25  # fractional slowdown of the best time that counts as a regression
+REPEAT = 5
+MIN_TIME = 0.2    # seconds per repeat
+
+
+def measure(fn, repeat=REPEAT, min_time=MIN_TIME, max_calls=None):
+    """Best and median seconds per call over `repeat` timed batches."""
+    t0 = time.perf_counter()
+    fn()  # warm-up, also sizes the batches
+    single = max(time.perf_counter() - t0, 1e-9)
+    number = max(1, int(min_time / single))
+    if max_calls:
+        number = max(1, min(number, (max_calls - 1) // repeat))
+    per_call = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        per_call.append((time.perf_counter() - t0) / number)
+    return {'best': min(per_call), 'median': statistics.median(per_call), 'calls': number * repeat}
+
+
+def run(names, repeat=REPEAT, min_time=MIN_TIME):
+    results = {}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='bench_') as root:
+        for name in names:
+            setup, max_calls = CASES[name]
+            workdir = os.path.join(root, str(len(results)))
+            os.makedirs(workdir)
+            os.chdir(workdir)
+            try:
+                # Silence the prints inside the code under test
+                with contextlib.redirect_stdout(io.StringIO()):
+                    fn = setup()
+                    results[name] = measure(fn, repeat, min_time, max_calls)
+            finally:
+                os.chdir(cwd)
+            print(f"  {name:<42} {_fmt(results[name]['best'])}", file=sys.stderr)
+    return results
+
+
+def _fmt(seconds):
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f'{seconds / scale:8.2f} {unit}'
+    return f'{seconds / 1e-9:8.0f} ns'
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+    """Print a comparison table; returns the names that regressed."""
+    regressions = []
+    print(f"{'case':<42} {'best':>11} {'median':>11} {'baseline':>11} {'change':>8}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            change, flag = '', 'new'
+        else:
+            ratio = result['best'] / base['best'] - 1
+            change = f'{ratio:+7.0%}'
+            flag = 'REGRESSION' if ratio > threshold else ''
+            if flag:
+                regressions.append(name)
+        print(f"{name:<42} {_fmt(result['best']):>11} {_fmt(result['median']):>11} "
+              f"{_fmt(base['best']) if base else '':>11} {change:>8} {flag}")
+    return regressions
+
+
+def load_baseline(path=BASELINE):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)['results']
+
+
+def save_baseline(results, path=BASELINE, merge=True):
+    stored = load_baseline(path) if merge else {}
+    stored.update(results)
+    with open(path, 'w') as f:
+        json.dump({
+            'recorded': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'machine': {'python': platform.python_version(), 'platform': platform.platform(),
+                        'processor': platform.processor(), 'cpus': os.cpu_count()},
+            'results': dict(sorted(stored.items())),
+        }, f, indent=2)
+        f.write('\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Hot-path benchmarks with regression gates.')
+    parser.add_argument('-k', dest='pattern', default='', help='only cases whose name contains this')
+    parser.add_argument('--list', action='store_true', help='list the cases and exit')
+    parser.add_argument('--save', action='store_true', help='store the results as the new baseline')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help='allowed slowdown before a case fails (0.25 = 25%%)')
+    parser.add_argument('--repeat', type=int, default=REPEAT)
+    parser.add_argument('--min-time', type=float, default=MIN_TIME, help='seconds per repeat')
+    args = parser.parse_args()
+
+    names = [name for name in CASES if args.pattern in name]
+    if args.list:
+        print('\n'.join(names))
+        return
+    results = run(names, args.repeat, args.min_time)
+    regressions = compare(results, load_baseline(args.baseline), args.threshold)
+    if args.save:
+        save_baseline(results, args.baseline)
+        print(f'Baseline written to {args.baseline}')
+    elif regressions:
+        print(f"{len(regressions)} case(s) slower than baseline by more than {args.threshold:.0%}: "
+              f"{', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+## File: benchmarks/synthetic.py
+"""Deterministic synthetic inputs for the benchmarks."""
+
+import os
+import joblib
+import numpy as np
+import pandas as pd
+from lightgbm import LGBMClassifier
+from feature_pipeline import feature_frame
+from trade_store import TRADE_COLUMNS
+
+SEED = 7
+START_MS = 1_700_000_000_000
+BAR_MS = 5 * 60_000
+
+
+def bars(n, seed=SEED):
+    """n OHLCV rows [timestamp_ms, open, high, low, close, volume] of a random walk."""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.004, n)))
+    open_ = np.concatenate([[100.0], close[:-1]])
+    spread = np.abs(rng.normal(0, 0.002, n)) * close
+    high = np.maximum(open_, close) + spread
+    low = np.minimum(open_, close) - spread
+    volume = rng.gamma(2.0, 500.0, n)
+    ts = START_MS + np.arange(n) * BAR_MS
+    return [[int(t), *map(float, row)] for t, row in zip(ts, np.column_stack([open_, high, low, close, volume]))]
+
+
+def ohlcv_frame(n, seed=SEED):
+    """bars() as the timestamp-indexed DataFrame fetch_ohlcv returns."""
+    df = pd.DataFrame(bars(n, seed), columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+    return df.set_index('timestamp')
+
+
+def features(n, seed=SEED):
+    """FEATURES frame for n synthetic bars."""
+    return feature_frame(ohlcv_frame(n, seed))
+
+
+def train_model(path, rows=5000, seed=SEED):
+    """Fit a 3-class LightGBM model on synthetic features and save it to `path`."""
+    X = features(rows, seed).dropna()
+    future = X['vwap'].shift(-12) / X['vwap'] - 1  # any deterministic target will do
+    y = np.select([future < -0.005, future > 0.005], [0, 2], 1)
+    model = LGBMClassifier(n_estimators=200, num_leaves=31, random_state=seed, verbose=-1)
+    model.fit(X, y)
+    joblib.dump(model, path)
+    return path
+
+
+def write_trades(path, rows, open_rows, symbols=200, seed=SEED):
+    """A trades CSV of `rows` trades, the last `open_rows` still open."""
+    rng = np.random.default_rng(seed)
+    entry = pd.Timestamp('2025-01-01') + pd.to_timedelta(np.arange(rows) * 60, unit='s')
+    closed = np.arange(rows) < rows - open_rows
+    price = rng.uniform(1, 1000, rows)
+    size = rng.uniform(0.1, 10, rows)
+    side = np.where(rng.random(rows) < 0.5, 'buy', 'sell')
+    exit_price = price * (1 + rng.normal(0, 0.01, rows))
+    pnl = size * (exit_price - price) * np.where(side == 'buy', 1, -1)
+    df = pd.DataFrame({
+        'order_id': [f'bench-{i}' for i in range(rows)],
+        'entry_time': entry.strftime('%Y-%m-%dT%H:%M:%S'),
+        'exit_time': np.where(closed, (entry + pd.Timedelta(hours=1)).strftime('%Y-%m-%dT%H:%M:%S'), None),
+        'symbol': [f'SYM{i % symbols:03d}USDT' for i in range(rows)],
+        'side': side, 'size': size, 'entry_price': price,
+        'exit_price': np.where(closed, exit_price, np.nan),
+        'pnl': np.where(closed, pnl, np.nan),
+        'duration': np.where(closed, 1.0, np.nan),
+        'atr': price * 0.01,
+        'rr_ratio': np.where(closed, np.abs(pnl) / (price * 0.01 * size), np.nan),
+        'confidence': rng.uniform(0.5, 1, rows),
+        'close_type': np.where(closed, 'take_profit', None),
+    })
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    df.reindex(columns=TRADE_COLUMNS).to_csv(path, index=False)
+    return df
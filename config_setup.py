@@ -11,6 +11,10 @@ EXCHANGE_ID = os.getenv("EXCHANGE_ID", "bybit")  # default to Bybit
 API_KEY = os.getenv("BYBIT_API_KEY")
 API_SECRET = os.getenv("BYBIT_API_SECRET")
 
+# Async HTTP connection pool shared by every exchange call
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", 32))  # max open connections
+HTTP_KEEPALIVE = float(os.getenv("HTTP_KEEPALIVE", 60))  # seconds an idle connection is kept
+
 # Trading parameters
 TIMEFRAME = os.getenv("TIMEFRAME", "5m") # prev 15m
 FETCH_LIMIT = int(os.getenv("FETCH_LIMIT", 300)) # prev 1000
@@ -46,11 +50,68 @@ ADVERSE_CLOSE_EXIT = 3    # Exit after 3 adverse closes
 # Scheduler parameters
 SYMBOL_CHECK_INTERVAL = int(os.getenv("SYMBOL_CHECK_INTERVAL", 10 * 60))  # 10 minutes
 
+# Multi-timeframe bars: one base series per symbol is fetched and every
+# larger multiple of it (3m, 5m, 15m, ...) is resampled locally. Empty = off.
+BASE_TIMEFRAME = os.getenv("BASE_TIMEFRAME", "1m")
+BASE_REFRESH = float(os.getenv("BASE_REFRESH", 2))  # seconds a fresh base series is reused
+
+# Exit checks: from this many open positions the indicators are computed for
+# all of them in one panel pass instead of incrementally per symbol
+PANEL_MIN_POSITIONS = int(os.getenv("PANEL_MIN_POSITIONS", 8))
+
+# Entry scan fan-out
+SCAN_CONCURRENCY = int(os.getenv("SCAN_CONCURRENCY", 16))  # symbols checked at once
+SCAN_TIMEOUT = float(os.getenv("SCAN_TIMEOUT", 10))  # seconds per symbol (data + signal)
+RATE_LIMIT_PER_SEC = float(os.getenv("RATE_LIMIT_PER_SEC", 0))  # 0 = derive from exchange.rateLimit
+
+# Account/market snapshot cache (balance, positions, tickers)
+SNAPSHOT_TTL = float(os.getenv("SNAPSHOT_TTL", 2))  # seconds a snapshot is served from cache
+
+# Market data feed ('rest' polls the exchange, 'ws' streams klines/tickers/positions)
+FEED_MODE = os.getenv("FEED_MODE", "rest")
+WS_PUBLIC_URL = os.getenv("WS_PUBLIC_URL", "wss://stream.bybit.com/v5/public/linear")
+WS_PRIVATE_URL = os.getenv("WS_PRIVATE_URL", "wss://stream-demo.bybit.com/v5/private")
+WS_PING_INTERVAL = int(os.getenv("WS_PING_INTERVAL", 20))  # seconds
+WS_MAX_BACKOFF = int(os.getenv("WS_MAX_BACKOFF", 60))  # seconds between reconnects
+
+# Closed-order reconciliation (only symbols with open trades are queried)
+RECONCILE_CONCURRENCY = int(os.getenv("RECONCILE_CONCURRENCY", 8))  # symbols fetched at once
+RECONCILE_ACCOUNT_WIDE = os.getenv("RECONCILE_ACCOUNT_WIDE", "false").lower() == "true"  # one query for all symbols
+RECONCILE_OVERLAP = int(os.getenv("RECONCILE_OVERLAP", 60))  # seconds re-read behind each cursor
+
+# Signal model: the bot serves (and hot-swaps to) the newest artifact in MODEL_DIR,
+# which only ever holds promoted models; a non-empty MODEL_PATH pins one file instead
+MODEL_DIR = os.getenv("MODEL_DIR", "models/live")
+MODEL_PATH = os.getenv("MODEL_PATH", "")
+MODEL_CANDIDATES_DIR = os.getenv("MODEL_CANDIDATES_DIR", "models/candidates")  # training output, never served
+MODEL_POLL_INTERVAL = int(os.getenv("MODEL_POLL_INTERVAL", 30))  # seconds between hot-swap checks
+
+# Simulated exchange (EXCHANGE_ID=sim), for offline load tests
+SIM_SYMBOLS = int(os.getenv("SIM_SYMBOLS", 500))
+SIM_POSITIONS = int(os.getenv("SIM_POSITIONS", 100))  # positions open at start
+SIM_BALANCE = float(os.getenv("SIM_BALANCE", 10000))
+SIM_LATENCY_MS = float(os.getenv("SIM_LATENCY_MS", 50))  # median per request
+SIM_RATE_LIMIT = float(os.getenv("SIM_RATE_LIMIT", 50))  # server-side requests/s, 0 = unlimited
+SIM_SEED = int(os.getenv("SIM_SEED", 42))
+
+# Local Prometheus-format metrics endpoint (port 0 disables it)
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", 9108))
+
+# Exchange traffic cassettes (see exchange_recorder.py)
+EXCHANGE_RECORD = os.getenv("EXCHANGE_RECORD", "")  # record every exchange call to this .jsonl.gz
+EXCHANGE_REPLAY = os.getenv("EXCHANGE_REPLAY", "")  # serve exchange calls from this cassette instead
+REPLAY_SPEED = float(os.getenv("REPLAY_SPEED", 1))  # 1 = recorded latency, 10 = 10x faster, 0 = none
+
 # File paths
 POSITIVE_CSV = os.getenv("POSITIVE_CSV", "../positive.csv")
 NEGATIVE_CSV = os.getenv("NEGATIVE_CSV", "../negative.csv")
 SELECTED_CSV = os.getenv("SELECTED_CSV", "../selected_symbols.csv")
 
+# Trade storage ('sqlite' indexed store, or 'csv' to keep the flat files)
+TRADE_STORE = os.getenv("TRADE_STORE", "sqlite")
+TRADE_DB = os.getenv("TRADE_DB", "logs/trades.db")
+
 # Logging
 LOG_FILE = os.getenv("LOG_FILE", "./logs/bot.log")
 
@@ -8,6 +8,7 @@ from config_setup import (
     ATR_PERIOD, TIMEFRAME, FETCH_LIMIT,
     EMA_SLOW, EMA_FAST
 )
+from indicator_engine import _macd_alphas, COLUMNS, DERIVED
 
 def fetch_ohlcv(exchange, symbol, timeframe=TIMEFRAME, limit=FETCH_LIMIT):
     bars = exchange.fetch_ohlcv(symbol, timeframe=timeframe, limit=limit)
@@ -65,3 +66,226 @@ def compute_indicators(df):
 
     return df
 
+
+
+# ----------------------------------------------------------------------
+# Panel mode: the same indicators for many symbols in one vectorized pass
+# ----------------------------------------------------------------------
+PANEL_COLUMNS = [*COLUMNS, *DERIVED]
+
+
+class OHLCVPanel:
+    """
+    OHLCV for many symbols as aligned (symbols x bars) arrays.
+
+    Rows are symbols and columns the union of their timestamps; a symbol
+    with a shorter history is NaN-padded on the left, and a bar missing in
+    the middle is NaN (recurrences carry their state across it).
+    `compute_panel_indicators` fills `indicators` with arrays of the same
+    shape; `row` and `frame` give per-symbol views of both.
+    """
+
+    def __init__(self, symbols, index, open_, high, low, close, volume):
+        self.symbols = list(symbols)
+        self.index = index
+        self.open, self.high, self.low, self.close, self.volume = open_, high, low, close, volume
+        self.indicators = {}
+        self._rows = {s: i for i, s in enumerate(self.symbols)}
+
+    @classmethod
+    def from_arrays(cls, series, limit=None):
+        """Align {symbol: (timestamps_ms, ohlcv_rows)} on their timestamps."""
+        symbols = list(series)
+        stamps = [np.asarray(ts, dtype=np.int64) for ts, _ in series.values()]
+        ts = np.unique(np.concatenate(stamps)) if stamps else np.zeros(0, dtype=np.int64)
+        if limit:
+            ts = ts[-limit:]
+        data = np.full((5, len(symbols), len(ts)), np.nan)
+        for i, (sym_ts, (_, values)) in enumerate(zip(stamps, series.values())):
+            pos = np.searchsorted(ts, sym_ts)
+            keep = (pos < len(ts)) & (ts[np.minimum(pos, len(ts) - 1)] == sym_ts)
+            data[:, i, pos[keep]] = np.asarray(values, dtype=float)[keep].T
+        index = pd.DatetimeIndex(pd.to_datetime(ts, unit='ms'), name='timestamp')
+        return cls(symbols, index, *data)
+
+    @classmethod
+    def from_frames(cls, frames, limit=None):
+        """Align {symbol: fetch_ohlcv-style DataFrame} on their timestamps."""
+        return cls.from_arrays({
+            symbol: (df.index.as_unit('ms').asi8,
+                     df[['open', 'high', 'low', 'close', 'volume']].to_numpy())
+            for symbol, df in frames.items()
+        }, limit)
+
+    @classmethod
+    def from_cache(cls, cache, symbols, timeframe=TIMEFRAME, limit=FETCH_LIMIT):
+        """
+        Panel straight from the OHLCVCache buffers, without DataFrames. Each
+        symbol keeps its own last `limit` bars (the frame fetch returns), even
+        when the buffers are not on the same bar.
+        """
+        series = {}
+        for symbol in symbols:
+            buf = cache.buffer(symbol, timeframe)
+            if buf is not None and len(buf):
+                series[symbol] = buf.arrays(limit)
+        return cls.from_arrays(series)
+
+    def __contains__(self, symbol):
+        return symbol in self._rows
+
+    def row(self, symbol, column):
+        """Zero-copy view of one symbol's OHLCV or indicator series."""
+        arr = self.indicators[column] if column in self.indicators else getattr(self, column)
+        return arr[self._rows[symbol]]
+
+    def series(self, symbol, columns):
+        """{column: array} over the symbol's own bars; views unless it has padding or gaps."""
+        valid = ~np.isnan(self.close[self._rows[symbol]])
+        if valid.all():
+            return {column: self.row(symbol, column) for column in columns}
+        return {column: self.row(symbol, column)[valid] for column in columns}
+
+    def frame(self, symbol):
+        """compute_indicators-style DataFrame for one symbol (valid bars only)."""
+        i = self._rows[symbol]
+        data = {col: getattr(self, col)[i] for col in ('open', 'high', 'low', 'close', 'volume')}
+        data.update({col: arr[i] for col, arr in self.indicators.items()})
+        df = pd.DataFrame(data, index=self.index)
+        df.index.name = 'timestamp'
+        return df[~np.isnan(self.close[i])]
+
+
+def _panel_ema(x, alpha):
+    """
+    Row-wise EMA seeded with each row's first value (pandas ewm(adjust=False)).
+    `alpha` is a scalar or one value per row, so several EMAs share one pass.
+    """
+    out = np.full_like(x, np.nan)
+    prev = np.full(x.shape[0], np.nan)
+    for t in range(x.shape[1]):
+        xt = x[:, t]
+        valid = ~np.isnan(xt)
+        cur = np.where(np.isnan(prev), xt, prev + alpha * (xt - prev))
+        prev = np.where(valid, cur, prev)
+        out[:, t] = np.where(valid, cur, np.nan)
+    return out
+
+
+def _panel_wilder(x, period):
+    """
+    Row-wise Wilder smoothing in tulipy's form: NaN for the first period-1
+    values, then their mean, then (x - prev) / period + prev. `period` is a
+    scalar or one value per row.
+    """
+    n_rows, n_cols = x.shape
+    period = np.broadcast_to(np.asarray(period, dtype=float), (n_rows,))
+    out = np.full_like(x, np.nan)
+    value = np.zeros(n_rows)
+    count = np.zeros(n_rows)
+    for t in range(n_cols):
+        xt = x[:, t]
+        valid = ~np.isnan(xt)
+        count = count + valid
+        seeding = valid & (count <= period)
+        value = np.where(seeding, value + np.where(valid, xt, 0), value)
+        value = np.where(valid & (count == period), value / period, value)
+        smoothing = valid & (count > period)
+        value = np.where(smoothing, value + (np.where(valid, xt, 0) - value) / period, value)
+        out[:, t] = np.where(valid & (count >= period), value, np.nan)
+    return out
+
+
+def _panel_rolling_mean(x, n):
+    out = np.full_like(x, np.nan)
+    if x.shape[1] >= n:
+        out[:, n - 1:] = np.lib.stride_tricks.sliding_window_view(x, n, axis=1).mean(axis=2)
+    return out
+
+
+def _panel_pct(x):
+    out = np.full_like(x, np.nan)
+    prev = x[:, :-1]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out[:, 1:] = np.where(prev == 0, np.nan, (x[:, 1:] / prev - 1) * 100)
+    return out
+
+
+def compute_panel_indicators(panel, columns=None):
+    """
+    compute_indicators for every symbol of an OHLCVPanel at once.
+
+    Recurrences loop over bars with every symbol (and every EMA/RSI period)
+    stacked into the same vector operation, so the cost grows with the
+    number of bars rather than the number of symbols. Results match
+    compute_indicators on each symbol's own bars. Only the groups of
+    indicators `columns` needs are computed; None means all of them.
+    """
+    close, high, low, vol = panel.close, panel.high, panel.low, panel.volume
+    n = close.shape[0]
+    ind = panel.indicators
+    wanted = set(PANEL_COLUMNS if columns is None else columns)
+
+    def needs(*names):
+        return not wanted.isdisjoint(names)
+
+    macd_columns = ('dif', 'dea', 'macd_hist', 'dif_roc', 'dea_roc', 'predicted_bullish', 'predicted_bearish')
+    if needs('ema_fast', 'ema_slow', *macd_columns):
+        # EMAs: MACD short/long, ema_fast, ema_slow in one pass
+        short_alpha, long_alpha = _macd_alphas(MACD_FAST, MACD_SLOW)
+        alphas = np.repeat([short_alpha, long_alpha, 2 / (EMA_FAST + 1), 2 / (EMA_SLOW + 1)], n)
+        emas = _panel_ema(np.tile(close, (4, 1)), alphas).reshape(4, n, -1)
+        ind['ema_fast'], ind['ema_slow'] = emas[2], emas[3]
+
+    if needs(*macd_columns):
+        # MACD: dif starts once MACD_SLOW bars have been seen, as in ti.macd
+        seen = np.cumsum(~np.isnan(close), axis=1)
+        dif = np.where(seen >= MACD_SLOW, emas[0] - emas[1], np.nan)
+        dea = _panel_ema(dif, 2 / (MACD_SIGNAL + 1))
+        ind['dif'], ind['dea'], ind['macd_hist'] = dif, dea, dif - dea
+        ind['dif_roc'], ind['dea_roc'] = _panel_pct(dif), _panel_pct(dea)
+        ind['predicted_bullish'] = (ind['macd_hist'] > 0) & (ind['dif_roc'] > ind['dea_roc'])
+        ind['predicted_bearish'] = (ind['macd_hist'] < 0) & (ind['dif_roc'] < ind['dea_roc'])
+
+    if needs('rsi6', 'rsi12', 'rsi24', 'stochrsi_k', 'stochrsi_d'):
+        _panel_rsi(panel)
+    if needs('atr'):
+        # ATR: the first bar's true range is its own range
+        prev_close = np.full_like(close, np.nan)
+        prev_close[:, 1:] = close[:, :-1]
+        tr = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+        ind['atr'] = _panel_wilder(tr, ATR_PERIOD)
+    if needs('vol_ma5', 'vol_ma20'):
+        ind['vol_ma5'] = _panel_rolling_mean(vol, 5)
+        ind['vol_ma20'] = _panel_rolling_mean(vol, 20)
+    return ind
+
+
+def _panel_rsi(panel):
+    close, ind = panel.close, panel.indicators
+    n = close.shape[0]
+
+    # RSI 6/12/24 and the StochRSI base RSI in one Wilder pass
+    periods = (6, 12, 24, STOCH_RSI_PERIOD)
+    diff = np.full_like(close, np.nan)
+    diff[:, 1:] = close[:, 1:] - close[:, :-1]
+    up = np.tile(np.where(diff > 0, diff, np.where(np.isnan(diff), np.nan, 0.0)), (4, 1))
+    down = np.tile(np.where(diff < 0, -diff, np.where(np.isnan(diff), np.nan, 0.0)), (4, 1))
+    period = np.repeat(periods, n)
+    up, down = _panel_wilder(up, period), _panel_wilder(down, period)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rsi = np.where(up + down == 0, np.nan, 100.0 * up / (up + down)).reshape(4, n, -1)
+    ind['rsi6'], ind['rsi12'], ind['rsi24'] = rsi[0], rsi[1], rsi[2]
+
+    # StochRSI (k/d)
+    base = rsi[3]
+    raw = np.full_like(base, np.nan)
+    if base.shape[1] >= STOCH_RSI_PERIOD:
+        windows = np.lib.stride_tricks.sliding_window_view(base, STOCH_RSI_PERIOD, axis=1)
+        lo, hi = windows.min(axis=2), windows.max(axis=2)
+        cur = base[:, STOCH_RSI_PERIOD - 1:]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            raw[:, STOCH_RSI_PERIOD - 1:] = np.where(hi == lo, 0.0, (cur - lo) / (hi - lo))
+    k = _panel_rolling_mean(raw, fastk_period)
+    ind['stochrsi_k'] = k * 100
+    ind['stochrsi_d'] = _panel_rolling_mean(k, fastd_period) * 100
@@ -0,0 +1,188 @@
+## File: dataset_builder.py
+"""
+Build a labelled training dataset from cached historical OHLCV.
+
+Features come from feature_pipeline.compute_features - the code that feeds
+the live model. The bot only ever sees a FETCH_LIMIT-bar buffer while a
+symbol's history runs much longer, so each symbol's last row is also checked
+against live mode seeded on that buffer (feature_pipeline.live_parity) and
+any feature that differs is logged.
+
+Each bar is labelled 0 (sell), 1 (flat) or 2 (buy), the classes
+hybrid_signal maps to signals, by one of:
+
+  forward   close-to-close return over --horizon bars beyond +/- --threshold
+  barrier   triple barrier: whichever of close + --upper*ATR or
+            close - --lower*ATR the next --horizon bars touch first; neither
+            (or both in the same bar) is flat
+
+    python dataset_builder.py --data ./history --timeframe 5m --out data/train.cols \
+        --labels barrier --horizon 24 --workers 8
+    python model_training.py data/train.cols
+
+Bars are read from <data>/<SYMBOL>_<timeframe>.csv, the backtester layout.
+Symbols are processed in parallel and appended to the output as they finish,
+a bounded number at a time, so memory does not grow with the symbol count.
+Output is a dataset_store directory, or a CSV if --out ends in .csv.
+"""
+
+import argparse
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from config_setup import TIMEFRAME
+from backtester import load_bars, symbols_in
+from dataset_store import DatasetWriter
+from feature_pipeline import FEATURES, compute_features, live_parity
+
+logger = logging.getLogger(__name__)
+
+SELL, FLAT, BUY = 0, 1, 2
+HORIZON = 12         # bars ahead the label looks
+THRESHOLD = 0.002    # forward return that counts as a move
+UPPER = LOWER = 1.5  # barrier distances in ATRs, the bracket's stop distance
+BLOCK = 65_536       # rows per barrier block; bounds the (rows x horizon) masks
+ATR_14 = FEATURES.index('atr_14')
+
+
+def forward_return_labels(close, horizon=HORIZON, threshold=THRESHOLD):
+    """Labels from the return over the next `horizon` bars; -1 where it is unknown."""
+    labels = np.full(len(close), -1, dtype=np.int8)
+    m = len(close) - horizon
+    if m <= 0:
+        return labels
+    ret = close[horizon:] / close[:m] - 1
+    labels[:m] = FLAT
+    labels[:m][ret > threshold] = BUY
+    labels[:m][ret < -threshold] = SELL
+    return labels
+
+
+def triple_barrier_labels(high, low, close, atr, horizon=HORIZON, upper=UPPER, lower=LOWER):
+    """Labels from the first ATR barrier touched within `horizon` bars; -1 where unknown."""
+    labels = np.full(len(close), -1, dtype=np.int8)
+    m = len(close) - horizon
+    if m <= 0:
+        return labels
+    # Row t views bars t+1 .. t+horizon without copying
+    highs = sliding_window_view(high[1:], horizon)
+    lows = sliding_window_view(low[1:], horizon)
+    up = close[:m] + upper * atr[:m]
+    down = close[:m] - lower * atr[:m]
+    for start in range(0, m, BLOCK):
+        rows = slice(start, min(start + BLOCK, m))
+        hit_up = highs[rows] >= up[rows, None]
+        hit_down = lows[rows] <= down[rows, None]
+        first_up = np.where(hit_up.any(axis=1), hit_up.argmax(axis=1), horizon)
+        first_down = np.where(hit_down.any(axis=1), hit_down.argmax(axis=1), horizon)
+        block = np.full(len(first_up), FLAT, dtype=np.int8)
+        block[first_up < first_down] = BUY
+        block[first_down < first_up] = SELL
+        labels[rows] = block
+    return labels
+
+
+def build_symbol(data_dir, symbol, timeframe=TIMEFRAME, method='forward', horizon=HORIZON,
+                 threshold=THRESHOLD, upper=UPPER, lower=LOWER):
+    """(symbol, timestamps, features, labels) for one symbol's labelled, warmed-up bars."""
+    ts, values = load_bars(data_dir, symbol, timeframe)
+    features = compute_features(ts, values, timeframe)
+    drift = live_parity(ts, values, timeframe)
+    if drift:
+        logger.warning(f"{symbol}: features differ from live mode: {', '.join(drift)}")
+    _, high, low, close, _ = values.T
+    if method == 'barrier':
+        labels = triple_barrier_labels(high, low, close, features[:, ATR_14], horizon, upper, lower)
+    else:
+        labels = forward_return_labels(close, horizon, threshold)
+    # Drop the indicator warm-up and the tail whose outcome is not known yet
+    keep = (labels >= 0) & np.isfinite(features).all(axis=1)
+    return symbol, ts[keep], features[keep].astype(np.float32), labels[keep]
+
+
+class _CSVWriter:
+    """DatasetWriter's interface over an appended CSV."""
+
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def append(self, timestamp, X, y, symbol):
+        df = pd.DataFrame(X, columns=FEATURES)
+        df.insert(0, 'timestamp', pd.to_datetime(timestamp, unit='ms'))
+        df.insert(1, 'symbol', symbol)
+        df['label'] = y
+        df.to_csv(self.path, mode='a', header=self.rows == 0, index=False)
+        self.rows += len(df)
+
+    def close(self):
+        return self.rows
+
+
+def build(data_dir, out, symbols=None, timeframe=TIMEFRAME, method='forward', horizon=HORIZON,
+          threshold=THRESHOLD, upper=UPPER, lower=LOWER, workers=None):
+    """Build the dataset at `out`; returns the class counts written."""
+    symbols = symbols or symbols_in(data_dir, timeframe)
+    workers = workers or os.cpu_count()
+    writer = _CSVWriter(out) if out.endswith('.csv') else DatasetWriter(out, FEATURES)
+    counts = np.zeros(3, dtype=np.int64)
+    started = time.perf_counter()
+
+    def write(future):
+        try:
+            symbol, ts, X, y = future.result()
+        except Exception as e:
+            logger.error(f"Dataset builder failed on a symbol: {e}")
+            return
+        writer.append(ts, X, y, np.full(len(y), symbol, dtype=object))
+        counts[:] += np.bincount(y, minlength=3)
+
+    with ProcessPoolExecutor(workers) as pool:
+        # Results are written in submission order (so reruns produce the same
+        # file) with at most 2 x workers symbols held in memory at once
+        pending = deque()
+        for symbol in symbols:
+            pending.append(pool.submit(build_symbol, data_dir, symbol, timeframe, method, horizon,
+                                       threshold, upper, lower))
+            if len(pending) >= 2 * workers:
+                write(pending.popleft())
+        while pending:
+            write(pending.popleft())
+    writer.close()
+    logger.info(f"Dataset: {len(symbols)} symbols, {counts.sum()} rows in "
+                f"{time.perf_counter() - started:.1f}s -> {out}")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build a labelled training dataset from historical bars.')
+    parser.add_argument('--data', required=True, help='directory of <SYMBOL>_<timeframe>.csv files')
+    parser.add_argument('--out', required=True, help='dataset directory, or a .csv file')
+    parser.add_argument('--timeframe', default=TIMEFRAME)
+    parser.add_argument('--symbols', nargs='*', help='default: every symbol found in --data')
+    parser.add_argument('--labels', choices=('forward', 'barrier'), default='forward')
+    parser.add_argument('--horizon', type=int, default=HORIZON, help='bars ahead the label looks')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD, help='forward: return counted as a move')
+    parser.add_argument('--upper', type=float, default=UPPER, help='barrier: take-profit distance in ATRs')
+    parser.add_argument('--lower', type=float, default=LOWER, help='barrier: stop distance in ATRs')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s:%(message)s')
+    counts = build(args.data, args.out, args.symbols, args.timeframe, args.labels, args.horizon,
+                   args.threshold, args.upper, args.lower, args.workers)
+    total = max(counts.sum(), 1)
+    print(f"{counts.sum()} rows -> {args.out}  sell {counts[SELL] / total:.1%}  "
+          f"flat {counts[FLAT] / total:.1%}  buy {counts[BUY] / total:.1%}")
+
+
+if __name__ == '__main__':
+    main()
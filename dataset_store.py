@@ -0,0 +1,188 @@
+## File: dataset_store.py
+"""
+Columnar, memory-mapped training datasets.
+
+A dataset is a directory of .npy files sorted by timestamp:
+
+    meta.json       row count, feature names, symbols, chunk size
+    features.npy    float32 (rows, features), column-major: each feature is contiguous
+    label.npy       int8
+    timestamp.npy   int64 milliseconds
+    symbol.npy      int32 index into meta['symbols']
+
+Dataset(path) memory-maps the files, so opening one costs nothing and
+`ds.X[a:b]` / `ds.y[a:b]` are zero-copy slices of the page cache. meta.json
+is written last; a directory without it is an unfinished conversion.
+
+    python dataset_store.py data/train.csv data/train.cols
+"""
+
+import argparse
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+
+VERSION = 1
+CHUNK_ROWS = 1_000_000
+META = 'meta.json'
+NON_FEATURES = ('timestamp', 'symbol', 'label')
+
+
+def is_dataset(path):
+    return os.path.isfile(os.path.join(path, META))
+
+
+class Dataset:
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, META)) as f:
+            self.meta = json.load(f)
+        if self.meta.get('version') != VERSION:
+            raise ValueError(f"Unsupported dataset version {self.meta.get('version')} in {path}")
+        self.rows = self.meta['rows']
+        self.features = self.meta['features']
+        self.symbols = self.meta['symbols']
+        self.X = self._load('features')
+        self.y = self._load('label')
+        self.timestamp = self._load('timestamp')
+        self.symbol = self._load('symbol')
+
+    def _load(self, name):
+        return np.load(os.path.join(self.path, f'{name}.npy'), mmap_mode='r')
+
+    def __len__(self):
+        return self.rows
+
+    def column(self, name):
+        return self.X[:, self.features.index(name)]
+
+    def between(self, start_ms=None, end_ms=None):
+        """Row slice with start_ms <= timestamp < end_ms (binary search, no scan)."""
+        start = 0 if start_ms is None else int(np.searchsorted(self.timestamp, start_ms, 'left'))
+        end = self.rows if end_ms is None else int(np.searchsorted(self.timestamp, end_ms, 'left'))
+        return slice(start, end)
+
+    def chunks(self):
+        """Row slices of at most meta['chunk_rows'] rows, in timestamp order."""
+        step = self.meta['chunk_rows']
+        return [slice(i, min(i + step, self.rows)) for i in range(0, self.rows, step)]
+
+    def frame(self, rows=slice(None)):
+        """A pandas view of `rows` for ad-hoc inspection; copies."""
+        df = pd.DataFrame(np.asarray(self.X[rows]), columns=self.features)
+        df.insert(0, 'timestamp', pd.to_datetime(self.timestamp[rows], unit='ms'))
+        df.insert(1, 'symbol', np.asarray(self.symbols, dtype=object)[self.symbol[rows]] if self.symbols else None)
+        df['label'] = self.y[rows]
+        return df
+
+
+class DatasetWriter:
+    """
+    Append rows in any order and in any batch size; close() sorts them by
+    timestamp into the final layout. Appended batches go to one raw file per
+    column, so memory stays at one batch plus one column during the sort.
+    """
+
+    def __init__(self, path, features, chunk_rows=CHUNK_ROWS):
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.makedirs(os.path.join(path, 'tmp'))
+        self.path = path
+        self.features = list(features)
+        self.chunk_rows = chunk_rows
+        self.rows = 0
+        self.symbols = {}
+        names = ['timestamp', 'label', 'symbol'] + [f'f{j}' for j in range(len(self.features))]
+        self._files = {name: open(os.path.join(path, 'tmp', f'{name}.bin'), 'wb') for name in names}
+
+    def append(self, timestamp, X, y, symbol=None):
+        """timestamp in ms, X of shape (n, features), integer labels y, symbol names or None."""
+        X = np.asarray(X, dtype=np.float32)
+        y = np.asarray(y)
+        if len(y) and (not np.issubdtype(y.dtype, np.integer) and not np.all(np.mod(y, 1) == 0)):
+            raise ValueError("Labels must be integers")
+        if len(y) and (y.min() < -128 or y.max() > 127):
+            raise ValueError("Labels must fit in int8")
+        if symbol is None:
+            codes = np.full(len(y), -1, dtype=np.int32)
+        else:
+            codes = np.array([self.symbols.setdefault(s, len(self.symbols)) for s in symbol], dtype=np.int32)
+        self._files['timestamp'].write(np.asarray(timestamp, dtype=np.int64).tobytes())
+        self._files['label'].write(y.astype(np.int8).tobytes())
+        self._files['symbol'].write(codes.tobytes())
+        for j in range(X.shape[1]):
+            self._files[f'f{j}'].write(np.ascontiguousarray(X[:, j]).tobytes())
+        self.rows += len(y)
+
+    def close(self):
+        for f in self._files.values():
+            f.close()
+        tmp = os.path.join(self.path, 'tmp')
+
+        def raw(name, dtype):
+            if self.rows == 0:
+                return np.empty(0, dtype=dtype)
+            return np.memmap(os.path.join(tmp, f'{name}.bin'), dtype=dtype, mode='r')
+
+        timestamp = raw('timestamp', np.int64)
+        order = None if np.all(timestamp[1:] >= timestamp[:-1]) else np.argsort(timestamp, kind='stable')
+
+        def column(name, dtype):
+            values = raw(name, dtype)
+            return values if order is None else values[order]
+
+        for name, dtype in (('timestamp', np.int64), ('label', np.int8), ('symbol', np.int32)):
+            np.save(os.path.join(self.path, f'{name}.npy'), column(name, dtype))
+        X = np.lib.format.open_memmap(os.path.join(self.path, 'features.npy'), mode='w+', dtype=np.float32,
+                                      shape=(self.rows, len(self.features)), fortran_order=True)
+        for j in range(len(self.features)):
+            X[:, j] = column(f'f{j}', np.float32)
+        X.flush()
+        del X, timestamp
+        shutil.rmtree(tmp)
+        with open(os.path.join(self.path, META), 'w') as f:
+            json.dump({
+                'version': VERSION,
+                'rows': self.rows,
+                'features': self.features,
+                'symbols': list(self.symbols),
+                'chunk_rows': self.chunk_rows,
+            }, f, indent=2)
+        return Dataset(self.path)
+
+
+def _timestamps_ms(values):
+    ts = pd.to_datetime(values, utc=True)
+    return ts.dt.tz_convert(None).to_numpy().astype('datetime64[ms]').astype(np.int64)
+
+
+def write_frame(writer, df):
+    writer.append(_timestamps_ms(df['timestamp']), df[writer.features].to_numpy(dtype=np.float32),
+                  df['label'].to_numpy(), df['symbol'].astype(str).to_numpy() if 'symbol' in df.columns else None)
+
+
+def convert(csv_path, path, chunksize=500_000, chunk_rows=CHUNK_ROWS):
+    """Convert a feature CSV (timestamp, [symbol], features..., label) without loading it whole."""
+    header = pd.read_csv(csv_path, nrows=0).columns
+    features = [c for c in header if c not in NON_FEATURES]
+    dtypes = {c: np.float32 for c in features}
+    writer = DatasetWriter(path, features, chunk_rows)
+    for chunk in pd.read_csv(csv_path, dtype=dtypes, chunksize=chunksize):
+        write_frame(writer, chunk)
+    return writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert a training CSV to the columnar dataset format.')
+    parser.add_argument('csv')
+    parser.add_argument('output', help='dataset directory to create')
+    parser.add_argument('--chunksize', type=int, default=500_000, help='CSV rows read per batch')
+    args = parser.parse_args()
+    ds = convert(args.csv, args.output, args.chunksize)
+    print(f"{ds.rows} rows x {len(ds.features)} features written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,48 +2,161 @@
 
 import asyncio
 import logging
-from data_and_indicators import fetch_ohlcv, compute_indicators
-from hybrid_signal import generate_signal
+import time
+from ohlcv_cache import OHLCVCache
+from feature_pipeline import FeaturePipeline, FEATURES
+from hybrid_signal import generate_signal, generate_signals
 from position_sizer import calculate_position_size
 from order_execution import place_bracket_order
-from config_setup import TIMEFRAME, FETCH_LIMIT, RR_RATIO
+from rate_limiter import RateLimiter
+from market_snapshot import MarketSnapshot
+from metrics import metrics
+from config_setup import (
+    TIMEFRAME, FETCH_LIMIT, RR_RATIO,
+    SCAN_CONCURRENCY, SCAN_TIMEOUT
+)
 from trade_logger import TradeLogger
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
 class EntryManager:
-    def __init__(self, exchange=None):
+    def __init__(self, exchange=None, features=None, ohlcv=None, limiter=None,
+                 trade_logger=None, snapshot=None):
         self.exchange = exchange
-        self.logger = TradeLogger(exchange)
+        self.features = features or FeaturePipeline()
+        self.ohlcv = ohlcv or OHLCVCache()
+        self.limiter = limiter or RateLimiter.for_exchange(exchange)
+        self.snapshot = snapshot or MarketSnapshot(exchange)
+        self.logger = trade_logger or TradeLogger(exchange)
+        self.last_scan = {}
 
-    async def check_and_place(self, symbol: str):
-        df = await asyncio.to_thread(fetch_ohlcv, self.exchange, symbol, TIMEFRAME, FETCH_LIMIT)
-        df = await asyncio.to_thread(compute_indicators, df)
-        signal, confidence = generate_signal(df)
+    async def scan(self, symbols, concurrency=SCAN_CONCURRENCY, timeout=SCAN_TIMEOUT):
+        """
+        Check entries for `symbols` in three stages: fetch bars and model features
+        with at most `concurrency` symbols in flight, score every prepared
+        symbol with a single batched model call, then place the orders.
+        Exchange calls are paced by the shared rate limiter, and a symbol whose
+        data stage exceeds `timeout` seconds is skipped for this pass.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = []
+        timed_out = []
+        frames = {}
+        wait_before = self.limiter.wait_time
+
+        waiting = len(symbols)
+
+        async def prepare(symbol):
+            nonlocal waiting
+            async with semaphore:
+                waiting -= 1
+                metrics.set('queue_depth', waiting, queue='entry_scan')
+                started = time.perf_counter()
+                try:
+                    frames[symbol] = await self.prepare(symbol, timeout=timeout)
+                except TimeoutError:
+                    timed_out.append(symbol)
+                except Exception as e:
+                    logger.error(f"EntryManager error for {symbol}: {e}")
+                latencies.append(time.perf_counter() - started)
+
+        async def place(symbol, signal, confidence):
+            try:
+                await self.place(symbol, frames[symbol], signal, confidence, signal_time)
+            except Exception as e:
+                logger.error(f"EntryManager error for {symbol}: {e}")
+
+        started = time.perf_counter()
+        metrics.set('queue_depth', waiting, queue='entry_scan')
+        await asyncio.gather(*(prepare(s) for s in symbols))
+        inference_started = time.perf_counter()
+        with metrics.span('stage_seconds', loop='entry', stage='inference'):
+            signals = generate_signals(frames) if frames else {}
+        signal_time = time.monotonic()
+        inference = time.perf_counter() - inference_started
+        await asyncio.gather(*(
+            place(symbol, signal, confidence)
+            for symbol, (signal, confidence) in signals.items()
+            if signal and confidence
+        ))
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        self.last_scan = {
+            'symbols': len(symbols),
+            'seconds': elapsed,
+            'p50': latencies[len(latencies) // 2] if latencies else 0.0,
+            'max': latencies[-1] if latencies else 0.0,
+            'timeouts': len(timed_out),
+            'rate_limit_wait': self.limiter.wait_time - wait_before,
+            'inference': inference,
+        }
+        logger.info(
+            f"Entry scan: {len(symbols)} symbols in {elapsed:.2f}s | "
+            f"p50={self.last_scan['p50']:.2f}s max={self.last_scan['max']:.2f}s | "
+            f"inference={inference * 1000:.1f}ms for {len(frames)} | "
+            f"timeouts={len(timed_out)} | rate-limit wait={self.last_scan['rate_limit_wait']:.2f}s"
+        )
+        if timed_out:
+            logger.warning(f"Entry scan timed out for: {', '.join(timed_out)}")
+        return self.last_scan
+
+    async def prepare(self, symbol: str, timeout=None):
+        """Fetch the latest bars for `symbol` and return its FEATURES row."""
+        async with asyncio.timeout(timeout):
+            with metrics.span('stage_seconds', loop='entry', stage='rate_limit'):
+                await self.limiter.acquire()
+            with metrics.span('stage_seconds', loop='entry', stage='fetch'):
+                await self.ohlcv.fetch(self.exchange, symbol, TIMEFRAME, FETCH_LIMIT)
+            with metrics.span('stage_seconds', loop='entry', stage='features'):
+                buffer = self.ohlcv.buffer(symbol, TIMEFRAME)
+                return self.features.update_buffer(symbol, TIMEFRAME, buffer, FETCH_LIMIT)
+
+    async def check_and_place(self, symbol: str, timeout=None):
+        # Only the data/signal stage is bounded; an order that is already
+        # being placed must run to completion so it always gets logged.
+        async with asyncio.timeout(timeout):
+            features = await self.prepare(symbol)
+            with metrics.span('stage_seconds', loop='entry', stage='inference'):
+                signal, confidence = generate_signal(features)
+            signal_time = time.monotonic()
         if not signal or not confidence:
             return
+        await self.place(symbol, features, signal, confidence, signal_time)
 
-        price = float(df['close'].iloc[-1])
-        balance = float(self.exchange.fetch_balance()['USDT']['total'])
-        atr = float(df['atr_14'].iloc[-1])
-        size = calculate_position_size(balance, confidence, price, atr)
+    async def place(self, symbol, features, signal, confidence, signal_time=None):
+        """Size and submit the order; `signal_time` (time.monotonic()) dates the signal."""
+        signal_time = signal_time or time.monotonic()
+        _, bars = self.ohlcv.buffer(symbol, TIMEFRAME).arrays(1)
+        price = float(bars[-1, 3])
+        with metrics.span('stage_seconds', loop='entry', stage='balance'):
+            balance = float((await self.snapshot.balance())['USDT']['total'])
+        with metrics.span('stage_seconds', loop='entry', stage='sizing'):
+            atr = float(features[FEATURES.index('atr_14')])
+            size = calculate_position_size(balance, confidence, price, atr)
         
         sl = price - (atr * 1.5) if 'buy' in signal else price + (atr * 1.5)
         tp = price + (atr * RR_RATIO * 1.5) if 'buy' in signal else price - (atr * RR_RATIO * 1.5)
         side = 'buy' if 'buy' in signal else 'sell'
         logger.info(f"Placing {signal.upper()} {symbol} | conf={confidence:.2f} | size={size:.6f} | SL={sl:.2f} | TP={tp:.2f}")
         try:
-            order = await asyncio.to_thread(
-                place_bracket_order,
-                exchange=self.exchange,
-                symbol=symbol,
-                side=side,
-                amount=size,
-                entry_type='market',
-                entry_price=price,
-                atr=atr,
-            )
+            with metrics.span('stage_seconds', loop='entry', stage='rate_limit'):
+                await self.limiter.acquire()
+            with metrics.span('stage_seconds', loop='entry', stage='order'):
+                order = await place_bracket_order(
+                    exchange=self.exchange,
+                    symbol=symbol,
+                    side=side,
+                    amount=size,
+                    entry_type='market',
+                    entry_price=price,
+                    atr=atr,
+                )
+            ack_latency = time.monotonic() - signal_time
+            if order:
+                metrics.observe('signal_to_ack_seconds', ack_latency)
+            self.snapshot.invalidate('balance', 'positions')
             self.logger.log_trade(
                 order_id=order['id'],
                 entry_time=datetime.utcnow().isoformat(),
@@ -52,7 +165,8 @@ class EntryManager:
                 side=signal,
                 entry_price=price,
                 atr=atr,
-                confidence=confidence
+                confidence=confidence,
+                ack_latency=ack_latency
             )
         except Exception as e:
             logger.error(f"Order failed for {symbol}: {e}")
@@ -0,0 +1,395 @@
+## File: exchange_recorder.py
+"""
+Record exchange traffic to a cassette and replay it without the network.
+
+RecordingExchange wraps the object init_exchange/init_async_exchange return
+and appends every ccxt call (method, arguments, response or error, timing)
+to a gzip JSONL cassette. ReplayExchange/AsyncReplayExchange serve those
+responses back in call order, sleeping each call's recorded latency scaled
+by `speed` (1 = original timing, 10 = ten times faster, 0 = no waiting).
+
+Record a live session:      EXCHANGE_RECORD=logs/session.jsonl.gz python main.py
+Run the bot from one:       EXCHANGE_REPLAY=logs/session.jsonl.gz REPLAY_SPEED=10 python main.py
+Profile the loops on one:   python exchange_recorder.py profile logs/session.jsonl.gz --speed 0
+"""
+
+import argparse
+import asyncio
+import cProfile
+import gzip
+import importlib
+import inspect
+import json
+import logging
+import os
+import pstats
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict, deque
+import ccxt
+from config_setup import REPLAY_SPEED
+
+logger = logging.getLogger(__name__)
+
+CASSETTE_VERSION = 1
+FLUSH_INTERVAL = 1.0  # seconds between flushes, so a killed session stays readable
+LOCAL_METHODS = {     # pure client-side helpers, never recorded
+    'milliseconds', 'seconds', 'microseconds', 'iso8601', 'parse8601', 'parse_timeframe',
+    'enable_demo_trading', 'close', 'market', 'market_id', 'safe_symbol',
+    'amount_to_precision', 'price_to_precision', 'cost_to_precision',
+}
+
+
+def _key(method, args, kwargs):
+    return json.dumps([method, args, kwargs], sort_keys=True, default=str)
+
+
+def _error(exc):
+    return {'type': type(exc).__name__, 'message': str(exc)}
+
+
+def _raise(error):
+    cls = getattr(ccxt, error['type'], None)
+    if not (isinstance(cls, type) and issubclass(cls, Exception)):
+        cls = ccxt.ExchangeError
+    raise cls(error['message'])
+
+
+class Cassette:
+    """Append-only gzip JSONL writer: a header line, then one line per call."""
+
+    def __init__(self, path, exchange):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self._file = gzip.open(path, 'wt', encoding='utf-8')
+        self._lock = threading.Lock()
+        self._flushed = time.monotonic()
+        self.started = time.time()
+        self._write({
+            'version': CASSETTE_VERSION, 'exchange': getattr(exchange, 'id', None),
+            'started': int(self.started * 1000), 'rateLimit': getattr(exchange, 'rateLimit', None),
+        })
+
+    def _write(self, entry):
+        line = json.dumps(entry, default=str, separators=(',', ':'))
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.write(line + '\n')
+            if time.monotonic() - self._flushed >= FLUSH_INTERVAL:
+                self._file.flush()
+                self._flushed = time.monotonic()
+
+    def record(self, method, args, kwargs, start, duration, result=None, error=None):
+        entry = {'t': round(start - self.started, 6), 'dt': round(duration, 6),
+                 'method': method, 'args': args, 'kwargs': kwargs}
+        if error is not None:
+            entry['error'] = error
+        else:
+            entry['result'] = result
+        self._write(entry)
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+def load_cassette(path):
+    """(header, calls) from a cassette; a truncated tail (killed session) is dropped."""
+    header, calls = None, []
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        try:
+            for line in f:
+                entry = json.loads(line)
+                if header is None:
+                    header = entry
+                else:
+                    calls.append(entry)
+        except (EOFError, json.JSONDecodeError):
+            logger.warning(f"Cassette {path} is truncated after {len(calls)} calls")
+    if header is None or header.get('version') != CASSETTE_VERSION:
+        raise ValueError(f"{path} is not a version {CASSETTE_VERSION} cassette")
+    return header, calls
+
+
+class RecordingExchange:
+    """
+    Transparent proxy that records every exchange call it forwards.
+
+    Works for both sync and async_support exchanges: a call that returns an
+    awaitable is recorded when the awaitable completes. Attributes that are not calls (rateLimit, has,
+    session, ...) are read through from the wrapped exchange.
+    """
+
+    def __init__(self, exchange, path):
+        self._exchange = exchange
+        self._cassette = Cassette(path, exchange)
+        logger.info(f"Recording exchange traffic to {path}")
+
+    def __getattr__(self, name):
+        attr = getattr(self._exchange, name)
+        if name.startswith('_') or name in LOCAL_METHODS or not callable(attr):
+            return attr
+        cassette = self._cassette
+
+        def call(*args, **kwargs):
+            start, t0 = time.time(), time.perf_counter()
+            try:
+                result = attr(*args, **kwargs)
+            except Exception as e:
+                cassette.record(name, args, kwargs, start, time.perf_counter() - t0, error=_error(e))
+                raise
+            if not inspect.isawaitable(result):
+                cassette.record(name, args, kwargs, start, time.perf_counter() - t0, result)
+                return result
+
+            async def complete():
+                try:
+                    value = await result
+                except Exception as e:
+                    cassette.record(name, args, kwargs, start, time.perf_counter() - t0, error=_error(e))
+                    raise
+                cassette.record(name, args, kwargs, start, time.perf_counter() - t0, value)
+                return value
+            return complete()
+        return call
+
+    def close(self):
+        close = getattr(self._exchange, 'close', None)
+        result = close() if close else None
+        if inspect.isawaitable(result):
+            async def finish():
+                try:
+                    return await result
+                finally:
+                    self._cassette.close()
+            return finish()
+        self._cassette.close()
+        return result
+
+
+class ReplayExchange:
+    """
+    Serves a cassette's responses in place of the exchange (sync calls).
+
+    A call is answered by the earliest unused recording with identical
+    arguments; failing that (e.g. a `since` derived from the clock), the
+    earliest unused recording of the same method and symbol, then of the
+    same method. Once those run out (the loops poll faster than they did
+    while recording) the latest response served for the closest key is
+    repeated. Recorded errors are re-raised as the same ccxt exception.
+    The clock (`milliseconds`) starts at the recording's start time and
+    runs `speed` times faster than real time.
+    """
+
+    def __init__(self, path, speed=REPLAY_SPEED):
+        self.header, self.calls = load_cassette(path)
+        self.speed = speed
+        self.id = self.header.get('exchange')
+        self.rateLimit = self.header.get('rateLimit') or 0
+        self.has = {}
+        self.session = None
+        self.served = Counter()
+        self.repeated = Counter()
+        self.missed = Counter()
+        self._last = {}  # key -> latest recording served for it
+        self._indexes = (defaultdict(deque), defaultdict(deque), defaultdict(deque))
+        for i, call in enumerate(self.calls):
+            for index, key in zip(self._indexes, self._keys(call['method'], call['args'], call['kwargs'])):
+                index[key].append(i)
+        self._used = [False] * len(self.calls)
+        self._remaining = len(self.calls)
+        self._lock = threading.Lock()
+        self._t0 = time.monotonic()
+        logger.info(f"Replaying {len(self.calls)} exchange calls from {path} (speed {speed})")
+
+    @staticmethod
+    def _keys(method, args, kwargs):
+        symbol = args[0] if args else kwargs.get('symbol')
+        return (_key(method, args, kwargs), (method, str(symbol)), method)
+
+    @property
+    def exhausted(self):
+        return self._remaining == 0
+
+    def _next(self, method, args, kwargs):
+        """Claim the recording that answers this call."""
+        args = json.loads(json.dumps(list(args), default=str))
+        kwargs = json.loads(json.dumps(kwargs, default=str))
+        keys = self._keys(method, args, kwargs)
+        with self._lock:
+            for index, key in zip(self._indexes, keys):
+                queue = index.get(key)
+                while queue and self._used[queue[0]]:
+                    queue.popleft()
+                if queue:
+                    i = queue.popleft()
+                    self._used[i] = True
+                    self._remaining -= 1
+                    self.served[method] += 1
+                    for k in keys:
+                        self._last[k] = i
+                    return self.calls[i]
+            for key in keys:
+                if key in self._last:
+                    self.repeated[method] += 1
+                    return self.calls[self._last[key]]
+            self.missed[method] += 1
+        raise ccxt.NetworkError(f"replay: no recorded {method} call left")
+
+    def _delay(self, call):
+        return call['dt'] / self.speed if self.speed else 0.0
+
+    @staticmethod
+    def _answer(call):
+        if 'error' in call:
+            _raise(call['error'])
+        return call['result']
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        def call(*args, **kwargs):
+            recorded = self._next(name, args, kwargs)
+            time.sleep(self._delay(recorded))
+            return self._answer(recorded)
+        return call
+
+    def milliseconds(self):
+        return self.header['started'] + int((time.monotonic() - self._t0) * 1000 * (self.speed or 1))
+
+    parse_timeframe = staticmethod(ccxt.Exchange.parse_timeframe)
+
+    def enable_demo_trading(self, enable=True):
+        pass
+
+    def close(self):
+        pass
+
+
+class AsyncReplayExchange(ReplayExchange):
+    """ReplayExchange for the async trading loops."""
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        async def call(*args, **kwargs):
+            recorded = self._next(name, args, kwargs)
+            await asyncio.sleep(self._delay(recorded))
+            return self._answer(recorded)
+        return call
+
+    async def close(self):
+        pass
+
+
+# ----------------------------------------------------------------------
+# Offline profiling of the trading loops
+# ----------------------------------------------------------------------
+def summary(path):
+    header, calls = load_cassette(path)
+    duration = calls[-1]['t'] if calls else 0
+    print(f"{path}: {header.get('exchange')} session of {duration:.0f}s, {len(calls)} calls")
+    by_method = defaultdict(list)
+    for call in calls:
+        by_method[call['method']].append(call)
+    for method, entries in sorted(by_method.items(), key=lambda kv: -len(kv[1])):
+        latency = sorted(c['dt'] for c in entries)
+        errors = sum('error' in c for c in entries)
+        print(f"  {method:<40} {len(entries):>7} calls  p50={1000 * latency[len(latency) // 2]:.0f}ms  "
+              f"max={1000 * latency[-1]:.0f}ms  errors={errors}")
+
+
+async def _run_loops(loop, duration):
+    import main as bot
+    from exchange_setup import init_async_exchange, close_async_exchange
+    from entry_manager import EntryManager
+    from position_manager import PositionManager
+    from trade_logger import TradeLogger
+    from market_snapshot import MarketSnapshot
+
+    exchange = await init_async_exchange()
+    trade_logger = TradeLogger(exchange, 0)
+    snapshot = MarketSnapshot(exchange)
+    await asyncio.to_thread(bot.registry.get)
+    tasks = []
+    if loop in ('entry', 'both'):
+        entry_mgr = EntryManager(exchange, bot.features, bot.ohlcv,
+                                 trade_logger=trade_logger, snapshot=snapshot)
+        tasks.append(asyncio.create_task(bot.entry_loop(entry_mgr)))
+    if loop in ('management', 'both'):
+        pos_mgr = PositionManager(exchange, bot.indicators, bot.ohlcv, None,
+                                  trade_logger=trade_logger, snapshot=snapshot)
+        tasks.append(asyncio.create_task(bot.management_loop(pos_mgr)))
+
+    started = time.monotonic()
+    try:
+        while not exchange.exhausted and time.monotonic() - started < duration:
+            if any(task.done() for task in tasks):
+                break
+            await asyncio.sleep(0.1)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await close_async_exchange(exchange)
+    return exchange, time.monotonic() - started
+
+
+def profile(path, speed, loop, duration, out, selected=None):
+    # Replay from a scratch directory so the run never touches the real trade store
+    from config_setup import MODEL_PATH, MODEL_DIR, SELECTED_CSV
+    path = os.path.abspath(path)
+    os.environ['EXCHANGE_REPLAY'] = path
+    os.environ['REPLAY_SPEED'] = str(speed)
+    os.environ['EXCHANGE_RECORD'] = ''
+    os.environ['FEED_MODE'] = 'rest'
+    os.environ['SELECTED_CSV'] = os.path.abspath(selected or SELECTED_CSV)
+    os.environ['MODEL_PATH'] = os.path.abspath(MODEL_PATH) if MODEL_PATH else ''
+    os.environ['MODEL_DIR'] = os.path.abspath(MODEL_DIR)
+    out = os.path.abspath(out)
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    workdir = tempfile.mkdtemp(prefix='replay_')
+    os.environ['LOG_FILE'] = os.path.join(workdir, 'bot.log')
+    os.chdir(workdir)
+    importlib.reload(importlib.import_module('config_setup'))
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    exchange, elapsed = asyncio.run(_run_loops(loop, duration))
+    profiler.disable()
+    profiler.dump_stats(out)
+
+    served, missed = sum(exchange.served.values()), sum(exchange.missed.values())
+    print(f"Replayed {served}/{len(exchange.calls)} calls in {elapsed:.1f}s "
+          f"({sum(exchange.repeated.values())} repeated, {missed} unanswered) - profile written to {out}")
+    if missed:
+        print(f"Unanswered: {dict(exchange.missed)}")
+    pstats.Stats(out).sort_stats('cumulative').print_stats(25)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect or replay recorded exchange sessions.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    show = commands.add_parser('summary', help='per-method call counts and latencies')
+    show.add_argument('cassette')
+    run = commands.add_parser('profile', help='profile the trading loops against a cassette')
+    run.add_argument('cassette')
+    run.add_argument('--speed', type=float, default=0, help='1 = original timing, 0 = no waiting')
+    run.add_argument('--loop', choices=('entry', 'management', 'both'), default='both')
+    run.add_argument('--duration', type=float, default=300, help='max seconds to run')
+    run.add_argument('--selected', help='selected symbols CSV (default SELECTED_CSV)')
+    run.add_argument('--out', default='logs/replay.prof')
+    args = parser.parse_args()
+    if args.command == 'summary':
+        summary(args.cassette)
+    else:
+        profile(args.cassette, args.speed, args.loop, args.duration, args.out, args.selected)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,29 @@
 # exchange_setup.py
 
+import ssl
+import aiohttp
+import certifi
 import ccxt
-from config_setup import API_KEY, API_SECRET, EXCHANGE_ID
+import ccxt.async_support as ccxt_async
+from config_setup import (
+    API_KEY, API_SECRET, EXCHANGE_ID, HTTP_POOL_SIZE, HTTP_KEEPALIVE,
+    EXCHANGE_RECORD, EXCHANGE_REPLAY
+)
+
+def _recorded(exchange):
+    """Wrap the exchange in a recording proxy when EXCHANGE_RECORD is set."""
+    if not EXCHANGE_RECORD:
+        return exchange
+    from exchange_recorder import RecordingExchange
+    return RecordingExchange(exchange, EXCHANGE_RECORD)
 
 def init_exchange():
+    if EXCHANGE_REPLAY:
+        from exchange_recorder import ReplayExchange
+        return ReplayExchange(EXCHANGE_REPLAY)
+    if EXCHANGE_ID == 'sim':
+        from sim_exchange import SimExchange
+        return _recorded(SimExchange())
     exchange_class = getattr(ccxt, EXCHANGE_ID)
     exchange = exchange_class({
         'apiKey': API_KEY,
@@ -14,5 +34,46 @@ def init_exchange():
 
     # Enable demo mode
     exchange.enable_demo_trading(True)
-    return exchange
+    return _recorded(exchange)
+
+async def init_async_exchange():
+    """
+    Async counterpart of init_exchange for the trading loops.
+
+    All requests go through one aiohttp session whose connector keeps up to
+    HTTP_POOL_SIZE keep-alive connections open, so calls reuse warm TLS
+    connections instead of handshaking per request. Must be called from a
+    running event loop; release it with close_async_exchange.
+    """
+    if EXCHANGE_REPLAY:
+        from exchange_recorder import AsyncReplayExchange
+        return AsyncReplayExchange(EXCHANGE_REPLAY)
+    if EXCHANGE_ID == 'sim':
+        from sim_exchange import AsyncSimExchange
+        return _recorded(AsyncSimExchange())
+    connector = aiohttp.TCPConnector(
+        limit=HTTP_POOL_SIZE,
+        keepalive_timeout=HTTP_KEEPALIVE,
+        ttl_dns_cache=300,
+        enable_cleanup_closed=True,
+        ssl=ssl.create_default_context(cafile=certifi.where()),
+    )
+    session = aiohttp.ClientSession(connector=connector, trust_env=True)
+    exchange_class = getattr(ccxt_async, EXCHANGE_ID)
+    exchange = exchange_class({
+        'apiKey': API_KEY,
+        'secret': API_SECRET,
+        'enableRateLimit': True,
+        'session': session,
+    })
+
+    # Enable demo mode
+    exchange.enable_demo_trading(True)
+    return _recorded(exchange)
 
+async def close_async_exchange(exchange):
+    """Close the exchange and the shared session it was given."""
+    session = exchange.session
+    await exchange.close()
+    if session is not None:
+        await session.close()
@@ -0,0 +1,329 @@
+## File: feature_pipeline.py
+
+import math
+import threading
+from collections import deque
+import ccxt
+import numpy as np
+import pandas as pd
+from config_setup import STOCH_RSI_PERIOD, fastk_period, fastd_period, TIMEFRAME, FETCH_LIMIT
+from indicator_engine import _Ema, _Window, NAN
+
+# Model inputs, in the order the signal model was trained on
+BASE_FEATURES = [
+    'ema_12', 'ema_26', 'macd_hist', 'rsi_14', 'stochrsi_k', 'stochrsi_d', 'cci_20',
+    'atr_14', 'obv', 'bull_bear', 'vol_ratio', 'volatility_30m', 'vwap'
+]
+LAGGED_FEATURES = BASE_FEATURES[:-1]  # everything except vwap
+LAGS = (1, 2, 3)
+FEATURES = BASE_FEATURES + [f'{f}_lag{lag}' for f in LAGGED_FEATURES for lag in LAGS]
+
+EMA_12, EMA_26, MACD_SIGNAL_PERIOD, ELDER_PERIOD = 12, 26, 9, 13
+RSI_14, CCI_20, ATR_14, VOL_RATIO_PERIOD = 14, 20, 14, 20
+OBV_PERIOD = 20  # OBV is summed over a window so it does not depend on where the series starts
+DAY_MS = 86_400_000
+PARITY_TOLERANCE = 1e-6  # relative; what the EMAs' seed still contributes after FETCH_LIMIT bars
+
+_LAGGED_IDX = [BASE_FEATURES.index(f) for f in LAGGED_FEATURES]
+
+
+def volatility_window(timeframe=TIMEFRAME):
+    """Number of bars spanning 30 minutes (at least 2, for a std)."""
+    return max(2, round(1800 / ccxt.Exchange.parse_timeframe(timeframe)))
+
+
+# ----------------------------------------------------------------------
+# Batch mode (training / full history)
+# ----------------------------------------------------------------------
+def _ewm(x, alpha):
+    return pd.Series(x).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+
+
+def _rolling_mean(x, n):
+    return pd.Series(x).rolling(n).mean().to_numpy()
+
+
+def compute_features(ts, values, timeframe=TIMEFRAME):
+    """
+    Full feature matrix (n x len(FEATURES)) for one series.
+
+    `ts` are bar open times in ms and `values` the OHLCV rows, as held by
+    OHLCVBuffer.arrays(). Every recurrence is seeded on the first bar exactly
+    as FeatureState seeds it, and nothing accumulates from the start of the
+    series, so the last row matches what live mode produces from its shorter
+    buffer (see live_parity).
+    """
+    ts = np.asarray(ts, dtype=np.int64)
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    _, high, low, close, volume = values.T
+    base = np.full((n, len(BASE_FEATURES)), NAN)
+    if n == 0:
+        return np.full((0, len(FEATURES)), NAN)
+
+    ema_12 = _ewm(close, 2 / (EMA_12 + 1))
+    ema_26 = _ewm(close, 2 / (EMA_26 + 1))
+    macd = ema_12 - ema_26
+    macd_hist = macd - _ewm(macd, 2 / (MACD_SIGNAL_PERIOD + 1))
+
+    # Wilder RSI on close-to-close changes, seeded on the first change
+    rsi = np.full(n, NAN)
+    if n > 1:
+        diff = np.diff(close)
+        up = _ewm(np.where(diff > 0, diff, 0.0), 1 / RSI_14)
+        down = _ewm(np.where(diff < 0, -diff, 0.0), 1 / RSI_14)
+        total = up + down
+        with np.errstate(invalid='ignore', divide='ignore'):
+            rsi[1:] = np.where(total == 0, 50.0, 100.0 * up / total)
+
+    # StochRSI over the RSI series (0 for a flat window)
+    raw = np.full(n, NAN)
+    if n > STOCH_RSI_PERIOD:
+        windows = np.lib.stride_tricks.sliding_window_view(rsi[1:], STOCH_RSI_PERIOD)
+        lo, hi = windows.min(axis=1), windows.max(axis=1)
+        cur = rsi[STOCH_RSI_PERIOD:]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            raw[STOCH_RSI_PERIOD:] = np.where(hi == lo, 0.0, (cur - lo) / (hi - lo))
+    stoch_k = _rolling_mean(raw, fastk_period)
+    stoch_d = _rolling_mean(stoch_k, fastd_period)
+
+    # CCI on typical price
+    tp = (high + low + close) / 3
+    cci = np.full(n, NAN)
+    if n >= CCI_20:
+        windows = np.lib.stride_tricks.sliding_window_view(tp, CCI_20)
+        mean = windows.mean(axis=1)
+        mad = np.abs(windows - mean[:, None]).mean(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cci[CCI_20 - 1:] = np.where(mad == 0, 0.0, (tp[CCI_20 - 1:] - mean) / (0.015 * mad))
+
+    # Wilder ATR; the first true range is the bar's own range
+    prev_close = np.concatenate([[close[0]], close[:-1]])
+    tr = np.maximum.reduce([high - low, np.abs(high - prev_close), np.abs(low - prev_close)])
+    tr[0] = high[0] - low[0]
+    atr = _ewm(tr, 1 / ATR_14)
+
+    obv = np.full(n, NAN)
+    if n > OBV_PERIOD:
+        signed = np.sign(np.diff(close)) * volume[1:]
+        obv[OBV_PERIOD:] = np.lib.stride_tricks.sliding_window_view(signed, OBV_PERIOD).sum(axis=1)
+    ema_13 = _ewm(close, 2 / (ELDER_PERIOD + 1))
+    bull_bear = (high - ema_13) + (low - ema_13)  # Elder bull power + bear power
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        vol_ratio = volume / _rolling_mean(volume, VOL_RATIO_PERIOD)
+    log_ret = np.full(n, NAN)
+    log_ret[1:] = np.log(close[1:] / close[:-1])
+    volatility = pd.Series(log_ret).rolling(volatility_window(timeframe)).std().to_numpy()
+
+    # VWAP anchored to the UTC day
+    day = ts // DAY_MS
+    starts = np.concatenate([[True], day[1:] != day[:-1]])
+    group = np.cumsum(starts) - 1
+    pv, vv = tp * volume, volume.copy()
+    cum_pv, cum_v = np.cumsum(pv), np.cumsum(vv)
+    first = np.flatnonzero(starts)
+    offset_pv = np.concatenate([[0.0], cum_pv[first[1:] - 1]])[group]
+    offset_v = np.concatenate([[0.0], cum_v[first[1:] - 1]])[group]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        vwap = np.where(cum_v - offset_v == 0, close, (cum_pv - offset_pv) / (cum_v - offset_v))
+
+    for i, col in enumerate((ema_12, ema_26, macd_hist, rsi, stoch_k * 100, stoch_d * 100, cci,
+                             atr, obv, bull_bear, vol_ratio, volatility, vwap)):
+        base[:, i] = col
+
+    out = np.full((n, len(FEATURES)), NAN)
+    out[:, :len(BASE_FEATURES)] = base
+    col = len(BASE_FEATURES)
+    for i in _LAGGED_IDX:
+        for lag in LAGS:
+            out[lag:, col] = base[:-lag, i]
+            col += 1
+    return out
+
+
+def feature_frame(df, timeframe=TIMEFRAME):
+    """FEATURES as a DataFrame for an OHLCV frame indexed by timestamp."""
+    ts = df.index.as_unit('ms').asi8 if isinstance(df.index, pd.DatetimeIndex) else df['timestamp'].to_numpy()
+    values = df[['open', 'high', 'low', 'close', 'volume']].to_numpy(dtype=float)
+    return pd.DataFrame(compute_features(ts, values, timeframe), index=df.index, columns=FEATURES)
+
+
+# ----------------------------------------------------------------------
+# Live mode (last row only)
+# ----------------------------------------------------------------------
+class _Stats(_Window):
+    """_Window with the spread statistics the features need."""
+
+    def sum(self, x, commit=True):
+        vals = self._values(x, commit)
+        if len(vals) < self.n:
+            return NAN
+        return sum(vals)
+
+    def std(self, x, commit=True):
+        vals = self._values(x, commit)
+        if len(vals) < self.n:
+            return NAN
+        mean = sum(vals) / self.n
+        return math.sqrt(sum((v - mean) ** 2 for v in vals) / (self.n - 1))
+
+    def cci(self, x, commit=True):
+        vals = self._values(x, commit)
+        if len(vals) < self.n:
+            return NAN
+        mean = sum(vals) / self.n
+        mad = sum(abs(v - mean) for v in vals) / self.n
+        return 0.0 if mad == 0 else (x - mean) / (0.015 * mad)
+
+
+class FeatureState:
+    """
+    Streaming feature state for one (symbol, timeframe) series.
+
+    Like IndicatorState, closed bars are committed and the forming bar is
+    evaluated without mutating anything. Lagged features come from a ring
+    buffer of the last committed rows.
+    """
+
+    def __init__(self, timeframe=TIMEFRAME):
+        self.ema_12 = _Ema(2 / (EMA_12 + 1))
+        self.ema_26 = _Ema(2 / (EMA_26 + 1))
+        self.macd_signal = _Ema(2 / (MACD_SIGNAL_PERIOD + 1))
+        self.ema_13 = _Ema(2 / (ELDER_PERIOD + 1))
+        self.rsi_up = _Ema(1 / RSI_14)
+        self.rsi_down = _Ema(1 / RSI_14)
+        self.stoch_window = _Window(STOCH_RSI_PERIOD)
+        self.stoch_k = _Window(fastk_period)
+        self.stoch_d = _Window(fastd_period)
+        self.cci = _Stats(CCI_20)
+        self.atr = _Ema(1 / ATR_14)
+        self.vol_ma = _Window(VOL_RATIO_PERIOD)
+        self.volatility = _Stats(volatility_window(timeframe))
+        self.obv = _Stats(OBV_PERIOD)
+        self.prev_close = None
+        self.day = None
+        self.cum_pv = 0.0
+        self.cum_v = 0.0
+        self.lags = deque(maxlen=max(LAGS))  # committed base rows, newest last
+        self.last_ts = None
+
+    def step(self, ts, high, low, close, volume, commit=True):
+        ema_12 = self.ema_12.step(close, commit)
+        ema_26 = self.ema_26.step(close, commit)
+        macd = ema_12 - ema_26
+        macd_hist = macd - self.macd_signal.step(macd, commit)
+
+        rsi = k = d = log_ret = obv = NAN
+        if self.prev_close is None:
+            tr = high - low
+        else:
+            diff = close - self.prev_close
+            up = self.rsi_up.step(diff if diff > 0 else 0.0, commit)
+            down = self.rsi_down.step(-diff if diff < 0 else 0.0, commit)
+            rsi = 50.0 if up + down == 0 else 100.0 * up / (up + down)
+            raw = self.stoch_window.stoch(rsi, commit)
+            if not math.isnan(raw):
+                k = self.stoch_k.mean(raw, commit)
+                if not math.isnan(k):
+                    d = self.stoch_d.mean(k, commit)
+            tr = max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+            obv = self.obv.sum(volume if diff > 0 else -volume if diff < 0 else 0.0, commit)
+            log_ret = math.log(close / self.prev_close)
+        volatility = NAN if math.isnan(log_ret) else self.volatility.std(log_ret, commit)
+
+        tp = (high + low + close) / 3
+        cci = self.cci.cci(tp, commit)
+        atr = self.atr.step(tr, commit)
+        ema_13 = self.ema_13.step(close, commit)
+        vol_ma = self.vol_ma.mean(volume, commit)
+        vol_ratio = NAN if math.isnan(vol_ma) or vol_ma == 0 else volume / vol_ma
+
+        day = ts // DAY_MS
+        cum_pv, cum_v = (self.cum_pv, self.cum_v) if day == self.day else (0.0, 0.0)
+        cum_pv += tp * volume
+        cum_v += volume
+        vwap = close if cum_v == 0 else cum_pv / cum_v
+
+        base = (ema_12, ema_26, macd_hist, rsi, k * 100, d * 100, cci, atr, obv,
+                (high - ema_13) + (low - ema_13), vol_ratio, volatility, vwap)
+        row = np.full(len(FEATURES), NAN)
+        row[:len(BASE_FEATURES)] = base
+        col = len(BASE_FEATURES)
+        for i in _LAGGED_IDX:
+            for lag in LAGS:
+                if lag <= len(self.lags):
+                    row[col] = self.lags[-lag][i]
+                col += 1
+
+        if commit:
+            self.prev_close = close
+            self.day, self.cum_pv, self.cum_v = day, cum_pv, cum_v
+            self.lags.append(base)
+        return row
+
+
+class FeaturePipeline:
+    """
+    Live FEATURES rows per (symbol, timeframe), computed from OHLCV buffers.
+
+    `update` takes the (timestamps, values) arrays an OHLCVBuffer exposes,
+    steps only the bars closed since the last call and evaluates the last
+    (forming) bar, returning just that row. The first call for a series (or
+    one after a gap the buffer no longer covers) seeds from all given bars.
+    """
+
+    def __init__(self, timeframe=TIMEFRAME):
+        self.timeframe = timeframe
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def reset(self, symbol=None, timeframe=None):
+        with self._lock:
+            if symbol is None:
+                self._states.clear()
+            else:
+                self._states.pop((symbol, timeframe), None)
+
+    def update(self, symbol, timeframe, ts, values):
+        if len(ts) == 0:
+            return None
+        key = (symbol, timeframe)
+        with self._lock:
+            state = self._states.get(key)
+            start = 0
+            if state is not None and state.last_ts is not None:
+                pos = np.searchsorted(ts, state.last_ts)
+                if pos < len(ts) and ts[pos] == state.last_ts and pos + 1 < len(ts):
+                    start = pos + 1
+                else:
+                    state = None
+            if state is None:
+                state = FeatureState(timeframe)
+                self._states[key] = state
+
+            last = len(ts) - 1
+            for i in range(start, last):
+                state.step(int(ts[i]), *values[i, 1:5])
+            if last > 0:
+                state.last_ts = int(ts[last - 1])
+            return state.step(int(ts[last]), *values[last, 1:5], commit=False)
+
+    def update_buffer(self, symbol, timeframe, buffer, n=FETCH_LIMIT):
+        """`update` straight from an OHLCVBuffer."""
+        ts, values = buffer.arrays(n)
+        return self.update(symbol, timeframe, ts, values)
+
+
+def live_parity(ts, values, timeframe=TIMEFRAME, window=FETCH_LIMIT, tolerance=PARITY_TOLERANCE):
+    """
+    FEATURES whose last row differs between batch mode over the whole series
+    and live mode seeded on only its last `window` bars, as the bot is.
+    Empty when training and serving agree.
+    """
+    if len(ts) <= window:
+        return []
+    batch = compute_features(ts, values, timeframe)[-1]
+    live = FeaturePipeline(timeframe).update(None, timeframe, ts[-window:], np.asarray(values)[-window:])
+    close = np.isclose(live, batch, rtol=tolerance, atol=tolerance, equal_nan=True)
+    return [name for name, ok in zip(FEATURES, close) if not ok]
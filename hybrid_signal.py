@@ -1,31 +1,158 @@
-import joblib
 import numpy as np
+import pandas as pd
+from model_registry import ModelRegistry
+from feature_pipeline import FEATURES
 
-# Load trained model and define features
-model = joblib.load('models/10m_WedMay2816:06:362025_lgbm_model.pkl')
+TREE_FORMAT = 1
+# LightGBM missing-value modes, per split node
+MISSING_NONE, MISSING_ZERO, MISSING_NAN = 0, 1, 2
+ZERO_THRESHOLD = 1e-35
 
-FEATURES = [
-    'ema_12','ema_26','macd_hist','rsi_14','stochrsi_k','stochrsi_d','cci_20',
-    'atr_14','obv','bull_bear','vol_ratio','volatility_30m','vwap'
-] + [f'{f}_lag{lag}' for f in [
-    'ema_12','ema_26','macd_hist','rsi_14','stochrsi_k',
-    'stochrsi_d','cci_20','atr_14','obv','bull_bear',
-    'vol_ratio','volatility_30m'
-] for lag in (1,2,3)]
+class TreeEnsemble:
+    '''
+    A tree ensemble exported by `model_training.py --export` as flat node
+    arrays (.npz), scored with NumPy alone: every (row, tree) pair descends
+    one level per step and drops out at its leaf. Probabilities match the
+    source model's predict_proba; loading it imports no ML library and no
+    pickle.
+    '''
+
+    def __init__(self, arrays):
+        feature = arrays['feature']             # split feature per node, -1 at leaves
+        # Renumber internal nodes before leaves, so "still inside a tree" is node < n_internal
+        internal = feature >= 0
+        order = np.concatenate([np.flatnonzero(internal), np.flatnonzero(~internal)])
+        renumber = np.empty(len(order), dtype=np.int32)
+        renumber[order] = np.arange(len(order), dtype=np.int32)
+        self.n_internal = int(internal.sum())
+        leaf = ~internal[order]
+        nodes = np.arange(len(order), dtype=np.int32)
+        # children[2 * node + went_right]; leaves point at themselves
+        self.children = np.column_stack([np.where(leaf, nodes, renumber[arrays['left'][order]]),
+                                         np.where(leaf, nodes, renumber[arrays['right'][order]])]).ravel()
+        self.feature = np.where(leaf, 0, feature[order]).astype(np.int32)
+        self.threshold = arrays['threshold'][order]
+        self.default_left = arrays['default_left'][order]
+        self.missing_type = arrays['missing_type'][order]
+        self.zero_missing = bool((self.missing_type == MISSING_ZERO).any())
+        self.value = arrays['value'][order]     # (nodes, outputs) leaf contributions
+        self.roots = renumber[arrays['roots']]
+        self.intercept = arrays['intercept']
+        self.classes_ = arrays['classes']
+        self.feature_names_in_ = arrays['features']
+        self.n_features_in_ = len(self.feature_names_in_)
+        self.link = str(arrays['link'])         # 'softmax', 'sigmoid' or 'mean'
+        self.scale = float(arrays['scale'])
+        self.strict = bool(arrays['strict'])    # x < threshold (XGBoost) instead of <=
+        self.dtype = np.dtype(str(arrays['input_dtype']))  # inputs are rounded as the source model rounds them
+        if self.link != 'mean':
+            # A boosted tree adds to one output: sum its leaves with one matmul
+            tree = np.searchsorted(arrays['roots'], np.arange(len(order)), 'right')[order] - 1
+            scored = (self.value != 0).any(axis=1)
+            self.leaf_value = self.value.sum(axis=1)
+            self.tree_output = np.zeros((len(self.roots), self.value.shape[1]))
+            self.tree_output[tree[scored], np.abs(self.value[scored]).argmax(axis=1)] = 1
+
+    @classmethod
+    def load(cls, path, features=None):
+        with np.load(path, allow_pickle=False) as npz:
+            arrays = {name: npz[name] for name in npz.files}
+        if int(arrays['format']) != TREE_FORMAT:
+            raise ValueError(f"{path}: unsupported tree format {arrays['format']}")
+        model = cls(arrays)
+        if features is not None and list(model.feature_names_in_) != list(features):
+            raise ValueError(f"{path}: exported for features {list(model.feature_names_in_)}")
+        return model
+
+    def leaves(self, X):
+        '''(rows, trees) leaf node each row reaches in each tree.'''
+        n, n_trees = len(X), len(self.roots)
+        flat = np.ascontiguousarray(X).ravel()
+        leaf = np.tile(self.roots, n)
+        offset = np.repeat(np.arange(n, dtype=np.int32) * X.shape[1], n_trees)
+        # Missing-value routing only matters when the rows hold NaN (or zeros LightGBM treats as missing)
+        missing_values = bool(np.isnan(flat).any()
+                              or (self.zero_missing and (np.abs(flat) <= ZERO_THRESHOLD).any()))
+        active = np.flatnonzero(leaf < self.n_internal)
+        node, offset = leaf[active], offset[active]
+        while len(active):
+            x = flat[offset + self.feature[node]]
+            threshold = self.threshold[node]
+            if missing_values:
+                missing_type = self.missing_type[node]
+                nan = np.isnan(x)
+                # LightGBM reads NaN as 0 unless the split routes NaN itself
+                x = np.where(nan & (missing_type != MISSING_NAN), 0, x)
+                missing = ((nan & (missing_type == MISSING_NAN))
+                           | ((missing_type == MISSING_ZERO) & (np.abs(x) <= ZERO_THRESHOLD)))
+                right = np.where(missing, ~self.default_left[node], x >= threshold if self.strict else x > threshold)
+            else:
+                right = x >= threshold if self.strict else x > threshold
+            node = self.children[2 * node + right]
+            leaf[active] = node
+            inner = node < self.n_internal
+            active, node, offset = active[inner], node[inner], offset[inner]
+        return leaf.reshape(n, n_trees)
+
+    def predict_proba(self, X):
+        X = np.asarray(X, dtype=self.dtype)
+        if X.ndim == 1:
+            X = X[None, :]
+        leaves = self.leaves(X)
+        if self.link == 'mean':
+            return self.value[leaves].sum(axis=1) / len(self.roots)
+        raw = self.leaf_value[leaves] @ self.tree_output
+        raw = (raw + self.intercept) * self.scale
+        if self.link == 'sigmoid':
+            p = 1 / (1 + np.exp(-raw[:, 0]))
+            return np.column_stack([1 - p, p])
+        raw = np.exp(raw - raw.max(axis=1, keepdims=True))
+        return raw / raw.sum(axis=1, keepdims=True)
+
+# The model itself is loaded on first use; exported .npz ensembles skip the ML stack
+registry = ModelRegistry(features=FEATURES, loaders={'.npz': lambda path: TreeEnsemble.load(path, FEATURES)})
 
 def generate_signal(df):
-    if len(df) < 1 or not all(col in df.columns for col in FEATURES):
-        return None, 0.0
+    return generate_signals({None: df})[None]
+
+def generate_signals(frames):
+    '''
+    Signals for many symbols on the current bar with one predict_proba call.
+
+    `frames` maps symbol -> a DataFrame holding FEATURES columns or a FEATURES
+    row from feature_pipeline; returns symbol -> (signal, confidence). The class is the argmax of the probabilities, which is what
+    model.predict would return, so each row costs a single ensemble pass.
+    '''
+    signals = {}
+    rows = []
+    for symbol, df in frames.items():
+        if isinstance(df, np.ndarray) and df.shape == (len(FEATURES),):
+            rows.append((symbol, df))
+        elif df is None or len(df) < 1 or not all(col in df.columns for col in FEATURES):
+            signals[symbol] = (None, 0.0)
+        else:
+            rows.append((symbol, df[FEATURES].to_numpy()[-1]))
+    if not rows:
+        return signals
 
-    # Prepare feature vector
-    #latest = df[FEATURES].iloc[-1].values.reshape(1, -1)
-    latest = df[FEATURES].iloc[[-1]]
+    # One feature matrix for every symbol
+    preds, confidence = score_features(np.vstack([row for _, row in rows]))
+    for (symbol, _), pred, conf in zip(rows, preds, confidence):
+        signals[symbol] = _to_signal(pred, conf)
+    return signals
 
-    # Model prediction
-    pred = model.predict(latest)[0]
-    proba = model.predict_proba(latest)[0]
-    confidence = np.max(proba)  # Use maximum probability
+def score_features(matrix):
+    '''Predicted class and confidence for each FEATURES row of `matrix`.'''
+    model = registry.get()  # one model for the whole batch, even mid-swap
+    if isinstance(model, TreeEnsemble):
+        proba = model.predict_proba(matrix)
+    else:
+        # Keep the column names the model was fit with
+        proba = model.predict_proba(pd.DataFrame(matrix, columns=FEATURES))
+    preds = model.classes_[np.argmax(proba, axis=1)]
+    return preds, np.max(proba, axis=1)  # Use maximum probability
 
+def _to_signal(pred, confidence):
     # Map prediction to signal
     signal_map = {
         0: ('sell', confidence),
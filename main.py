@@ -1,13 +1,21 @@
 import asyncio
 import logging
-import time
+import os
 import pandas as pd
 import sys
-from config_setup import SYMBOL_CHECK_INTERVAL, SELECTED_CSV, LOG_FILE
+from config_setup import SYMBOL_CHECK_INTERVAL, SELECTED_CSV, LOG_FILE, FEED_MODE, TIMEFRAME, METRICS_PORT
 from symbol_selector import select_latest_symbols
-from exchange_setup import init_exchange
+from exchange_setup import init_async_exchange, close_async_exchange
 from entry_manager import EntryManager
 from position_manager import PositionManager
+from indicator_engine import IndicatorEngine
+from feature_pipeline import FeaturePipeline
+from ohlcv_cache import OHLCVCache
+from market_feed import MarketFeed
+from trade_logger import TradeLogger
+from market_snapshot import MarketSnapshot
+from hybrid_signal import registry
+from metrics import metrics
 
 # Setup logging
 logging.basicConfig(
@@ -17,10 +25,10 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Initialize exchange and managers
-exchange = init_exchange()
-entry_mgr = EntryManager(exchange)
-pos_mgr = PositionManager(exchange)
+# Exchange-independent state shared by both managers
+indicators = IndicatorEngine()
+features = FeaturePipeline()
+ohlcv = OHLCVCache()
 
 async def symbol_updater():
     """Refresh the list of trading symbols periodically."""
@@ -32,48 +40,98 @@ async def symbol_updater():
             logger.error(f"Symbol update error: {e}")
         await asyncio.sleep(SYMBOL_CHECK_INTERVAL)
 
-async def entry_loop():
+async def entry_loop(entry_mgr, feed=None):
     """Check and place new entries for selected symbols."""
+    if feed is not None:
+        return await feed_entry_loop(entry_mgr, feed)
     while True:
         symbols = pd.read_csv(SELECTED_CSV)['symbol'].tolist()
-        for symbol in symbols:
-            try:
-                await entry_mgr.check_and_place(symbol)
-            except Exception as e:
-                logger.error(f"EntryManager error for {symbol}: {e}")
+        with metrics.span('loop_iteration_seconds', loop='entry'):
+            await entry_mgr.scan(symbols)
         await asyncio.sleep(5)
 
-def management_loop():
-    """Synchronous loop to manage open positions continuously."""
+async def feed_entry_loop(entry_mgr, feed):
+    """Check entries as soon as the feed pushes a bar update for a symbol."""
+    updates = feed.listen('kline')
+    while True:
+        symbols = pd.read_csv(SELECTED_CSV)['symbol'].tolist()
+        await feed.subscribe_klines(symbols, TIMEFRAME)
+        pending = [await updates.get()]
+        metrics.set('queue_depth', updates.qsize() + 1, queue='kline_updates')
+        while not updates.empty():
+            pending.append(updates.get_nowait())
+        changed = {symbol for symbol, timeframe, _ in pending if timeframe == TIMEFRAME}
+        with metrics.span('loop_iteration_seconds', loop='entry'):
+            await entry_mgr.scan([s for s in symbols if s in changed])
+
+async def management_loop(pos_mgr, feed=None):
+    """Manage open positions continuously."""
     while True:
         try:
-            pos_mgr.update_positions()
+            with metrics.span('loop_iteration_seconds', loop='management'):
+                await pos_mgr.update_positions()
         except Exception as e:
             logger.error(f"PositionManager error: {e}")
-        time.sleep(2)
+        if feed is not None:
+            # Wake early when the feed reports a position or bar change
+            try:
+                await asyncio.wait_for(feed.position_event.wait(), 2)
+            except asyncio.TimeoutError:
+                pass
+            feed.position_event.clear()
+        else:
+            await asyncio.sleep(2)
 
 async def main():
+    # Initialize exchange and managers
+    exchange = await init_async_exchange()
+    initial_balance = None
+    if not os.path.exists('balance_config.json'):
+        initial_balance = (await exchange.fetch_balance())['USDT']['total']
+    trade_logger = TradeLogger(exchange, initial_balance)
+    snapshot = MarketSnapshot(exchange)
+    feed = MarketFeed(exchange, ohlcv) if FEED_MODE == 'ws' else None
+    entry_mgr = EntryManager(exchange, features, ohlcv,
+                             trade_logger=trade_logger, snapshot=snapshot)
+    pos_mgr = PositionManager(exchange, indicators, ohlcv, feed,
+                              trade_logger=trade_logger, snapshot=snapshot)
+
+    # Load the signal model up front rather than on the first scan
+    await asyncio.to_thread(registry.get)
+
     # Initial cleanup run before starting loops
     try:
         logger.info("Running initial position cleanup before starting loops...")
-        pos_mgr.update_positions()
+        await pos_mgr.update_positions()
     except Exception as e:
         logger.error(f"Initial cleanup error: {e}")
 
+    tasks = [asyncio.create_task(registry.watch())]
+    if METRICS_PORT:
+        tasks.append(asyncio.create_task(metrics.serve()))
+    if feed is not None:
+        tasks.append(asyncio.create_task(feed.run()))
+
     # Schedule management loop as background task first
-    management_task = asyncio.create_task(asyncio.to_thread(management_loop))
+    management_task = asyncio.create_task(management_loop(pos_mgr, feed))
     # Then start symbol and entry loops
     symbol_task = asyncio.create_task(symbol_updater())
-    entry_task = asyncio.create_task(entry_loop())
+    entry_task = asyncio.create_task(entry_loop(entry_mgr, feed))
 
     # Await all tasks
-    await asyncio.gather(management_task, symbol_task, entry_task)
+    try:
+        await asyncio.gather(management_task, symbol_task, entry_task, *tasks)
+    except asyncio.CancelledError:
+        # asyncio.run cancels us on Ctrl-C; the exchange session is still open here
+        logger.info('Recieved shutdown signal, closing all positions...')
+        await pos_mgr.close_all_positions()
+        logger.info('All positions closed. Exiting.')
+        raise
+    finally:
+        await close_async_exchange(exchange)
 
 if __name__ == '__main__':
     try:
         asyncio.run(main())
     except (KeyboardInterrupt, SystemExit):
-        logger.info('Recieved shutdown signal, closing all positions...')
-        pos_mgr.close_all_positions()
-        logger.info('All positions closed. Exiting.')
         sys.exit(0)
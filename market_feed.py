@@ -0,0 +1,293 @@
+## File: market_feed.py
+
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import time
+import aiohttp
+from config_setup import (
+    API_KEY, API_SECRET,
+    WS_PUBLIC_URL, WS_PRIVATE_URL,
+    WS_PING_INTERVAL, WS_MAX_BACKOFF
+)
+from ohlcv_cache import OHLCVCache, timeframe_ms
+
+logger = logging.getLogger(__name__)
+
+# ccxt timeframe -> Bybit V5 kline interval
+INTERVALS = {
+    '1m': '1', '3m': '3', '5m': '5', '15m': '15', '30m': '30',
+    '1h': '60', '2h': '120', '4h': '240', '6h': '360', '12h': '720',
+    '1d': 'D', '1w': 'W', '1M': 'M',
+}
+TIMEFRAMES = {v: k for k, v in INTERVALS.items()}
+SUBSCRIBE_BATCH = 10  # Bybit caps the number of args per subscribe request
+
+
+def kline_topic(symbol, timeframe):
+    return f'kline.{INTERVALS[timeframe]}.{symbol}'
+
+
+def _parse_kline(k):
+    return [int(k['start']), float(k['open']), float(k['high']),
+            float(k['low']), float(k['close']), float(k['volume'])]
+
+
+class MarketFeed:
+    """
+    Push-based market data speaking the Bybit V5 websocket protocol.
+
+    Kline updates are merged into the shared OHLCVCache, which is then
+    marked as streaming so cache reads skip REST entirely. Tickers and
+    positions are kept as the latest snapshot per symbol. Consumers either
+    read those snapshots or `listen()` for events. On every (re)connect the
+    feed backfills through REST whatever it may have missed, and any kline
+    gap detected mid-stream is backfilled before the new bar is merged.
+    Timeframes the cache derives from its base series are served by
+    streaming the base klines; their kline events are published as the
+    base bars that build them arrive.
+    """
+
+    def __init__(self, exchange=None, ohlcv=None,
+                 public_url=WS_PUBLIC_URL, private_url=WS_PRIVATE_URL,
+                 api_key=API_KEY, api_secret=API_SECRET):
+        self.exchange = exchange
+        self.ohlcv = ohlcv or OHLCVCache()
+        self.public_url = public_url
+        self.private_url = private_url
+        self.api_key = api_key
+        self.api_secret = api_secret
+
+        self.klines = set()        # (symbol, timeframe)
+        self.derived = {}          # symbol -> timeframes built from its base klines
+        self.ticker_symbols = set()
+        self.tickers = {}          # symbol -> raw Bybit ticker fields
+        self.positions = {}        # symbol -> unified ccxt position
+        self.public_live = False
+        self.private_live = False
+        # Set whenever something relevant to open positions changes, so the
+        # management loop can wake up instead of sleeping blind.
+        self.position_event = asyncio.Event()
+
+        self._public_ws = None
+        self._private_ws = None
+        self._listeners = {'kline': [], 'ticker': [], 'position': []}
+
+    # ------------------------------------------------------------------
+    # Subscriptions
+    # ------------------------------------------------------------------
+    def listen(self, kind, maxsize=0):
+        """Return a queue receiving ('kline'|'ticker'|'position') events."""
+        queue = asyncio.Queue(maxsize)
+        self._listeners[kind].append(queue)
+        return queue
+
+    async def subscribe_klines(self, symbols, timeframe):
+        if self.ohlcv.derives(timeframe):
+            new = [s for s in symbols if timeframe not in self.derived.get(s, ())]
+            for symbol in new:
+                await self._backfill_klines(symbol, timeframe)
+                self.derived.setdefault(symbol, set()).add(timeframe)
+            timeframe = self.ohlcv.base_timeframe
+        new = [(s, timeframe) for s in symbols if (s, timeframe) not in self.klines]
+        if not new:
+            return
+        for symbol, tf in new:
+            await self._backfill_klines(symbol, tf)
+        self.klines.update(new)
+        await self._send(self._public_ws, [kline_topic(s, tf) for s, tf in new])
+        if self.public_live:
+            for symbol, tf in new:
+                self.ohlcv.set_streaming(symbol, tf, True)
+
+    async def subscribe_tickers(self, symbols):
+        new = [s for s in symbols if s not in self.ticker_symbols]
+        if not new:
+            return
+        self.ticker_symbols.update(new)
+        await self._send(self._public_ws, [f'tickers.{s}' for s in new])
+
+    def mark_price(self, symbol):
+        ticker = self.tickers.get(symbol)
+        if not self.public_live or not ticker or not ticker.get('markPrice'):
+            return None
+        return float(ticker['markPrice'])
+
+    def position_list(self):
+        return list(self.positions.values())
+
+    # ------------------------------------------------------------------
+    # Connection handling
+    # ------------------------------------------------------------------
+    async def run(self):
+        async with aiohttp.ClientSession() as session:
+            tasks = [self._run_socket(session, private=False)]
+            if self.private_url and self.api_key and self.api_secret:
+                tasks.append(self._run_socket(session, private=True))
+            await asyncio.gather(*tasks)
+
+    async def _run_socket(self, session, private):
+        url = self.private_url if private else self.public_url
+        backoff = 1
+        while True:
+            try:
+                async with session.ws_connect(url) as ws:
+                    logger.info(f"Feed connected: {url}")
+                    if private:
+                        await self._authenticate(ws)
+                        self._private_ws = ws
+                        await self._send(ws, ['position'])
+                        await self._backfill_positions()
+                        self.private_live = True
+                    else:
+                        self._public_ws = ws
+                        await self._send(ws, [kline_topic(s, tf) for s, tf in self.klines])
+                        await self._send(ws, [f'tickers.{s}' for s in self.ticker_symbols])
+                        for symbol, tf in list(self.klines):
+                            await self._backfill_klines(symbol, tf)
+                        self._set_public_live(True)
+                    backoff = 1
+                    await self._consume(ws)
+            except (aiohttp.ClientError, asyncio.TimeoutError, ConnectionError, ValueError) as e:
+                logger.warning(f"Feed error on {url}: {e}")
+            finally:
+                if private:
+                    self._private_ws = None
+                    self.private_live = False
+                else:
+                    self._public_ws = None
+                    self._set_public_live(False)
+            logger.info(f"Feed reconnecting to {url} in {backoff}s")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, WS_MAX_BACKOFF)
+
+    def _set_public_live(self, live):
+        self.public_live = live
+        for symbol, tf in self.klines:
+            self.ohlcv.set_streaming(symbol, tf, live)
+
+    async def _authenticate(self, ws):
+        expires = int((time.time() + 10) * 1000)
+        signature = hmac.new(
+            self.api_secret.encode(), f'GET/realtime{expires}'.encode(), hashlib.sha256
+        ).hexdigest()
+        await ws.send_json({'op': 'auth', 'args': [self.api_key, expires, signature]})
+        reply = await ws.receive_json(timeout=10)
+        if not reply.get('success'):
+            raise ConnectionError(f"Feed auth rejected: {reply.get('ret_msg')}")
+
+    async def _send(self, ws, topics):
+        if ws is None or ws.closed:
+            return
+        for i in range(0, len(topics), SUBSCRIBE_BATCH):
+            await ws.send_json({'op': 'subscribe', 'args': topics[i:i + SUBSCRIBE_BATCH]})
+
+    async def _ping(self, ws):
+        while not ws.closed:
+            await asyncio.sleep(WS_PING_INTERVAL)
+            await ws.send_json({'op': 'ping'})
+
+    async def _consume(self, ws):
+        pinger = asyncio.create_task(self._ping(ws))
+        try:
+            async for msg in ws:
+                if msg.type == aiohttp.WSMsgType.TEXT:
+                    await self._dispatch(json.loads(msg.data))
+                elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                    break
+        finally:
+            pinger.cancel()
+
+    # ------------------------------------------------------------------
+    # Message handling
+    # ------------------------------------------------------------------
+    async def _dispatch(self, msg):
+        topic = msg.get('topic')
+        if not topic:
+            if msg.get('op') == 'subscribe' and not msg.get('success', True):
+                logger.error(f"Feed subscribe failed: {msg.get('ret_msg')}")
+            return
+        if topic.startswith('kline.'):
+            await self._on_kline(topic, msg['data'])
+        elif topic.startswith('tickers.'):
+            self._on_ticker(msg['data'])
+        elif topic == 'position':
+            self._on_position(msg['data'])
+
+    async def _on_kline(self, topic, data):
+        _, interval, symbol = topic.split('.', 2)
+        tf = TIMEFRAMES[interval]
+        buf = self.ohlcv.buffer(symbol, tf)
+        for k in data:
+            bar = _parse_kline(k)
+            if buf is not None and buf.last_ts is not None and self.exchange is not None:
+                tf_ms = self.exchange.parse_timeframe(tf) * 1000
+                if bar[0] - buf.last_ts > tf_ms:
+                    logger.info(f"Feed gap on {symbol} {tf}, backfilling")
+                    await self._backfill_klines(symbol, tf)
+            self.ohlcv.merge(symbol, tf, [bar])
+            confirm = bool(k.get('confirm'))
+            self._publish('kline', (symbol, tf, confirm))
+            for derived in self.derived.get(symbol, ()):
+                # A derived bar closes with the base bar that ends its bucket
+                closes = confirm and (bar[0] + timeframe_ms(tf)) % timeframe_ms(derived) == 0
+                self._publish('kline', (symbol, derived, closes))
+        if symbol in self.positions:
+            self.position_event.set()
+
+    def _on_ticker(self, data):
+        symbol = data['symbol']
+        # Bybit sends a snapshot first and only changed fields afterwards
+        self.tickers.setdefault(symbol, {}).update(data)
+        self._publish('ticker', symbol)
+
+    def _on_position(self, data):
+        for raw in data:
+            pos = self._unify_position(raw)
+            self.positions[raw['symbol']] = pos
+            self._publish('position', raw['symbol'])
+        self.position_event.set()
+
+    def _unify_position(self, raw):
+        if self.exchange is not None:
+            return self.exchange.parse_position(raw)
+        side = {'Buy': 'long', 'Sell': 'short'}.get(raw.get('side'))
+        return {
+            'symbol': raw['symbol'],
+            'contracts': float(raw.get('size') or 0),
+            'side': side,
+            'markPrice': float(raw.get('markPrice') or 0),
+            'stopLossPrice': float(raw.get('stopLoss') or 0),
+            'takeProfitPrice': float(raw.get('takeProfit') or 0),
+            'info': raw,
+        }
+
+    def _publish(self, kind, event):
+        for queue in self._listeners[kind]:
+            if queue.full():
+                queue.get_nowait()  # drop the oldest event rather than block the socket
+            queue.put_nowait(event)
+
+    # ------------------------------------------------------------------
+    # REST backfill
+    # ------------------------------------------------------------------
+    async def _backfill_klines(self, symbol, timeframe):
+        if self.exchange is None:
+            return
+        try:
+            await self.ohlcv.fetch(self.exchange, symbol, timeframe, refresh=True)
+        except Exception as e:
+            logger.error(f"Feed backfill failed for {symbol} {timeframe}: {e}")
+
+    async def _backfill_positions(self):
+        if self.exchange is None:
+            return
+        try:
+            positions = await self.exchange.fetch_positions()
+        except Exception as e:
+            logger.error(f"Feed position backfill failed: {e}")
+            return
+        self.positions = {p['info']['symbol']: p for p in positions}
+        self.position_event.set()
@@ -0,0 +1,79 @@
+## File: market_snapshot.py
+
+import asyncio
+import logging
+import time
+from config_setup import SNAPSHOT_TTL
+
+logger = logging.getLogger(__name__)
+
+
+class MarketSnapshot:
+    """
+    Shared, TTL-bounded view of balance, positions and tickers.
+
+    Reads within `ttl` seconds of the last refresh are served from memory,
+    and concurrent readers of a stale value share a single request. Tickers
+    are refreshed for the whole market with one fetch_tickers call instead of
+    one fetch_ticker per symbol. Anything that changes account state (fills,
+    order placement, SL/TP edits) must call `invalidate` so the next read
+    goes to the exchange.
+    """
+
+    def __init__(self, exchange, ttl=SNAPSHOT_TTL):
+        self.exchange = exchange
+        self.ttl = ttl
+        self.requests = 0  # exchange calls actually made
+        self._values = {}  # kind -> (fetched_at, value)
+        self._locks = {}
+
+    def invalidate(self, *kinds):
+        for kind in kinds or list(self._values):
+            self._values.pop(kind, None)
+
+    async def _get(self, kind, fetch, refresh=False):
+        requested_at = time.monotonic()
+        cached = self._values.get(kind)
+        if not refresh and cached and requested_at - cached[0] < self.ttl:
+            return cached[1]
+        lock = self._locks.setdefault(kind, asyncio.Lock())
+        async with lock:
+            # Another reader may have refreshed it while we waited
+            cached = self._values.get(kind)
+            if cached and time.monotonic() - cached[0] < self.ttl and (
+                    not refresh or cached[0] >= requested_at):
+                return cached[1]
+            value = await fetch()
+            self.requests += 1
+            self._values[kind] = (time.monotonic(), value)
+            return value
+
+    async def balance(self, refresh=False):
+        return await self._get('balance', self.exchange.fetch_balance, refresh)
+
+    async def positions(self, refresh=False):
+        return await self._get('positions', self.exchange.fetch_positions, refresh)
+
+    async def tickers(self, refresh=False):
+        return await self._get('tickers', self._fetch_tickers, refresh)
+
+    async def _fetch_tickers(self):
+        raw = await self.exchange.fetch_tickers(params={'type': 'swap'})
+        tickers = dict(raw)
+        # The bot addresses markets by exchange id ('BTCUSDT') as well
+        for ticker in raw.values():
+            market_id = (ticker.get('info') or {}).get('symbol')
+            if market_id:
+                tickers.setdefault(market_id, ticker)
+        return tickers
+
+    async def ticker(self, symbol):
+        tickers = await self.tickers()
+        ticker = tickers.get(symbol)
+        if ticker is None:
+            # e.g. a market listed after the last bulk refresh
+            logger.info(f"Snapshot miss for {symbol}, fetching ticker directly")
+            ticker = await self.exchange.fetch_ticker(symbol)
+            self.requests += 1
+            tickers[symbol] = ticker
+        return ticker
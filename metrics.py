@@ -0,0 +1,148 @@
+## File: metrics.py
+"""
+In-process latency histograms, gauges and counters, served in the
+Prometheus text format on a local HTTP endpoint.
+
+    with metrics.span('stage_seconds', loop='entry', stage='fetch'):
+        await ...
+
+    curl http://127.0.0.1:9108/metrics
+
+Spans measure wall time, so inside coroutines they include the time spent
+awaiting the exchange, which is what a late fill needs explained.
+"""
+
+import asyncio
+import bisect
+import contextlib
+import logging
+import time
+from aiohttp import web
+from config_setup import METRICS_HOST, METRICS_PORT
+
+logger = logging.getLogger(__name__)
+
+NAMESPACE = 'macd_trader'
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# name -> (type, help); every metric the bot emits is declared here
+METRICS = {
+    'stage_seconds': ('histogram', 'Time spent in each stage of the entry, management and order paths.'),
+    'loop_iteration_seconds': ('histogram', 'Duration of one iteration of a trading loop.'),
+    'rate_limit_wait_seconds': ('histogram', 'Time a request waited for a rate-limiter token.'),
+    'exchange_call_seconds': ('histogram', 'Latency of individual order-path exchange calls, per attempt.'),
+    'signal_to_ack_seconds': ('histogram', 'Time from a signal being generated to the exchange acknowledging its order.'),
+    'exchange_calls_total': ('counter', 'Order-path exchange call attempts by outcome.'),
+    'queue_depth': ('gauge', 'Items waiting in an internal queue.'),
+}
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    def __init__(self):
+        self.histograms = {}  # (name, labels) -> Histogram
+        self.gauges = {}      # (name, labels) -> value
+        self.counters = {}    # (name, labels) -> value
+
+    @staticmethod
+    def _key(name, labels):
+        if name not in METRICS:
+            raise KeyError(f"Undeclared metric {name}")
+        return name, tuple(sorted(labels.items()))
+
+    def observe(self, name, value, **labels):
+        key = self._key(name, labels)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        histogram.observe(value)
+
+    @contextlib.contextmanager
+    def span(self, name, **labels):
+        """Observe the wall time of the enclosed block, even if it raises."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def set(self, name, value, **labels):
+        self.gauges[self._key(name, labels)] = value
+
+    def inc(self, name, amount=1, **labels):
+        key = self._key(name, labels)
+        self.counters[key] = self.counters.get(key, 0) + amount
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        series = {}
+        for kind, store in (('histogram', self.histograms), ('gauge', self.gauges), ('counter', self.counters)):
+            for (name, labels), value in store.items():
+                series.setdefault(name, []).append((labels, value))
+        lines = []
+        for name in sorted(series):
+            kind, help_text = METRICS[name]
+            full = f'{NAMESPACE}_{name}'
+            lines.append(f'# HELP {full} {help_text}')
+            lines.append(f'# TYPE {full} {kind}')
+            for labels, value in sorted(series[name], key=lambda s: s[0]):
+                if kind != 'histogram':
+                    lines.append(f'{full}{_labels(labels)} {_number(value)}')
+                    continue
+                cumulative = 0
+                for bound, count in zip((*value.buckets, '+Inf'), value.counts):
+                    cumulative += count
+                    lines.append(f'{full}_bucket{_labels(labels, le=bound)} {cumulative}')
+                lines.append(f'{full}_sum{_labels(labels)} {_number(value.sum)}')
+                lines.append(f'{full}_count{_labels(labels)} {value.count}')
+        return '\n'.join(lines) + '\n'
+
+    async def serve(self, host=METRICS_HOST, port=METRICS_PORT):
+        """Serve GET /metrics until cancelled."""
+        async def handle(request):
+            return web.Response(text=self.render(), content_type='text/plain', charset='utf-8',
+                                headers={'X-Content-Type-Options': 'nosniff'})
+
+        app = web.Application()
+        app.router.add_get('/metrics', handle)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        try:
+            await web.TCPSite(runner, host, port).start()
+        except OSError as e:
+            # Losing the endpoint must not take the trading loops down with it
+            logger.error(f"Metrics endpoint unavailable on {host}:{port}: {e}")
+            await runner.cleanup()
+            return
+        logger.info(f"Metrics endpoint on http://{host}:{port}/metrics")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await runner.cleanup()
+
+
+def _labels(labels, **extra):
+    pairs = [*labels, *((k, v) for k, v in extra.items())]
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if not isinstance(value, int) else str(value)
+
+
+metrics = Metrics()
@@ -0,0 +1,130 @@
+## File: model_registry.py
+
+import asyncio
+import logging
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+from config_setup import MODEL_DIR, MODEL_PATH, MODEL_POLL_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+# Served from the model directory. Flat .npz exports are slower than their
+# native model on the batches scan() scores, so they need an explicit path.
+MODEL_EXTENSIONS = ('.pkl', '.joblib')
+SETTLE_SECONDS = 2  # ignore artifacts modified more recently than this (still being written)
+
+
+class ModelRegistry:
+    """
+    Lazily loaded signal model that can be replaced while the bot runs.
+
+    Nothing is read from disk until the first `get()`. By default the
+    registry follows the newest artifact in `model_dir`, the promotion
+    directory: deploy a model by copying it there under a temporary name and
+    renaming it into place. Training output must go elsewhere, since anything
+    in `model_dir` is served. With an explicit `path` the registry follows
+    that one file instead, which may also be a flat .npz export.
+    `refresh()` loads a changed artifact (memory-mapped where joblib can),
+    runs a warm-up prediction and only then swaps it in, in a single
+    assignment, so callers see either the old model or the new one and a
+    broken artifact never replaces a working model. `loaders` maps a file
+    extension to the function that loads it; anything else is unpickled.
+    """
+
+    def __init__(self, path=MODEL_PATH, model_dir=MODEL_DIR, features=None, loaders=None):
+        self.path = path or None
+        self.model_dir = model_dir
+        self.features = features
+        self.loaders = loaders or {}
+        self._current = None  # (model, path, mtime)
+        self._rejected = set()  # (path, mtime) artifacts that failed to load
+        self._lock = threading.Lock()
+
+    @property
+    def version(self):
+        current = self._current
+        return (current[1], current[2]) if current else None
+
+    def get(self):
+        current = self._current
+        if current is None:
+            with self._lock:
+                if self._current is None:
+                    if not self._swap(required=True):
+                        raise FileNotFoundError(f"No model artifact found in {self.model_dir}")
+                current = self._current
+        return current[0]
+
+    def artifact(self):
+        """(path, mtime) of the artifact the registry should be serving."""
+        if self.path:
+            return (self.path, os.path.getmtime(self.path)) if os.path.exists(self.path) else None
+        if not os.path.isdir(self.model_dir):
+            return None
+        now = time.time()
+        candidates = []
+        for name in os.listdir(self.model_dir):
+            path = os.path.join(self.model_dir, name)
+            if name.endswith(MODEL_EXTENSIONS) and os.path.isfile(path):
+                mtime = os.path.getmtime(path)
+                if now - mtime >= SETTLE_SECONDS:
+                    candidates.append((mtime, path))
+        if not candidates:
+            return None
+        mtime, path = max(candidates)
+        return path, mtime
+
+    def refresh(self):
+        """Swap in a changed artifact; returns True if the model was replaced."""
+        with self._lock:
+            return self._swap(required=False)
+
+    def _swap(self, required):
+        artifact = self.artifact()
+        if artifact is None or artifact == self.version or artifact in self._rejected:
+            return False
+        path, mtime = artifact
+        try:
+            model = self._load(path)
+            self._warm_up(model)
+        except Exception as e:
+            if required and self._current is None:
+                raise
+            self._rejected.add(artifact)
+            logger.error(f"Model {path} rejected, keeping {self.version}: {e}")
+            return False
+        self._current = (model, path, mtime)
+        logger.info(f"Model loaded: {path}")
+        return True
+
+    def _load(self, path):
+        loader = self.loaders.get(os.path.splitext(path)[1])
+        if loader:
+            return loader(path)
+        import joblib  # only pickled artifacts need it (and the ML stack they unpickle)
+        try:
+            # Large numpy arrays inside the pickle are mapped instead of copied
+            return joblib.load(path, mmap_mode='r')
+        except ValueError:
+            return joblib.load(path)
+
+    def _warm_up(self, model):
+        n_features = len(self.features) if self.features else getattr(model, 'n_features_in_', None)
+        if n_features is None:
+            return
+        row = np.zeros((1, n_features))
+        proba = model.predict_proba(pd.DataFrame(row, columns=self.features) if self.features else row)
+        if proba.shape != (1, len(model.classes_)):
+            raise ValueError(f"unexpected predict_proba shape {proba.shape}")
+
+    async def watch(self, interval=MODEL_POLL_INTERVAL):
+        """Poll for new artifacts and hot-swap them in the background."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.refresh)
+            except Exception as e:
+                logger.error(f"Model refresh error: {e}")
@@ -1,14 +1,67 @@
 #!/usr/bin/env python3
+"""
+Walk-forward evaluation and training of the signal model families.
+
+Every (fold, family) fit - the TimeSeriesSplit folds plus the final 80/20
+holdout - is an independent task run on a process pool. Workers memory-map
+the columnar dataset (see dataset_store.py; a CSV is converted into the
+cache directory on first use) and the SMOTE-resampled training set of each
+fold, which is computed once. Each finished task leaves a result file in the
+cache, so a rerun after a crash only fits what is missing.
+
+    python dataset_store.py data/train.csv data/train.cols
+    python model_training.py data/train.cols --models rf_smote xgb_cw --workers 4
+
+--search instead tunes each family's parameters by successive halving on
+the same folds under a time or CPU budget, logging every trial so a rerun
+resumes; train with the result through --params:
+
+    python model_training.py data/train.cols --search --budget-time 7200
+    python model_training.py data/train.cols --params models/candidates/best_params.json
+
+Training, --search and --export write to MODEL_CANDIDATES_DIR, which the bot
+never reads. It serves the newest artifact in MODEL_DIR, so promoting a
+model is copying it there and renaming it into place:
+
+    cp models/candidates/rf_classweights.joblib models/live/rf_cw.joblib.tmp
+    mv models/live/rf_cw.joblib.tmp models/live/rf_cw.joblib
+
+--refresh grows the production model (LightGBM, XGBoost or random forest)
+with extra rounds fit on only the bars after its last training bar, checks
+it on the most recent of them and, if it holds up, writes a new versioned
+artifact straight into MODEL_DIR, promoting it:
+
+    python model_training.py data/train.cols --refresh --rounds 50
+
+--export converts a LightGBM, XGBoost or random-forest artifact into the
+flat .npz arrays hybrid_signal.TreeEnsemble scores with NumPy alone,
+after checking it reproduces the model's probabilities on the dataset. It
+is faster for single rows but slower on batches, so the bot only serves one
+pinned through MODEL_PATH, never from MODEL_DIR:
+
+    python model_training.py data/train.cols --export models/live/model.pkl
+    MODEL_PATH=models/candidates/model.npz python main.py
+"""
+import argparse
+import copy
+import hashlib
+import json
+import math
+import re
+import time
+from datetime import datetime, timezone
 import pandas as pd
 import numpy as np
 import warnings
 warnings.simplefilter("ignore")
 
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from imblearn.over_sampling import SMOTE
-from sklearn.model_selection import train_test_split, TimeSeriesSplit
+from sklearn.model_selection import TimeSeriesSplit
 from sklearn.utils.class_weight import compute_class_weight
 from sklearn.ensemble import RandomForestClassifier
 from xgboost import XGBClassifier
+from lightgbm import LGBMClassifier
 from sklearn.metrics import (
     classification_report,
     confusion_matrix,
@@ -17,193 +70,812 @@ from sklearn.metrics import (
 )
 import joblib
 import os
-import sys
+from config_setup import MODEL_CANDIDATES_DIR, MODEL_DIR, MODEL_PATH
+from dataset_store import Dataset, DatasetWriter, convert, is_dataset, write_frame, NON_FEATURES
+from feature_pipeline import FEATURES as PIPELINE_FEATURES, compute_features
+from model_registry import ModelRegistry
+from hybrid_signal import TreeEnsemble, TREE_FORMAT, MISSING_NONE, MISSING_ZERO, MISSING_NAN
 
-def main():
-    # LOAD DATA
-    dataset = sys.argv[1]
-    df = pd.read_csv(dataset, parse_dates=['timestamp'])
+OHLCV = ['open', 'high', 'low', 'close', 'volume']
+CACHE_VERSION = 1  # bump when a family's parameters change, to invalidate cached folds
+
+FAMILIES = {
+    'rf_smote': 'RF+SMOTE',
+    'rf_cw': 'RF+ClassWeights',
+    'xgb_cw': 'XGB+ClassWeights',
+}
+# Where the holdout model of each family is saved (loaded back for a sanity check)
+ARTIFACTS = {
+    'rf_smote': 'rf_smote.joblib',
+    'rf_cw': 'rf_classweights.joblib',
+    'xgb_cw': 'xgb_classweights.json',
+}
+
+def build_features(df):
+    '''Replace raw OHLCV columns with the live feature set, per symbol.'''
+    parts = []
+    groups = df.groupby('symbol', sort=False) if 'symbol' in df.columns else [(None, df)]
+    for _, g in groups:
+        g = g.sort_values('timestamp')
+        ts = g['timestamp'].to_numpy().astype('datetime64[ms]').astype(np.int64)
+        feats = compute_features(ts, g[OHLCV].to_numpy(dtype=float))
+        parts.append(pd.concat([g.drop(columns=OHLCV).reset_index(drop=True),
+                                pd.DataFrame(feats, columns=PIPELINE_FEATURES)], axis=1))
+    return pd.concat(parts, ignore_index=True)
+
+def load_dataset(path):
+    df = pd.read_csv(path, parse_dates=['timestamp'])
+    # Raw candles get the same features the bot computes live
+    if set(OHLCV).issubset(df.columns) and not set(PIPELINE_FEATURES).issubset(df.columns):
+        df = build_features(df).dropna(subset=PIPELINE_FEATURES)
     df.sort_values('timestamp', inplace=True)
     df.reset_index(drop=True, inplace=True)
+    return df
 
-    # FEATURES & LABELS
-    FEATURES = [c for c in df.columns if c not in ['timestamp', 'symbol', 'label']] # for demonstration purposes. Not exactly what I use
-    X = df[FEATURES]
-    y = df['label']
-
-    # BASIC TIME-AWARE 80/20 SPLIT
-    split_idx = int(0.8 * len(df))
-    X_train, X_test = X.iloc[:split_idx], X.iloc[split_idx:]
-    y_train, y_test = y.iloc[:split_idx], y.iloc[split_idx:]
-    print("Train size:", len(X_train), "Test size:", len(X_test))
-    print("Train label dist:\n", y_train.value_counts(normalize=True).sort_index())
-    print("Test label dist:\n", y_test.value_counts(normalize=True).sort_index())
-
-    # SMOTE OVERSAMPLING (TRAIN-ONLY) + RANDOM FOREST
-    smote = SMOTE(random_state=42)
-    X_tr_sm, y_tr_sm = smote.fit_resample(X_train, y_train)
-    print("\nAfter SMOTE (train) dist:\n", pd.Series(y_tr_sm).value_counts(normalize=True).sort_index())
-
-    rf_smote = RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=-1)
-    rf_smote.fit(X_tr_sm, y_tr_sm)
-    preds_rf_smote = rf_smote.predict(X_test)
-    print("\nRF + SMOTE Classification Report:")
-    print(classification_report(y_test, preds_rf_smote, digits=4))
-    print("RF + SMOTE Confusion Matrix:")
-    print(confusion_matrix(y_test, preds_rf_smote))
-    print("RF + SMOTE Balanced Acc:", balanced_accuracy_score(y_test, preds_rf_smote))
-    print("RF + SMOTE MCC:      ", matthews_corrcoef(y_test, preds_rf_smote))
-
-    # COST-SENSITIVE LEARNING WITH CLASS WEIGHTS
-    classes = np.unique(y_train)
-    weights = compute_class_weight(class_weight='balanced', classes=classes, y=y_train)
-    cw_dict = dict(zip(classes, weights))
-    print("\nClass weights:", cw_dict)
-
-    # RandomForest with class_weight
-    rf_cw = RandomForestClassifier(
-        n_estimators=100,
-        class_weight=cw_dict,
-        random_state=42,
-        n_jobs=-1
-    )
-    rf_cw.fit(X_train, y_train)
-    preds_rf_cw = rf_cw.predict(X_test)
-    print("\nRF + Class Weights Classification Report:")
-    print(classification_report(y_test, preds_rf_cw, digits=4))
-    print("RF + Class Weights Confusion Matrix:")
-    print(confusion_matrix(y_test, preds_rf_cw))
-    print("RF + Class Weights Balanced Acc:", balanced_accuracy_score(y_test, preds_rf_cw))
-    print("RF + Class Weights MCC:      ", matthews_corrcoef(y_test, preds_rf_cw))
-
-    # XGBoost with sample weights
-    sample_weights = y_train.map(cw_dict)
-    xgb_cw = XGBClassifier(
+def prepare_dataset(dataset, cache):
+    '''The columnar dataset to train on: `dataset` itself, or its conversion inside `cache`.'''
+    if is_dataset(dataset):
+        return dataset
+    path = os.path.join(cache, 'data')
+    if is_dataset(path):
+        return path
+    header = pd.read_csv(dataset, nrows=0).columns
+    if set(OHLCV).issubset(header) and not set(PIPELINE_FEATURES).issubset(header):
+        # Raw candles need whole per-symbol histories for their features
+        df = load_dataset(dataset)
+        writer = DatasetWriter(path, [c for c in df.columns if c not in NON_FEATURES])
+        write_frame(writer, df)
+        writer.close()
+    else:
+        convert(dataset, path)
+    return path
+
+def class_weights(y):
+    classes = np.unique(y)
+    return dict(zip(classes, compute_class_weight(class_weight='balanced', classes=classes, y=y)))
+
+def make_model(family, cw_dict=None, threads=1, params=None):
+    '''Unfitted model of `family`; the RF class-weight family takes `cw_dict`, `params` override the defaults.'''
+    params = params or {}
+    if family == 'rf_smote':
+        return RandomForestClassifier(**{'n_estimators': 100, **params}, random_state=42, n_jobs=threads)
+    if family == 'rf_cw':
+        return RandomForestClassifier(**{'n_estimators': 100, **params}, class_weight=cw_dict,
+                                      random_state=42, n_jobs=threads)
+    return XGBClassifier(
         objective='multi:softprob',
         num_class=3,
-        learning_rate=0.1,
-        max_depth=5,
-        n_estimators=200,
+        **{'learning_rate': 0.1, 'max_depth': 5, 'n_estimators': 200, **params},
         eval_metric='mlogloss',
-        use_label_encoder=False,
-        random_state=42
+        random_state=42,
+        n_jobs=threads,
     )
-    xgb_cw.fit(X_train, y_train, sample_weight=sample_weights)
-    preds_xgb_cw = xgb_cw.predict(X_test)
-    print("\nXGBoost + Class Weights Classification Report:")
-    print(classification_report(y_test, preds_xgb_cw, digits=4))
-    print("XGBoost + Class Weights Confusion Matrix:")
-    print(confusion_matrix(y_test, preds_xgb_cw))
-    print("XGBoost + Class Weights Balanced Acc:", balanced_accuracy_score(y_test, preds_xgb_cw))
-    print("XGBoost + Class Weights MCC:      ", matthews_corrcoef(y_test, preds_xgb_cw))
-
-    # ROLLING CROSS-VALIDATION (TIMESERIESSPLIT)
-    print("\n### Rolling CV w/ TimeSeriesSplit ###")
-    n_splits = 5
-    tscv = TimeSeriesSplit(n_splits=n_splits)
-
-    rf_smote_scores = []
-    rf_cw_scores = []
-    xgb_cw_scores = []
-
-    for fold_idx, (train_idx, val_idx) in enumerate(tscv.split(X), 1):
-        print(f"\n--- Fold {fold_idx} ---")
-        X_tr, X_val = X.iloc[train_idx], X.iloc[val_idx]
-        y_tr, y_val = y.iloc[train_idx], y.iloc[val_idx]
-
-        # SMOTE inside this fold
-        sm_f = SMOTE(random_state=42)
-        X_tr_sm_f, y_tr_sm_f = sm_f.fit_resample(X_tr, y_tr)
-
-        model_rf_sm = RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=-1)
-        model_rf_sm.fit(X_tr_sm_f, y_tr_sm_f)
-        pred_rf_sm = model_rf_sm.predict(X_val)
-        bal_acc_rf_sm_f = balanced_accuracy_score(y_val, pred_rf_sm)
-        rf_smote_scores.append(bal_acc_rf_sm_f)
-        print("RF+SMOTE Balanced Acc:", bal_acc_rf_sm_f)
-
-        # Class weights inside this fold
-        cw_f = compute_class_weight(class_weight='balanced', classes=np.unique(y_tr), y=y_tr)
-        cw_dict_f = dict(zip(np.unique(y_tr), cw_f))
-
-        model_rf_cw = RandomForestClassifier(
-            n_estimators=100,
-            class_weight=cw_dict_f,
-            random_state=42,
-            n_jobs=-1
-        )
-        model_rf_cw.fit(X_tr, y_tr)
-        pred_rf_cw = model_rf_cw.predict(X_val)
-        bal_acc_rf_cw_f = balanced_accuracy_score(y_val, pred_rf_cw)
-        rf_cw_scores.append(bal_acc_rf_cw_f)
-        print("RF+ClassWeights Balanced Acc:", bal_acc_rf_cw_f)
-
-        sw_f = y_tr.map(cw_dict_f)
-        model_xgb_cw = XGBClassifier(
-            objective='multi:softprob',
-            num_class=3,
-            learning_rate=0.1,
-            max_depth=5,
-            n_estimators=200,
-            eval_metric='mlogloss',
-            use_label_encoder=False,
-            random_state=42
-        )
-        model_xgb_cw.fit(X_tr, y_tr, sample_weight=sw_f)
-        pred_xgb_cw = model_xgb_cw.predict(X_val)
-        bal_acc_xgb_cw_f = balanced_accuracy_score(y_val, pred_xgb_cw)
-        xgb_cw_scores.append(bal_acc_xgb_cw_f)
-        print("XGB+ClassWeights Balanced Acc:", bal_acc_xgb_cw_f)
 
-    # SUMMARIZE ROLLING CV
-    print("\n## Rolling CV Balanced Accuracy Averages ##")
-    print(f"RF+SMOTE : {np.mean(rf_smote_scores):.4f} ± {np.std(rf_smote_scores):.4f}")
-    print(f"RF+ClassW: {np.mean(rf_cw_scores):.4f} ± {np.std(rf_cw_scores):.4f}")
-    print(f"XGB+ClassW: {np.mean(xgb_cw_scores):.4f} ± {np.std(xgb_cw_scores):.4f}")
+def _tag(params):
+    '''Short stable id of a parameter set (empty for the defaults).'''
+    if not params:
+        return ''
+    return hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()[:10]
+
+# ----------------------------------------------------------------------
+# Folds and the on-disk cache
+# ----------------------------------------------------------------------
+def folds(n, n_splits):
+    '''name -> ((train_start, train_end), (val_start, val_end)) for CV folds and the holdout.'''
+    out = {}
+    for i, (train_idx, val_idx) in enumerate(TimeSeriesSplit(n_splits=n_splits).split(np.arange(n)), 1):
+        out[f'fold{i}'] = ((int(train_idx[0]), int(train_idx[-1]) + 1), (int(val_idx[0]), int(val_idx[-1]) + 1))
+    split_idx = int(0.8 * n)
+    out['holdout'] = ((0, split_idx), (split_idx, n))
+    return out
+
+def cache_dir(root, dataset, n_splits):
+    '''Cache directory keyed by the dataset (CSV file or columnar directory) and the split count.'''
+    stat = os.stat(os.path.join(dataset, 'meta.json') if os.path.isdir(dataset) else dataset)
+    key = json.dumps([os.path.abspath(dataset), stat.st_size, stat.st_mtime, n_splits, CACHE_VERSION])
+    return os.path.join(root, hashlib.sha1(key.encode()).hexdigest()[:16])
+
+def _load(cache, name):
+    return np.load(os.path.join(cache, f'{name}.npy'), mmap_mode='r')
+
+def _save(cache, name, array):
+    # Write then rename, so an interrupted run never leaves a truncated array behind
+    tmp = os.path.join(cache, f'{name}.tmp.npy')
+    np.save(tmp, array)
+    os.replace(tmp, os.path.join(cache, f'{name}.npy'))
+
+def smote_fold(data, cache, fold, train):
+    '''Resample a fold's training rows with SMOTE once; every rf_smote fit reuses the result.'''
+    if os.path.exists(os.path.join(cache, f'{fold}_smote_y.npy')):
+        return fold
+    ds = Dataset(data)
+    X_sm, y_sm = SMOTE(random_state=42).fit_resample(ds.X[train[0]:train[1]], ds.y[train[0]:train[1]])
+    _save(cache, f'{fold}_smote_X', X_sm)
+    _save(cache, f'{fold}_smote_y', y_sm)
+    return fold
+
+def _frame(X, features):
+    # A column-major float32 slice becomes the frame's block without a copy
+    return pd.DataFrame(np.asarray(X), columns=features, copy=False)
+
+def _forest_input(X):
+    '''sklearn's forests scan NaN through a writable buffer; copy read-only (mapped) data only then.'''
+    values = X.to_numpy()
+    if not values.flags.writeable and np.isnan(values).any():
+        return X.copy()
+    return X
+
+def _fold_data(data, cache, fold, family, train, val):
+    ds = Dataset(data)
+    X, y, features = ds.X, ds.y, ds.features
+    if family == 'rf_smote':
+        X_tr, y_tr = _load(cache, f'{fold}_smote_X'), _load(cache, f'{fold}_smote_y')
+    else:
+        X_tr, y_tr = X[train[0]:train[1]], y[train[0]:train[1]]
+    X_tr = _frame(X_tr, features)
+    y_tr = np.asarray(y_tr)
+    X_val = _frame(X[val[0]:val[1]], features)
+    y_val = np.asarray(y[val[0]:val[1]])
+    return X_tr, y_tr, X_val, y_val
+
+def _fit(family, X_tr, y_tr, threads, params=None):
+    cw_dict = class_weights(y_tr) if family != 'rf_smote' else None
+    model = make_model(family, cw_dict, threads, params)
+    if family == 'xgb_cw':
+        model.fit(X_tr, y_tr, sample_weight=pd.Series(y_tr).map(cw_dict).to_numpy())
+    else:
+        model.fit(_forest_input(X_tr), y_tr)
+    return model
+
+def fit_fold(data, cache, fold, family, train, val, threads, output_dir=None, params=None):
+    '''Fit one family on one fold and score it; the holdout fit also saves the model.'''
+    X_tr, y_tr, X_val, y_val = _fold_data(data, cache, fold, family, train, val)
+    model = _fit(family, X_tr, y_tr, threads, params)
+    preds = model.predict(X_val)
+    result = {
+        'fold': fold, 'family': family,
+        'balanced_accuracy': balanced_accuracy_score(y_val, preds),
+        'mcc': matthews_corrcoef(y_val, preds),
+        'report': classification_report(y_val, preds, digits=4),
+        'confusion': confusion_matrix(y_val, preds).tolist(),
+    }
+    if output_dir:
+        path = os.path.join(output_dir, ARTIFACTS[family])
+        if family == 'xgb_cw':
+            model.save_model(path)
+        else:
+            joblib.dump(model, path)
+    with open(_result_path(cache, fold, family, params), 'w') as f:
+        json.dump(result, f)
+    return result
+
+def _result_path(cache, fold, family, params=None):
+    tag = _tag(params)
+    return os.path.join(cache, f'{fold}_{family}{"_" + tag if tag else ""}.json')
+
+def cached_result(cache, fold, family, output_dir=None, params=None):
+    path = _result_path(cache, fold, family, params)
+    if not os.path.exists(path):
+        return None
+    if output_dir:
+        # The saved model must be the one this result describes, not a later fit's
+        model_path = os.path.join(output_dir, ARTIFACTS[family])
+        if not os.path.exists(model_path) or os.path.getmtime(model_path) > os.path.getmtime(path):
+            return None
+    with open(path) as f:
+        return json.load(f)
+
+# ----------------------------------------------------------------------
+# Hyperparameter search (successive halving over the walk-forward folds)
+# ----------------------------------------------------------------------
+# Lists are choices; ('uniform' | 'log', low, high) are sampled continuously.
+# n_estimators is not searched: it is the resource each rung grows.
+_RF_SPACE = {
+    'max_depth': [None, 6, 10, 16, 24],
+    'min_samples_leaf': [1, 2, 5, 10, 25],
+    'max_features': ['sqrt', 0.3, 0.5, 0.8],
+}
+SEARCH_SPACE = {
+    'rf_smote': _RF_SPACE,
+    'rf_cw': _RF_SPACE,
+    'xgb_cw': {
+        'max_depth': [3, 4, 5, 6, 8, 10],
+        'learning_rate': ('log', 0.01, 0.3),
+        'subsample': ('uniform', 0.5, 1.0),
+        'colsample_bytree': ('uniform', 0.4, 1.0),
+        'min_child_weight': ('log', 1.0, 20.0),
+    },
+}
+MIN_TREES, MAX_TREES, ETA = 25, 400, 3
+
+def sample_params(family, rng):
+    params = {}
+    for name, space in SEARCH_SPACE[family].items():
+        if isinstance(space, list):
+            params[name] = space[rng.integers(len(space))]
+        elif space[0] == 'log':
+            params[name] = float(np.exp(rng.uniform(np.log(space[1]), np.log(space[2]))))
+        else:
+            params[name] = float(rng.uniform(space[1], space[2]))
+    return params
+
+def rungs(min_trees=MIN_TREES, max_trees=MAX_TREES, eta=ETA):
+    '''Tree counts of the successive-halving rungs, growing by `eta` up to max_trees.'''
+    steps = max(0, int(math.floor(math.log(max_trees / min_trees, eta) + 1e-9)))
+    return [max(1, round(max_trees / eta ** k)) for k in range(steps, -1, -1)]
+
+def trial_fold(data, cache, family, params, fold, train, val):
+    '''Balanced accuracy of one parameter set on one fold, and the CPU seconds it took.'''
+    started = time.process_time()
+    X_tr, y_tr, X_val, y_val = _fold_data(data, cache, fold, family, train, val)
+    model = _fit(family, X_tr, y_tr, 1, params)
+    score = balanced_accuracy_score(y_val, model.predict(X_val))
+    return score, time.process_time() - started
+
+class TrialHistory:
+    '''Append-only JSONL of finished (family, params, fold) trials; a rerun skips what it holds.'''
+
+    def __init__(self, path):
+        self.path = path
+        self.records = {}
+        if not os.path.exists(path):
+            return
+        with open(path) as f:
+            lines = f.read().split('\n')
+        if lines[-1]:
+            # A run killed mid-write leaves a torn last line; drop it before appending
+            lines = lines[:-1]
+            with open(path, 'w') as f:
+                f.write(''.join(line + '\n' for line in lines))
+        for line in filter(None, lines):
+            record = json.loads(line)
+            self.records[(record['family'], _tag(record['params']), record['fold'])] = record
+
+    def get(self, family, params, fold):
+        return self.records.get((family, _tag(params), fold))
+
+    def add(self, record):
+        self.records[(record['family'], _tag(record['params']), record['fold'])] = record
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(record) + '\n')
 
-    # SAVE THE BEST MODEL(S)
-    output_dir = "models"
+    def mean(self, family, params, fold_names):
+        '''Mean score over `fold_names`, or None until every fold has run.'''
+        scores = [self.get(family, params, fold) for fold in fold_names]
+        if any(r is None for r in scores):
+            return None
+        return float(np.mean([r['score'] for r in scores]))
+
+    def best(self, family, fold_names):
+        '''(params, mean score) of the best complete trial at the largest tree count reached.'''
+        candidates = {_tag(r['params']): r['params'] for (fam, _, _), r in self.records.items() if fam == family}
+        scored = [(p, self.mean(family, p, fold_names)) for p in candidates.values()]
+        scored = [(p, m) for p, m in scored if m is not None]
+        if not scored:
+            return None, None
+        return max(scored, key=lambda pm: (pm[0]['n_estimators'], pm[1]))
+
+# ----------------------------------------------------------------------
+# Warm-start refresh of the production model
+# ----------------------------------------------------------------------
+REFRESH_ROUNDS = 50     # boosting rounds (or forest trees) added per refresh
+REFRESH_HOLDOUT = 0.2   # most recent share of the new bars kept for validation
+MIN_REFRESH_ROWS = 200
+_VERSION_SUFFIX = re.compile(r'_r\d{8}T\d{6}$')
+
+def extend_model(model, X, y, rounds=REFRESH_ROUNDS):
+    '''A copy of `model` grown by `rounds` boosting rounds (or trees) fit on X, y only.'''
+    missing = set(model.classes_.tolist()) - set(np.unique(y).tolist())
+    if missing:
+        # The new rounds must see every class, or the label encoding shifts
+        raise ValueError(f"New bars hold no rows of class(es) {sorted(missing)}")
+    if isinstance(model, LGBMClassifier):
+        refreshed = LGBMClassifier(**{**model.get_params(), 'n_estimators': rounds})
+        refreshed.fit(X, y, init_model=model.booster_)
+    elif isinstance(model, XGBClassifier):
+        refreshed = XGBClassifier(**{**model.get_params(), 'n_estimators': rounds})
+        refreshed.fit(X, y, xgb_model=model.get_booster())
+    elif isinstance(model, RandomForestClassifier):
+        refreshed = copy.deepcopy(model)
+        refreshed.set_params(warm_start=True, n_estimators=model.n_estimators + rounds)
+        refreshed.fit(_forest_input(X), y)
+        refreshed.set_params(warm_start=False)
+    else:
+        raise TypeError(f"Cannot warm-start a {type(model).__name__}")
+    return refreshed
+
+def metadata_path(artifact):
+    return os.path.splitext(artifact)[0] + '.json'
+
+def _to_ms(when):
+    if isinstance(when, (int, np.integer)) or str(when).isdigit():
+        return int(when)
+    ts = pd.Timestamp(when)
+    ts = ts.tz_localize('UTC') if ts.tzinfo is None else ts.tz_convert('UTC')
+    return int(ts.value // 1_000_000)
+
+def _iso_ms(ms):
+    return datetime.fromtimestamp(ms / 1000, timezone.utc).isoformat(timespec='seconds')
+
+def refresh(dataset, model_path=None, output_dir=MODEL_DIR, rounds=REFRESH_ROUNDS, since=None,
+            holdout=REFRESH_HOLDOUT, tolerance=0.0, force=False, cache_root='models/cv_cache'):
+    '''
+    Grow the production model on the bars after its last training bar and
+    write it as a new versioned artifact next to its <name>.json metadata in
+    `output_dir`, by default MODEL_DIR, so writing it promotes it.
+    The latest `holdout` share of those bars is held out; unless `force`, the
+    artifact is only written if it scores no worse there than its parent
+    (minus `tolerance` balanced accuracy). Returns the new path or None.
+    '''
+    started = time.perf_counter()
+    if model_path is None:
+        artifact = ModelRegistry(features=PIPELINE_FEATURES).artifact()
+        if artifact is None:
+            raise FileNotFoundError("No production model artifact to refresh")
+        model_path = artifact[0]
+    parent_meta = {}
+    if os.path.exists(metadata_path(model_path)):
+        with open(metadata_path(model_path)) as f:
+            parent_meta = json.load(f)
+    if since is None:
+        since = parent_meta.get('trained_through')
+        if since is None:
+            raise ValueError(f"{model_path} has no refresh metadata; pass the end of its training data as --since")
+    since = _to_ms(since)
+    model = joblib.load(model_path)
+
+    cache = cache_dir(cache_root, dataset, 0)
+    os.makedirs(cache, exist_ok=True)
+    ds = Dataset(prepare_dataset(dataset, cache))
+    missing = [f for f in PIPELINE_FEATURES if f not in ds.features]
+    if missing:
+        raise ValueError(f"Dataset lacks model features {missing}")
+    columns = [ds.features.index(f) for f in PIPELINE_FEATURES]
+
+    new = ds.between(since + 1, None)
+    split = new.start + int((1 - holdout) * (new.stop - new.start))
+    if split < new.stop:
+        # Never split one bar's rows (several symbols) across training and validation
+        split = int(np.searchsorted(ds.timestamp, ds.timestamp[split], 'left'))
+    if split - new.start < MIN_REFRESH_ROWS or split >= new.stop:
+        raise ValueError(f"Only {new.stop - new.start} new row(s) after {_iso_ms(since)}; nothing to refresh on")
+
+    def rows(start, stop):
+        X = ds.X[start:stop] if columns == list(range(len(ds.features))) else ds.X[start:stop][:, columns]
+        return _frame(X, PIPELINE_FEATURES), np.asarray(ds.y[start:stop])
+
+    X_new, y_new = rows(new.start, split)
+    X_val, y_val = rows(split, new.stop)
+    print(f"Refreshing {model_path}: {len(y_new)} new rows ({_iso_ms(int(ds.timestamp[new.start]))} .. "
+          f"{_iso_ms(int(ds.timestamp[split - 1]))}), {len(y_val)} held out")
+    refreshed = extend_model(model, X_new, y_new, rounds)
+
+    parent_score = balanced_accuracy_score(y_val, model.predict(X_val))
+    preds = refreshed.predict(X_val)
+    score = balanced_accuracy_score(y_val, preds)
+    print(f"Holdout Balanced Acc: parent {parent_score:.4f}  refreshed {score:.4f}")
+    print(f"Holdout MCC:          refreshed {matthews_corrcoef(y_val, preds):.4f}")
+    if score < parent_score - tolerance and not force:
+        print("Refreshed model is worse on the holdout; no artifact written (--force to write anyway)")
+        return None
+
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')
+    stem, ext = os.path.splitext(os.path.basename(model_path))
+    path = os.path.join(output_dir, f"{_VERSION_SUFFIX.sub('', stem)}_r{stamp}{ext or '.pkl'}")
+    os.makedirs(output_dir, exist_ok=True)
+    with open(metadata_path(path), 'w') as f:
+        json.dump({
+            'parent': os.path.abspath(model_path),
+            'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'dataset': os.path.abspath(dataset),
+            'trained_from': int(ds.timestamp[new.start]),
+            'trained_through': int(ds.timestamp[split - 1]),
+            'rows': int(len(y_new)),
+            'rounds': rounds,
+            'refreshes': parent_meta.get('refreshes', 0) + 1,
+            'holdout': {'rows': int(len(y_val)), 'from': int(ds.timestamp[split]),
+                        'parent_balanced_accuracy': parent_score, 'balanced_accuracy': score,
+                        'mcc': matthews_corrcoef(y_val, preds)},
+        }, f, indent=2)
+    # Written under a name the registry ignores, then renamed into place whole
+    joblib.dump(refreshed, path + '.tmp')
+    os.replace(path + '.tmp', path)
+    print(f"Refreshed model written to {path} in {time.perf_counter() - started:.1f}s")
+    if MODEL_PATH:
+        print(f"MODEL_PATH pins {MODEL_PATH}; the bot keeps serving it until this artifact is renamed over it")
+    elif os.path.abspath(output_dir) == os.path.abspath(MODEL_DIR):
+        print(f"The bot swaps it in at its next poll of {MODEL_DIR}")
+    else:
+        print(f"Promote it by moving it into {MODEL_DIR}")
+    return path
+
+# ----------------------------------------------------------------------
+# Export to the flat-array format hybrid_signal.TreeEnsemble scores
+# ----------------------------------------------------------------------
+PARITY_TOLERANCE = 1e-5  # max |probability difference| an export may show
+PARITY_ROWS = 10_000
+
+class _Nodes:
+    '''Accumulates the nodes of every tree into flat arrays.'''
+
+    def __init__(self, outputs):
+        self.outputs = outputs
+        self.columns = {name: [] for name in ('feature', 'threshold', 'left', 'right', 'default_left', 'missing_type')}
+        self.value = []
+        self.roots = []
+        self.depth = 0
+
+    def add_tree(self, feature, threshold, left, right, default_left, missing_type, leaf_value):
+        '''One tree in local node indices (-1 children at leaves); leaf_value is (nodes, outputs).'''
+        offset = len(self.value)
+        left, right = np.asarray(left), np.asarray(right)
+        self.roots.append(offset)
+        for name, column in (('feature', np.where(left < 0, -1, feature)), ('threshold', threshold),
+                             ('left', np.where(left < 0, -1, left + offset)),
+                             ('right', np.where(right < 0, -1, right + offset)),
+                             ('default_left', default_left), ('missing_type', missing_type)):
+            self.columns[name].extend(np.asarray(column).tolist())
+        self.value.extend(np.where((left < 0)[:, None], leaf_value, 0.0).tolist())
+        depth = np.zeros(len(left), dtype=int)
+        for i in range(len(left)):  # parents precede children in every supported layout
+            if left[i] >= 0:
+                depth[left[i]] = depth[right[i]] = depth[i] + 1
+        self.depth = max(self.depth, int(depth.max()))
+
+    def arrays(self, threshold_dtype):
+        return {
+            'feature': np.array(self.columns['feature'], dtype=np.int32),
+            'threshold': np.array(self.columns['threshold'], dtype=threshold_dtype),
+            'left': np.array(self.columns['left'], dtype=np.int32),
+            'right': np.array(self.columns['right'], dtype=np.int32),
+            'default_left': np.array(self.columns['default_left'], dtype=bool),
+            'missing_type': np.array(self.columns['missing_type'], dtype=np.int8),
+            'value': np.array(self.value, dtype=np.float64).reshape(-1, self.outputs),
+            'roots': np.array(self.roots, dtype=np.int32),
+            'depth': np.int32(self.depth),
+        }
+
+def _lgbm_arrays(model):
+    dump = model.booster_.dump_model()  # best iteration only, as predict_proba uses
+    objective = dump['objective'].split()
+    per_iteration = dump['num_tree_per_iteration']
+    if objective[0] not in ('multiclass', 'binary'):
+        raise TypeError(f"Cannot export LightGBM objective {dump['objective']}")
+    scale = float(objective[1].split(':')[1]) if objective[0] == 'binary' and len(objective) > 1 else 1.0
+    nodes = _Nodes(per_iteration)
+    missing_types = {'None': MISSING_NONE, 'Zero': MISSING_ZERO, 'NaN': MISSING_NAN}
+    for i, tree in enumerate(dump['tree_info']):
+        columns = {name: [] for name in ('feature', 'threshold', 'left', 'right', 'default_left', 'missing_type')}
+        leaf_value = []
+
+        def walk(node):
+            index = len(leaf_value)
+            leaf = 'leaf_value' in node
+            if not leaf and node['decision_type'] != '<=':
+                raise TypeError("Cannot export categorical LightGBM splits")
+            for name, value in (('feature', -1 if leaf else node['split_feature']),
+                                ('threshold', 0.0 if leaf else node['threshold']),
+                                ('left', -1), ('right', -1),
+                                ('default_left', False if leaf else node['default_left']),
+                                ('missing_type', MISSING_NONE if leaf else missing_types[node['missing_type']])):
+                columns[name].append(value)
+            row = [0.0] * per_iteration
+            row[i % per_iteration] = node['leaf_value'] if leaf else 0.0
+            leaf_value.append(row)
+            if not leaf:
+                columns['left'][index] = walk(node['left_child'])
+                columns['right'][index] = walk(node['right_child'])
+            return index
+
+        walk(tree['tree_structure'])
+        nodes.add_tree(**columns, leaf_value=np.array(leaf_value))
+    link = 'sigmoid' if objective[0] == 'binary' else 'softmax'
+    return nodes.arrays(np.float64), link, np.zeros(per_iteration), scale, False, np.float64
+
+def _xgb_arrays(model):
+    booster = model.get_booster()
+    learner = json.loads(booster.save_raw(raw_format='json'))['learner']
+    objective = learner['objective']['name']
+    if objective not in ('multi:softprob', 'multi:softmax', 'binary:logistic'):
+        raise TypeError(f"Cannot export XGBoost objective {objective}")
+    trees = learner['gradient_booster']['model']
+    rounds = len(trees['iteration_indptr']) - 1
+    try:
+        rounds = model.best_iteration + 1  # predict_proba stops there too
+    except AttributeError:
+        pass
+    outputs = 1 if objective == 'binary:logistic' else int(learner['learner_model_param']['num_class'])
+    nodes = _Nodes(outputs)
+    for tree, group in list(zip(trees['trees'], trees['tree_info']))[:trees['iteration_indptr'][rounds]]:
+        if any(tree['split_type']):
+            raise TypeError("Cannot export categorical XGBoost splits")
+        left = np.array(tree['left_children'])
+        leaf_value = np.zeros((len(left), outputs))
+        leaf_value[:, group] = tree['split_conditions']  # leaves keep their value in split_conditions
+        nodes.add_tree(tree['split_indices'], tree['split_conditions'], left, tree['right_children'],
+                       np.array(tree['default_left'], dtype=bool), np.full(len(left), MISSING_NAN),
+                       leaf_value)
+    base = np.atleast_1d(np.array(json.loads(learner['learner_model_param']['base_score']), dtype=float))
+    if objective == 'binary:logistic':
+        base = np.log(base / (1 - base))  # stored as a probability
+    return nodes.arrays(np.float32), 'sigmoid' if outputs == 1 else 'softmax', \
+        np.broadcast_to(base, (outputs,)).copy(), 1.0, True, np.float32
+
+def _forest_arrays(model):
+    nodes = _Nodes(len(model.classes_))
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        value = tree.value[:, 0, :]
+        missing_left = getattr(tree, 'missing_go_to_left', np.zeros(tree.node_count, dtype=bool))
+        nodes.add_tree(tree.feature, tree.threshold, tree.children_left, tree.children_right,
+                       missing_left.astype(bool), np.full(tree.node_count, MISSING_NAN),
+                       value / value.sum(axis=1, keepdims=True))
+    # sklearn casts inputs to float32 and compares them with float64 thresholds
+    return nodes.arrays(np.float64), 'mean', np.zeros(len(model.classes_)), 1.0, False, np.float32
+
+def export_trees(model, path, features, X_check=None):
+    '''
+    Write `model` (LightGBM, XGBoost or random forest) as a TreeEnsemble .npz.
+    With `X_check`, the export is loaded back and must reproduce the model's
+    predict_proba there within PARITY_TOLERANCE; returns the max difference.
+    '''
+    trained_on = getattr(model, 'feature_names_in_', None)
+    if trained_on is not None and list(trained_on) != list(features):
+        raise ValueError(f"Model was trained on features {list(trained_on)}")
+    if isinstance(model, LGBMClassifier):
+        exported = _lgbm_arrays(model)
+    elif isinstance(model, XGBClassifier):
+        exported = _xgb_arrays(model)
+    elif isinstance(model, RandomForestClassifier):
+        exported = _forest_arrays(model)
+    else:
+        raise TypeError(f"Cannot export a {type(model).__name__}")
+    arrays, link, intercept, scale, strict, input_dtype = exported
+    arrays.update(format=np.int32(TREE_FORMAT), link=np.array(link), intercept=intercept,
+                  scale=np.float64(scale), strict=np.bool_(strict), input_dtype=np.array(np.dtype(input_dtype).name),
+                  classes=np.asarray(model.classes_), features=np.array(features))
+    with open(path + '.tmp', 'wb') as f:
+        np.savez(f, **arrays)
+    if X_check is None:
+        os.replace(path + '.tmp', path)
+        return None
+    ensemble = TreeEnsemble.load(path + '.tmp', features)
+    diff = float(np.max(np.abs(ensemble.predict_proba(np.asarray(X_check))
+                               - model.predict_proba(_frame(X_check, features)))))
+    if diff > PARITY_TOLERANCE:
+        os.remove(path + '.tmp')
+        raise ValueError(f"Exported ensemble differs from the model by {diff:.2e}")
+    os.replace(path + '.tmp', path)
+    return diff
+
+# ----------------------------------------------------------------------
+# Driver
+# ----------------------------------------------------------------------
+def run(dataset, families, n_splits=5, workers=None, threads=1, cache_root='models/cv_cache',
+        output_dir=MODEL_CANDIDATES_DIR, fresh=False, params=None):
+    params = params or {}
+    cache = cache_dir(cache_root, dataset, n_splits)
+    os.makedirs(cache, exist_ok=True)
     os.makedirs(output_dir, exist_ok=True)
+    if fresh:
+        for name in os.listdir(cache):
+            if name.endswith(('.json', '.npy')):
+                os.remove(os.path.join(cache, name))
+    data = prepare_dataset(dataset, cache)
+    ds = Dataset(data)
+
+    # FEATURES & LABELS
+    FEATURES = ds.features # every non-label column; for demonstration purposes. Not exactly what I use
+    X, y = ds.X, ds.y
+    plan = folds(len(ds), n_splits)
+
+    train, test = plan['holdout']
+    print("Train size:", train[1] - train[0], "Test size:", test[1] - test[0])
+    print("Train label dist:\n", pd.Series(y[train[0]:train[1]]).value_counts(normalize=True).sort_index())
+    print("Test label dist:\n", pd.Series(y[test[0]:test[1]]).value_counts(normalize=True).sort_index())
+
+    results = {}
+    pending = []
+    for fold, (tr, val) in plan.items():
+        for family in families:
+            out = output_dir if fold == 'holdout' else None
+            result = cached_result(cache, fold, family, out, params.get(family))
+            if result is not None:
+                results[(fold, family)] = result
+            else:
+                pending.append((fold, family, tr, val, out))
+    if results:
+        print(f"\nResuming: {len(results)} fold result(s) loaded from {cache}")
 
-    # Save RandomForest + SMOTE
-    path_rf_smote = os.path.join(output_dir, "rf_smote.joblib")
-    joblib.dump(rf_smote, path_rf_smote)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # SMOTE each fold that still needs an rf_smote fit, once
+        smote_folds = {fold: tr for fold, family, tr, _, _ in pending if family == 'rf_smote'}
+        for future in as_completed([pool.submit(smote_fold, data, cache, fold, tr) for fold, tr in smote_folds.items()]):
+            print(f"SMOTE resampled {future.result()}")
 
-    # Save RandomForest + Class Weights
-    path_rf_cw = os.path.join(output_dir, "rf_classweights.joblib")
-    joblib.dump(rf_cw, path_rf_cw)
+        futures = [pool.submit(fit_fold, data, cache, fold, family, tr, val, threads, out, params.get(family))
+                   for fold, family, tr, val, out in pending]
+        for future in as_completed(futures):
+            result = future.result()
+            results[(result['fold'], result['family'])] = result
+            print(f"{result['fold']:<8} {FAMILIES[result['family']]:<17} Balanced Acc: {result['balanced_accuracy']:.4f}")
 
-    # Save XGBoost + Class Weights
-    path_xgb_cw = os.path.join(output_dir, "xgb_classweights.json")
-    xgb_cw.save_model(path_xgb_cw)
+    # HOLDOUT (80/20) REPORTS
+    for family in families:
+        result = results[('holdout', family)]
+        name = FAMILIES[family]
+        print(f"\n{name} Classification Report:")
+        print(result['report'])
+        print(f"{name} Confusion Matrix:")
+        print(np.array(result['confusion']))
+        print(f"{name} Balanced Acc:", result['balanced_accuracy'])
+        print(f"{name} MCC:      ", result['mcc'])
+
+    # SUMMARIZE ROLLING CV
+    print("\n## Rolling CV Balanced Accuracy Averages ##")
+    for family in families:
+        scores = [results[(f'fold{i}', family)]['balanced_accuracy'] for i in range(1, n_splits + 1)]
+        print(f"{FAMILIES[family]:<17}: {np.mean(scores):.4f} ± {np.std(scores):.4f}")
 
     print("\nModels saved to directory:", output_dir)
 
-    # Load models for checks
-    # Load RF+SMOTE
-    loaded_rf_smote = joblib.load(path_rf_smote)
-
-    # Load RF+ClassWeights
-    loaded_rf_cw = joblib.load(path_rf_cw)
-
-    # Load XGB+ClassWeights
-    loaded_xgb_cw = XGBClassifier(objective='multi:softprob',
-                                  num_class=3,
-                                  learning_rate=0.1,
-                                  max_depth=5,
-                                  n_estimators=200,
-                                  eval_metric='mlogloss',
-                                  use_label_encoder=False,
-                                  random_state=42)
-    loaded_xgb_cw.load_model(path_xgb_cw) 
-
-    # SANITY CHECK ON LOADED MODEL
-    print("\nSanity Check (RF+SMOTE):", loaded_rf_smote.score(X_test, y_test))
-    print("Sanity Check (RF+ClassWeights):", loaded_rf_cw.score(X_test, y_test))
-    print("Sanity Check (XGB+ClassWeights):", loaded_xgb_cw.score(X_test, y_test))
+    # SANITY CHECK ON LOADED MODELS
+    X_test = _frame(X[test[0]:test[1]], FEATURES)
+    y_test = np.asarray(y[test[0]:test[1]])
+    for family in families:
+        path = os.path.join(output_dir, ARTIFACTS[family])
+        if family == 'xgb_cw':
+            loaded = make_model(family)
+            loaded.load_model(path)
+        else:
+            loaded = joblib.load(path)
+        print(f"Sanity Check ({FAMILIES[family]}):", loaded.score(X_test, y_test))
+    return results
+
+def search(dataset, families, n_splits=5, workers=None, cache_root='models/cv_cache', output_dir=MODEL_CANDIDATES_DIR,
+           budget_time=None, budget_cpu=None, trials=None, min_trees=MIN_TREES, max_trees=MAX_TREES,
+           eta=ETA, seed=42):
+    '''
+    Successive halving per family until the wall-clock or CPU budget (seconds)
+    runs out: each bracket samples `trials` parameter sets, scores them on
+    every walk-forward fold with the first rung's tree count, keeps the best
+    1/eta and grows the trees by eta, until one set reaches max_trees. The
+    holdout is never looked at. Best parameters go to <output>/best_params.json.
+    '''
+    cache = cache_dir(cache_root, dataset, n_splits)
+    os.makedirs(cache, exist_ok=True)
+    os.makedirs(output_dir, exist_ok=True)
+    data = prepare_dataset(dataset, cache)
+    plan = {name: f for name, f in folds(len(Dataset(data)), n_splits).items() if name != 'holdout'}
+    history = TrialHistory(os.path.join(cache, 'search_history.jsonl'))
+    if history.records:
+        print(f"Resuming: {len(history.records)} trial(s) loaded from {history.path}")
+    ladder = rungs(min_trees, max_trees, eta)
+    trials = trials or eta ** (len(ladder) - 1)
+    started, cpu = time.monotonic(), 0.0
+
+    def exhausted():
+        return ((budget_time is not None and time.monotonic() - started >= budget_time)
+                or (budget_cpu is not None and cpu >= budget_cpu))
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        if 'rf_smote' in families:
+            for future in as_completed([pool.submit(smote_fold, data, cache, fold, tr)
+                                        for fold, (tr, _) in plan.items()]):
+                future.result()
+        bracket = 0
+        while not exhausted():
+            # Seeded per bracket, so a resumed search regenerates the same candidates;
+            # the families climb their rungs side by side and share the budget
+            configs = {family: [sample_params(family, np.random.default_rng([seed, bracket, list(FAMILIES).index(family)]))
+                                for _ in range(trials)] for family in families}
+            for rung, trees in enumerate(ladder):
+                if exhausted() or not configs:
+                    break
+                candidates = {family: [{**c, 'n_estimators': trees} for c in cs] for family, cs in configs.items()}
+                tasks = {pool.submit(trial_fold, data, cache, family, params, fold, tr, val): (family, params, fold)
+                         for family, ps in candidates.items() for params in ps for fold, (tr, val) in plan.items()
+                         if history.get(family, params, fold) is None}
+                for future in as_completed(tasks):
+                    if future.cancelled():
+                        continue
+                    family, params, fold = tasks[future]
+                    score, used = future.result()
+                    cpu += used
+                    history.add({'family': family, 'params': params, 'fold': fold, 'score': score,
+                                 'cpu': used, 'bracket': bracket, 'rung': rung})
+                    if exhausted():
+                        # Let running trials finish and record them; drop the queued ones
+                        for pending in tasks:
+                            pending.cancel()
+                for family, ps in candidates.items():
+                    means = [history.mean(family, p, plan) for p in ps]
+                    if any(m is None for m in means):
+                        del configs[family]
+                        continue
+                    order = np.argsort(means)[::-1]
+                    configs[family] = [configs[family][i] for i in order[:max(1, len(ps) // eta)]]
+                    print(f"{FAMILIES[family]:<17} bracket {bracket} rung {rung}: {len(ps)} x {trees} trees, "
+                          f"best {means[order[0]]:.4f}  ({time.monotonic() - started:.0f}s, {cpu:.0f} cpu-s)")
+            bracket += 1
+
+    best_path = os.path.join(output_dir, 'best_params.json')
+    best = {}
+    if os.path.exists(best_path):
+        with open(best_path) as f:
+            best = json.load(f)
+    print("\n## Search results (mean walk-forward balanced accuracy) ##")
+    for family in families:
+        params, score = history.best(family, plan)
+        if params is None:
+            print(f"{FAMILIES[family]:<17}: no complete trial within the budget")
+            continue
+        best[family] = params
+        print(f"{FAMILIES[family]:<17}: {score:.4f}  {params}")
+    with open(best_path, 'w') as f:
+        json.dump(best, f, indent=2)
+    print(f"\nBest parameters written to {best_path}; train with --params {best_path}")
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description='Walk-forward CV and training of the signal models.')
+    parser.add_argument('dataset', help='columnar dataset directory, or a CSV of features (or raw OHLCV) with timestamp and label columns')
+    parser.add_argument('--models', nargs='+', choices=list(FAMILIES), default=list(FAMILIES),
+                        help='model families to evaluate and train')
+    parser.add_argument('--splits', type=int, default=5, help='TimeSeriesSplit folds')
+    parser.add_argument('--workers', type=int, default=None, help='parallel fits (default: CPU count)')
+    parser.add_argument('--threads', type=int, default=1, help='threads per fit')
+    parser.add_argument('--cache', default='models/cv_cache', help='fold data and result cache')
+    parser.add_argument('--output', help=f'where artifacts are written (default: {MODEL_CANDIDATES_DIR}; '
+                                         f'{MODEL_DIR} for --refresh)')
+    parser.add_argument('--fresh', action='store_true', help='ignore cached fold results')
+    parser.add_argument('--params', help='JSON of family -> model parameters (as written by --search)')
+    search_args = parser.add_argument_group('hyperparameter search')
+    search_args.add_argument('--search', action='store_true', help='search parameters instead of training')
+    search_args.add_argument('--budget-time', type=float, help='wall-clock seconds (default 3600 without --budget-cpu)')
+    search_args.add_argument('--budget-cpu', type=float, help='CPU seconds summed over all trials')
+    search_args.add_argument('--trials', type=int, help='parameter sets per bracket (default eta ** rungs)')
+    search_args.add_argument('--min-trees', type=int, default=MIN_TREES)
+    search_args.add_argument('--max-trees', type=int, default=MAX_TREES)
+    search_args.add_argument('--eta', type=int, default=ETA, help='keep 1/eta of the trials per rung')
+    search_args.add_argument('--seed', type=int, default=42)
+    refresh_args = parser.add_argument_group('warm-start refresh')
+    refresh_args.add_argument('--refresh', nargs='?', const='', metavar='MODEL',
+                              help='grow the production model (or MODEL) on the bars since its last refresh')
+    refresh_args.add_argument('--rounds', type=int, default=REFRESH_ROUNDS, help='boosting rounds or trees to add')
+    refresh_args.add_argument('--since', help='end of the model\'s training data (ms or ISO); default from its metadata')
+    refresh_args.add_argument('--holdout', type=float, default=REFRESH_HOLDOUT, help='share of new bars held out')
+    refresh_args.add_argument('--tolerance', type=float, default=0.0, help='allowed holdout balanced accuracy drop')
+    refresh_args.add_argument('--force', action='store_true', help='write the artifact even if it scores worse')
+    parser.add_argument('--export', metavar='MODEL',
+                        help='write MODEL as a NumPy tree ensemble (.npz) in --output, checked on the dataset')
+    args = parser.parse_args()
+    output = args.output or (MODEL_DIR if args.refresh is not None else MODEL_CANDIDATES_DIR)
+    if args.export:
+        model = joblib.load(args.export)
+        ds = Dataset(prepare_dataset(args.dataset, cache_dir(args.cache, args.dataset, 0)))
+        columns = [ds.features.index(f) for f in PIPELINE_FEATURES]
+        X_check = np.asarray(ds.X[-PARITY_ROWS:])[:, columns]
+        path = os.path.join(output, os.path.splitext(os.path.basename(args.export))[0] + '.npz')
+        os.makedirs(output, exist_ok=True)
+        diff = export_trees(model, path, PIPELINE_FEATURES, X_check)
+        print(f"Exported {args.export} -> {path} (max probability difference {diff:.1e} on {len(X_check)} rows)")
+        return
+    if args.refresh is not None:
+        path = refresh(args.dataset, args.refresh or None, output, args.rounds, args.since,
+                       args.holdout, args.tolerance, args.force, args.cache)
+        raise SystemExit(0 if path else 1)
+    if args.search:
+        budget_time = args.budget_time if args.budget_time or args.budget_cpu else 3600
+        search(args.dataset, args.models, args.splits, args.workers, args.cache, output,
+               budget_time, args.budget_cpu, args.trials, args.min_trees, args.max_trees, args.eta, args.seed)
+        return
+    params = None
+    if args.params:
+        with open(args.params) as f:
+            params = json.load(f)
+    run(args.dataset, args.models, args.splits, args.workers, args.threads,
+        args.cache, output, args.fresh, params)
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print('[USAGE]: model_training.py <path/to/train_data>')
-    else:
-        main()
+    main()
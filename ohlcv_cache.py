@@ -0,0 +1,259 @@
+## File: ohlcv_cache.py
+
+import asyncio
+import logging
+import threading
+import time
+import ccxt
+import numpy as np
+import pandas as pd
+from config_setup import TIMEFRAME, FETCH_LIMIT, BASE_TIMEFRAME, BASE_REFRESH
+
+logger = logging.getLogger(__name__)
+
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+
+def timeframe_ms(timeframe):
+    return ccxt.Exchange.parse_timeframe(timeframe) * 1000
+
+
+def resample(ts, values, tf_ms):
+    """
+    Aggregate ascending bars into `tf_ms` buckets: first open, max high,
+    min low, last close, summed volume. Returns [ts, o, h, l, c, v] rows.
+    """
+    if not len(ts):
+        return np.zeros((0, 6))
+    bucket = ts // tf_ms * tf_ms
+    starts = np.flatnonzero(np.concatenate([[True], bucket[1:] != bucket[:-1]]))
+    ends = np.append(starts[1:], len(ts)) - 1
+    return np.column_stack([
+        bucket[starts],
+        values[starts, 0],
+        np.maximum.reduceat(values[:, 1], starts),
+        np.minimum.reduceat(values[:, 2], starts),
+        values[ends, 3],
+        np.add.reduceat(values[:, 4], starts),
+    ])
+
+
+class OHLCVBuffer:
+    """
+    Bounded OHLCV series for one (symbol, timeframe).
+
+    Rows are written into a 2x capacity block that is compacted when full,
+    so the newest `capacity` bars are always available as a contiguous view
+    and appends are amortised O(1).
+    """
+
+    def __init__(self, capacity=FETCH_LIMIT):
+        self.capacity = capacity
+        self._ts = np.zeros(2 * capacity, dtype=np.int64)
+        self._values = np.zeros((2 * capacity, len(OHLCV_COLUMNS)))
+        self._start = 0
+        self._end = 0
+
+    def __len__(self):
+        return self._end - self._start
+
+    @property
+    def last_ts(self):
+        return int(self._ts[self._end - 1]) if len(self) else None
+
+    def _append(self, ts, values):
+        if self._end == len(self._ts):
+            keep = min(len(self), self.capacity - 1)
+            self._ts[:keep] = self._ts[self._end - keep:self._end]
+            self._values[:keep] = self._values[self._end - keep:self._end]
+            self._start, self._end = 0, keep
+        self._ts[self._end] = ts
+        self._values[self._end] = values
+        self._end += 1
+        if len(self) > self.capacity:
+            self._start += 1
+
+    def merge(self, bars):
+        """
+        Merge ccxt OHLCV rows ([ts, o, h, l, c, v], ascending). A bar with the
+        same timestamp as a stored one overwrites it in place (the forming bar),
+        newer bars are appended and bars older than the buffer are ignored.
+        Returns the number of newly appended bars.
+        """
+        appended = 0
+        for bar in bars:
+            ts = int(bar[0])
+            last = self.last_ts
+            if last is None or ts > last:
+                self._append(ts, bar[1:6])
+                appended += 1
+            elif ts == last:
+                self._values[self._end - 1] = bar[1:6]
+            else:
+                pos = self._start + np.searchsorted(self._ts[self._start:self._end], ts)
+                if pos < self._end and self._ts[pos] == ts:
+                    self._values[pos] = bar[1:6]
+        return appended
+
+    def arrays(self, n=None):
+        """Zero-copy (timestamps, values) views of the newest `n` bars."""
+        start = self._start if n is None else max(self._start, self._end - n)
+        return self._ts[start:self._end], self._values[start:self._end]
+
+    def frame(self, n=None):
+        """DataFrame in the same layout fetch_ohlcv returns."""
+        ts, values = self.arrays(n)
+        index = pd.DatetimeIndex(pd.to_datetime(ts, unit='ms'), name='timestamp')
+        return pd.DataFrame(values.copy(), index=index, columns=OHLCV_COLUMNS)
+
+
+class OHLCVCache:
+    """
+    Shared per-(symbol, timeframe) OHLCV buffers with delta fetching.
+
+    The first fetch for a series seeds `limit` bars; later fetches only ask
+    the exchange for bars since the last stored timestamp, which returns the
+    forming bar (overwritten in place) plus anything that closed since.
+    If the series fell further behind than one page, it is re-seeded.
+    Series that a push feed keeps current are marked streaming and served
+    straight from the buffer.
+
+    With a `base_timeframe`, any timeframe that is a larger multiple of it
+    is derived rather than fetched: each fetch refreshes the symbol's base
+    series (once per BASE_REFRESH, shared by concurrent callers) and every
+    base merge re-aggregates the buckets it touched in all derived series of
+    that symbol. A derived series is seeded once, from the base when that
+    covers enough history and otherwise with a single request for the older
+    bars, and needs no requests of its own after that.
+    """
+
+    def __init__(self, capacity=FETCH_LIMIT, base_timeframe=BASE_TIMEFRAME):
+        self.capacity = capacity
+        self.base_timeframe = base_timeframe or None
+        self._buffers = {}
+        self._streaming = set()
+        self._derived = {}    # symbol -> timeframes resampled from its base series
+        self._refreshed = {}  # symbol -> monotonic time of the last base fetch
+        self._inflight = {}   # symbol -> base fetch in progress
+        self._lock = threading.Lock()
+
+    def derives(self, timeframe):
+        """True if `timeframe` is built from the base series."""
+        if not self.base_timeframe or timeframe == self.base_timeframe:
+            return False
+        base_ms, tf_ms = timeframe_ms(self.base_timeframe), timeframe_ms(timeframe)
+        return tf_ms > base_ms and tf_ms % base_ms == 0
+
+    def set_streaming(self, symbol, timeframe, streaming):
+        with self._lock:
+            if streaming:
+                self._streaming.add((symbol, timeframe))
+            else:
+                self._streaming.discard((symbol, timeframe))
+
+    def buffer(self, symbol, timeframe=TIMEFRAME):
+        with self._lock:
+            return self._buffers.get((symbol, timeframe))
+
+    def drop(self, symbol, timeframe=TIMEFRAME):
+        with self._lock:
+            self._buffers.pop((symbol, timeframe), None)
+
+    def _since(self, exchange, symbol, timeframe, limit):
+        """Timestamp to resume from, or None if the series needs seeding."""
+        buf = self.buffer(symbol, timeframe)
+        if buf is None or not len(buf):
+            return None
+        last = buf.last_ts
+        tf_ms = exchange.parse_timeframe(timeframe) * 1000
+        if (exchange.milliseconds() - last) // tf_ms >= limit:
+            return None
+        return last
+
+    def merge(self, symbol, timeframe, bars, reseed=False):
+        with self._lock:
+            buf = self._buffers.get((symbol, timeframe))
+            if buf is None or reseed:
+                buf = OHLCVBuffer(max(self.capacity, len(bars)))
+                self._buffers[(symbol, timeframe)] = buf
+            appended = buf.merge(bars)
+            if timeframe == self.base_timeframe and len(bars):
+                for derived in self._derived.get(symbol, ()):
+                    self._resample(symbol, derived, int(bars[0][0]))
+            return appended
+
+    def _first_full_bucket(self, symbol, tf_ms):
+        """Open time of the oldest `tf_ms` bucket the base series fully covers."""
+        base = self._buffers.get((symbol, self.base_timeframe))
+        if base is None or not len(base):
+            return None
+        first = int(base.arrays()[0][0])
+        return -(-first // tf_ms) * tf_ms
+
+    def _resample(self, symbol, timeframe, since):
+        """Rebuild the derived bars from the bucket holding `since` onwards (lock held)."""
+        derived = self._buffers.get((symbol, timeframe))
+        tf_ms = timeframe_ms(timeframe)
+        first_full = self._first_full_bucket(symbol, tf_ms)
+        if derived is None or first_full is None:
+            return
+        if len(derived) and derived.last_ts < first_full - tf_ms:
+            return  # a gap the base no longer covers; the next fetch re-seeds it
+        ts, values = self._buffers[(symbol, self.base_timeframe)].arrays()
+        start = np.searchsorted(ts, max(since // tf_ms * tf_ms, first_full))
+        derived.merge(resample(ts[start:], values[start:], tf_ms))
+
+    async def _refresh_base(self, exchange, symbol, refresh):
+        """Bring the symbol's base series up to date, sharing one request between callers."""
+        task = self._inflight.get(symbol)
+        if task is None:
+            fresh = time.monotonic() - self._refreshed.get(symbol, float('-inf')) < BASE_REFRESH
+            if fresh and not refresh:
+                return
+            task = asyncio.ensure_future(
+                self.fetch(exchange, symbol, self.base_timeframe, self.capacity, refresh))
+            self._inflight[symbol] = task
+            task.add_done_callback(lambda _: self._inflight.pop(symbol, None))
+        # Shielded, so a caller timing out does not cancel the others' fetch
+        await asyncio.shield(task)
+        self._refreshed[symbol] = time.monotonic()
+
+    async def _fetch_derived(self, exchange, symbol, timeframe, limit, refresh):
+        await self._refresh_base(exchange, symbol, refresh)
+        key = (symbol, timeframe)
+        tf_ms = timeframe_ms(timeframe)
+        with self._lock:
+            self._derived.setdefault(symbol, set()).add(timeframe)
+            first_full = self._first_full_bucket(symbol, tf_ms)
+            base = self._buffers[(symbol, self.base_timeframe)]
+            derived = self._buffers.get(key)
+            # Missing, or left behind by a base series that was re-seeded after a gap
+            stale = derived is None or not len(derived) or derived.last_ts < first_full - tf_ms
+            covered = (base.last_ts - first_full) // tf_ms + 1 >= limit
+            if stale and covered:
+                self._buffers[key] = OHLCVBuffer(max(self.capacity, limit))
+        if stale and not covered:
+            # History older than the base series still has to come from the exchange
+            bars = await exchange.fetch_ohlcv(symbol, timeframe=timeframe, limit=limit)
+            self.merge(symbol, timeframe, bars, reseed=True)
+        with self._lock:
+            if stale:
+                self._resample(symbol, timeframe, first_full)
+            return self._buffers[key].frame(limit)
+
+    async def fetch(self, exchange, symbol, timeframe=TIMEFRAME, limit=FETCH_LIMIT, refresh=False):
+        if self.derives(timeframe):
+            return await self._fetch_derived(exchange, symbol, timeframe, limit, refresh)
+        key = (symbol, timeframe)
+        if not refresh:
+            with self._lock:
+                if key in self._streaming and key in self._buffers:
+                    return self._buffers[key].frame(limit)
+        since = self._since(exchange, symbol, timeframe, limit)
+        if since is None:
+            bars = await exchange.fetch_ohlcv(symbol, timeframe=timeframe, limit=limit)
+        else:
+            bars = await exchange.fetch_ohlcv(symbol, timeframe=timeframe, since=since, limit=limit)
+        self.merge(symbol, timeframe, bars, reseed=since is None)
+        with self._lock:
+            return self._buffers[key].frame(limit)
@@ -1,26 +1,69 @@
-import time
+import asyncio
 import logging
+import time
 import ccxt
 from config_setup import RR_RATIO, MIN_SL_PERCENTAGE, DEFAULT_TP_PERCENTAGE
+from metrics import metrics
 
 logger = logging.getLogger(__name__)
 RETRY_ATTEMPTS = 3
 RETRY_DELAY = 1.0  # seconds
 
-def _retry(fn, *args, **kwargs):
-    """Retry wrapper for CCXT calls."""
+async def _retry(fn, *args, **kwargs):
+    """Retry wrapper for async CCXT calls; each attempt and backoff is timed."""
+    method = getattr(fn, '__name__', 'call')
     for attempt in range(1, RETRY_ATTEMPTS + 1):
+        started = time.perf_counter()
+        outcome = 'error'
         try:
-            return fn(*args, **kwargs)
+            result = await fn(*args, **kwargs)
+            outcome = 'ok'
+            return result
         except ccxt.NetworkError as e:
+            outcome = 'network_error'
             logger.warning(f"[Retry {attempt}] NetworkError: {e}")
-            time.sleep(RETRY_DELAY)
         except ccxt.ExchangeError as e:
+            outcome = 'exchange_error'
             logger.error(f"ExchangeError: {e}")
             break
+        finally:
+            metrics.observe('exchange_call_seconds', time.perf_counter() - started, method=method)
+            metrics.inc('exchange_calls_total', method=method, outcome=outcome)
+        with metrics.span('stage_seconds', loop='order', stage='retry_wait'):
+            await asyncio.sleep(RETRY_DELAY)
     return None
 
-def place_bracket_order(
+def bracket_levels(side: str, entry_price: float, atr: float):
+    """
+    ATR-based stop-loss / take-profit for a new position, bounded by the
+    configured minimum SL and default TP distances. Returns (sl, tp), or None
+    if the take-profit would not be on the profitable side of entry.
+    """
+    if side == 'buy':
+        sl = entry_price - (atr * 1.5)
+        default_sl = entry_price * (1 - MIN_SL_PERCENTAGE)
+        sl = max(sl, default_sl)    
+        tp = entry_price + (atr * RR_RATIO * 1.5)
+        default_tp = entry_price * (1 + DEFAULT_TP_PERCENTAGE)
+        tp = max(tp, default_tp)
+
+        if tp <= entry_price:
+            logger.error(f"Invalid TP for buy: TP={tp} must be > entry={entry_price}")
+            return None
+    else:  # sell
+        sl = entry_price + (atr * 1.5)
+        default_sl = entry_price * (1 + MIN_SL_PERCENTAGE)
+        sl = min(sl, default_sl)
+        tp = entry_price - (atr * RR_RATIO * 1.5)
+        default_tp = entry_price * (1 - DEFAULT_TP_PERCENTAGE)
+        tp = min(tp, default_tp)
+
+        if tp >= entry_price:
+            logger.error(f"Invalid TP for sell: TP={tp} must be < entry={entry_price}")
+            return None
+    return sl, tp
+
+async def place_bracket_order(
     exchange,
     symbol: str,
     side: str,
@@ -34,7 +77,7 @@ def place_bracket_order(
     Place a market or limit order with attached stop-loss and take-profit
     on Bybit via CCXT.
 
-    :param exchange: CCXT exchange instance
+    :param exchange: async CCXT exchange instance
     :param symbol: trading symbol, e.g. 'BTC/USDT'
     :param side: 'buy' or 'sell'
     :param amount: contract or asset amount
@@ -48,29 +91,10 @@ def place_bracket_order(
         return None
 
     # dynamic ATR based sl/tp placement
-    if side == 'buy':
-        sl = entry_price - (atr * 1.5)
-        default_sl = entry_price * (1 - MIN_SL_PERCENTAGE)
-        sl = max(sl, default_sl)    
-        tp = entry_price + (atr * RR_RATIO * 1.5)
-        default_tp = entry_price * (1 + DEFAULT_TP_PERCENTAGE)
-        tp = max(tp, default_tp)
-
-        if tp <= entry_price:
-            logger.error(f"Invalid TP for buy: TP={tp} must be > entry={entry_price}")
-            return None
-    else:  # sell
-        sl = entry_price + (atr * 1.5)
-        default_sl = entry_price * (1 + MIN_SL_PERCENTAGE)
-        sl = min(sl, default_sl)
-        tp = entry_price - (atr * RR_RATIO * 1.5)
-        default_tp = entry_price * (1 - DEFAULT_TP_PERCENTAGE)
-        tp = min(tp, default_tp)
-
-        if tp >= entry_price:
-            logger.error(f"Invalid TP for sell: TP={tp} must be < entry={entry_price}")
-            return None
-    print(side, entry_price, sl, default_sl, tp, default_tp)
+    levels = bracket_levels(side, entry_price, atr)
+    if levels is None:
+        return None
+    sl, tp = levels
     params = {
         'reduceOnly': False,
         'stopLoss': {
@@ -83,27 +107,27 @@ def place_bracket_order(
         },
     }
     try:
-        print(side)
-        if entry_type == 'market':
-            order = _retry(
-                exchange.create_order,
-                symbol,
-                entry_type,
-                side,
-                amount,
-                None,
-                params
-            )
-        else:
-            order = _retry(
-                exchange.create_order,
-                symbol,
-                'limit',
-                side,
-                amount,
-                entry_price,
-                params
-            )
+        with metrics.span('stage_seconds', loop='order', stage='submit'):
+            if entry_type == 'market':
+                order = await _retry(
+                    exchange.create_order,
+                    symbol,
+                    entry_type,
+                    side,
+                    amount,
+                    None,
+                    params
+                )
+            else:
+                order = await _retry(
+                    exchange.create_order,
+                    symbol,
+                    'limit',
+                    side,
+                    amount,
+                    entry_price,
+                    params
+                )
 
         if order:
             order_id = order.get('id') or order.get('info', {}).get('orderId')
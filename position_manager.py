@@ -1,29 +1,43 @@
 ## File: position_manager.py
 
-import time
+import asyncio
 import logging
-from exchange_setup import init_exchange
-from data_and_indicators import fetch_ohlcv, compute_indicators
+from ohlcv_cache import OHLCVCache
+from indicator_engine import IndicatorEngine
+from data_and_indicators import OHLCVPanel, compute_panel_indicators
 from exit_strat import update_trailing_levels, should_exit
-from config_setup import TIMEFRAME, FETCH_LIMIT
+from config_setup import TIMEFRAME, FETCH_LIMIT, PANEL_MIN_POSITIONS
 from trade_logger import TradeLogger
+from market_snapshot import MarketSnapshot
+from metrics import metrics
 
 logger = logging.getLogger(__name__)
 
+# Indicator columns the exit logic reads; nothing else is computed for it
+EXIT_INDICATORS = ['atr', 'dif', 'dea', 'ema_fast', 'ema_slow']
+EXIT_COLUMNS = ['close', *EXIT_INDICATORS]
+
 class PositionManager:
-    def __init__(self, exchange=None):
-        self.exchange = exchange or init_exchange()
-        self.logger = TradeLogger(self.exchange)
+    def __init__(self, exchange, indicators=None, ohlcv=None, feed=None,
+                 trade_logger=None, snapshot=None):
+        # exchange: async ccxt client from exchange_setup.init_async_exchange
+        self.exchange = exchange
+        self.indicators = indicators or IndicatorEngine()
+        self.ohlcv = ohlcv or OHLCVCache()
+        self.feed = feed
+        self.logger = trade_logger or TradeLogger(self.exchange)
+        self.snapshot = snapshot or MarketSnapshot(self.exchange)
 
-    def close_position(self, symbol, side, size, exit_price):
+    async def close_position(self, symbol, side, size, exit_price):
         '''Close market position and log exit using stored order_id.'''
         try:
             # 1) Execute the actual market close
-            close_order = self.exchange.create_market_order(
+            close_order = await self.exchange.create_market_order(
                 symbol=symbol,
                 side=side,
                 amount=abs(size)
             )
+            self.snapshot.invalidate('balance', 'positions')
             logger.info(f"Closed {symbol} position @ {exit_price}")
             
             # 2) Look up our original entry to get its order_id
@@ -41,11 +55,11 @@ class PositionManager:
         except Exception as e:
             logger.error(f"Failed to close {symbol}: {e}")
 
-    def close_all_positions(self):
+    async def close_all_positions(self):
         """
         Immediately close all open positions on the exchange and log exits.
         """
-        positions = self.exchange.fetch_positions()
+        positions = await self.snapshot.positions(refresh=True)
         for pos in positions:
             symbol = pos['symbol'].replace('/','').replace(':USDT','')
             size = float(pos['contracts'])
@@ -53,64 +67,97 @@ class PositionManager:
                 continue
             side = 'sell' if pos['side'] == 'long' else 'buy'
             # latest price
-            ticker = self.exchange.fetch_ticker(pos['symbol'])
+            ticker = await self.snapshot.ticker(pos['symbol'])
             exit_price = float(ticker['last'])
-            self.close_position(symbol, side, size, exit_price)
+            await self.close_position(symbol, side, size, exit_price)
 
 
-    def update_positions(self):
+    async def update_positions(self):
         try:
-            self.logger.reconcile_closed_orders()
+            with metrics.span('stage_seconds', loop='management', stage='reconcile'):
+                await self.logger.reconcile_closed_orders()
             print('checking the reconcile')
-            positions = self.exchange.fetch_positions()
+            with metrics.span('stage_seconds', loop='management', stage='positions'):
+                if self.feed and self.feed.private_live:
+                    positions = self.feed.position_list()
+                else:
+                    positions = await self.snapshot.positions()
         except Exception as e:
             logger.error(f"Fetch error: {e}")
             return
 
+        if self.feed:
+            # Stream bars and mark prices for whatever is open right now
+            open_symbols = [
+                p['symbol'].replace('/','').replace(':USDT','')
+                for p in positions if float(p['contracts'] or 0) != 0
+            ]
+            await self.feed.subscribe_klines(open_symbols, '3m')
+            await self.feed.subscribe_tickers(open_symbols)
+
+        open_positions = []
+        frames = {}
         for pos in positions:
             symbol = pos['symbol'].replace('/','').replace(':USDT','')
             size = float(pos['contracts'])
             if size == 0:
                 continue
-            df = fetch_ohlcv(self.exchange, symbol, '3m', FETCH_LIMIT)
-            df = compute_indicators(df)
-            current_price = float(df['close'].iloc[-1])
-            atr = df['atr'].iloc[-1]
-            if should_exit(
-                side=pos['side'],
-                closes=df['close'].to_numpy(),
-                macd=df['dif'].to_numpy(),
-                macd_signal=df['dea'].to_numpy(),
-                ema_fast=df['ema_fast'].to_numpy(),
-                ema_slow=df['ema_slow'].to_numpy()
-            ):
-                #ord_id = self.exchange.fetch_open_orders(symbol)['id']
-                self.close_position(
-                    #order_id = ord_id,
-                    symbol=symbol,
-                    side='sell' if pos['side']=='long' else 'buy',
-                    size=size,
-                    exit_price=current_price
+            open_positions.append((symbol, size, pos))
+            with metrics.span('stage_seconds', loop='management', stage='fetch'):
+                frames[symbol] = await self.ohlcv.fetch(self.exchange, symbol, '3m', FETCH_LIMIT)
+        with metrics.span('stage_seconds', loop='management', stage='indicators'):
+            bars = self.exit_bars(frames)
+
+        for symbol, size, pos in open_positions:
+            if symbol not in bars:
+                logger.warning(f"No 3m bars for {symbol}; exit checks skipped")
+                continue
+            series = bars[symbol]
+            current_price = float(series['close'][-1])
+            atr = series['atr'][-1]
+            with metrics.span('stage_seconds', loop='management', stage='exit_check'):
+                exit_now = should_exit(
+                    side=pos['side'],
+                    closes=series['close'],
+                    macd=series['dif'],
+                    macd_signal=series['dea'],
+                    ema_fast=series['ema_fast'],
+                    ema_slow=series['ema_slow']
                 )
+            if exit_now:
+                #ord_id = self.exchange.fetch_open_orders(symbol)['id']
+                with metrics.span('stage_seconds', loop='management', stage='close'):
+                    await self.close_position(
+                        #order_id = ord_id,
+                        symbol=symbol,
+                        side='sell' if pos['side']=='long' else 'buy',
+                        size=size,
+                        exit_price=current_price
+                    )
                 continue
             old_sl = float(pos.get('stopLossPrice', 0))
             old_tp = float(pos.get('takeProfitPrice', 0))
-            ticker = self.exchange.fetch_ticker(symbol)
-            mark_price = float(ticker['info']['markPrice'])
-            new_sl, new_tp = update_trailing_levels(
-                side=pos['side'],
-                close=current_price,
-                prev_sl=old_sl,
-                prev_tp=old_tp,
-                atr=atr,
-                ema=df['ema_fast'].iloc[-1],
-                mark_price=mark_price
-            )
+            with metrics.span('stage_seconds', loop='management', stage='mark_price'):
+                mark_price = self.feed.mark_price(symbol) if self.feed else None
+                if mark_price is None:
+                    ticker = await self.snapshot.ticker(symbol)
+                    mark_price = float(ticker['info']['markPrice'])
+            with metrics.span('stage_seconds', loop='management', stage='trailing'):
+                new_sl, new_tp = update_trailing_levels(
+                    side=pos['side'],
+                    close=current_price,
+                    prev_sl=old_sl,
+                    prev_tp=old_tp,
+                    atr=atr,
+                    ema=series['ema_fast'][-1],
+                    mark_price=mark_price
+                )
 
             THRESHOLD = current_price * 0.000000005
             if abs(new_sl-old_sl)>THRESHOLD or abs(new_tp-old_tp)>THRESHOLD:
                 open_trade = self.logger.get_open_trade_by_symbol(symbol)
-                updated = self._update_order(symbol, new_sl, new_tp)
+                with metrics.span('stage_seconds', loop='management', stage='sl_tp_update'):
+                    updated = await self._update_order(symbol, new_sl, new_tp)
                 if updated and open_trade and open_trade.get('order_id'):
                     self.logger.log_sl_tp_update(
                         order_id=open_trade['order_id'],
@@ -118,9 +165,30 @@ class PositionManager:
                         new_sl=new_sl,
                         old_tp=old_tp,
                         new_tp=new_tp                                                                                   )
-                time.sleep(0.3)
+                await asyncio.sleep(0.3)
+
+    def exit_bars(self, frames, use_panel=None):
+        '''
+        {symbol: {column: array}} of EXIT_COLUMNS for the fetched 3m `frames`.
+        From PANEL_MIN_POSITIONS symbols one panel pass over the cached bars
+        beats stepping the incremental engine once per symbol; `use_panel`
+        forces either path.
+        '''
+        if use_panel is None:
+            use_panel = len(frames) >= PANEL_MIN_POSITIONS
+        if use_panel:
+            panel = OHLCVPanel.from_cache(self.ohlcv, frames, '3m', FETCH_LIMIT)
+            compute_panel_indicators(panel, EXIT_INDICATORS)
+            bars = {symbol: panel.series(symbol, EXIT_COLUMNS) for symbol in frames if symbol in panel}
+        else:
+            bars = {}
+            for symbol, df in frames.items():
+                if not df.empty:
+                    df = self.indicators.update(symbol, '3m', df, EXIT_INDICATORS)
+                    bars[symbol] = {column: df[column].to_numpy() for column in EXIT_COLUMNS}
+        return {symbol: series for symbol, series in bars.items() if len(series['close'])}
 
-    def _update_order(self, symbol, sl, tp):
+    async def _update_order(self, symbol, sl, tp):
         params = {
             'category': 'linear',
             'symbol': symbol,
@@ -129,7 +197,8 @@ class PositionManager:
             'tpslMode': 'Full'
         }
         try:
-            resp = self.exchange.private_post_v5_position_trading_stop(params)
+            resp = await self.exchange.private_post_v5_position_trading_stop(params)
+            self.snapshot.invalidate('positions')
             if resp['retCode'] == '0':
                 logger.info(f"Updated SL/TP for {symbol} | SL={sl:.4f} TP={tp:.4f}")
                 return 1
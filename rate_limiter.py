@@ -0,0 +1,50 @@
+## File: rate_limiter.py
+
+import asyncio
+import time
+from config_setup import RATE_LIMIT_PER_SEC, SCAN_CONCURRENCY
+from metrics import metrics
+
+
+class RateLimiter:
+    """
+    Async token bucket shared by every coroutine that talks to the exchange.
+
+    Waiters are served in arrival order, so a burst of concurrent scans queues
+    up behind the limit instead of tripping the exchange's own throttling.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.wait_time = 0.0  # total seconds spent waiting for tokens
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    def for_exchange(cls, exchange, rate=RATE_LIMIT_PER_SEC, burst=SCAN_CONCURRENCY):
+        if not rate:
+            # ccxt's rateLimit is the minimum delay between requests in ms
+            rate_limit_ms = getattr(exchange, 'rateLimit', None) or 20
+            rate = 1000 / rate_limit_ms
+        return cls(rate, burst)
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, cost=1):
+        """Wait until `cost` requests may be sent; returns the seconds waited."""
+        started = time.monotonic()
+        async with self._lock:
+            self._refill()
+            while self.tokens < cost:
+                await asyncio.sleep((cost - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= cost
+        waited = time.monotonic() - started
+        self.wait_time += waited
+        metrics.observe('rate_limit_wait_seconds', waited)
+        return waited
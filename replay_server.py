@@ -0,0 +1,206 @@
+## File: replay_server.py
+"""
+Local stand-in for the Bybit V5 websocket streams, for testing MarketFeed
+offline. Replays OHLCV from CSV files (or a synthetic random walk) as
+kline/ticker pushes, serves a static position list on the private stream and
+can drop connections on purpose to exercise reconnect and gap backfill.
+
+    python replay_server.py --data ./replay --speed 60 --drop-after 500
+    FEED_MODE=ws WS_PUBLIC_URL=ws://127.0.0.1:8765/v5/public/linear \
+        WS_PRIVATE_URL=ws://127.0.0.1:8765/v5/private python main.py
+
+CSV files are looked up as <data>/<SYMBOL>_<timeframe>.csv with columns
+timestamp (ms), open, high, low, close, volume.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+import numpy as np
+import pandas as pd
+from aiohttp import web, WSMsgType
+from market_feed import TIMEFRAMES, INTERVALS
+
+logger = logging.getLogger(__name__)
+
+TF_SECONDS = {'1m': 60, '3m': 180, '5m': 300, '15m': 900, '30m': 1800,
+              '1h': 3600, '2h': 7200, '4h': 14400, '6h': 21600, '12h': 43200,
+              '1d': 86400}
+
+
+class ReplayServer:
+    def __init__(self, data_dir=None, speed=60.0, ticks=4, bars=2000,
+                 positions=None, drop_after=None, seed=42):
+        self.data_dir = data_dir
+        self.speed = speed
+        self.ticks = ticks
+        self.bars = bars
+        self.positions = positions or []
+        self.drop_after = drop_after
+        self.rng = np.random.default_rng(seed)
+        self.t0 = time.monotonic()
+        self.last_price = {}
+        self._series = {}
+
+    def clock(self):
+        """Replay seconds elapsed since the server started."""
+        return (time.monotonic() - self.t0) * self.speed
+
+    def series(self, symbol, timeframe):
+        key = (symbol, timeframe)
+        if key not in self._series:
+            path = os.path.join(self.data_dir or '', f'{symbol}_{timeframe}.csv')
+            if self.data_dir and os.path.exists(path):
+                df = pd.read_csv(path)
+                bars = df[['timestamp', 'open', 'high', 'low', 'close', 'volume']].to_numpy()
+            else:
+                bars = self._synthetic(timeframe)
+            self._series[key] = bars
+        return self._series[key]
+
+    def _synthetic(self, timeframe):
+        tf_ms = TF_SECONDS[timeframe] * 1000
+        start = (int(time.time() * 1000) // tf_ms) * tf_ms
+        close = 100 * np.exp(np.cumsum(self.rng.normal(0, 0.002, self.bars)))
+        open_ = np.concatenate([[close[0]], close[:-1]])
+        spread = np.abs(self.rng.normal(0, 0.001, self.bars)) * close
+        high = np.maximum(open_, close) + spread
+        low = np.minimum(open_, close) - spread
+        volume = self.rng.gamma(2.0, 500.0, self.bars)
+        ts = start + np.arange(self.bars) * tf_ms
+        return np.column_stack([ts, open_, high, low, close, volume])
+
+    # ------------------------------------------------------------------
+    async def handle(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        private = request.path.endswith('/private')
+        tasks = []
+        sent = {'n': 0}
+
+        async def send(payload):
+            if ws.closed:
+                return
+            await ws.send_str(json.dumps(payload))
+            sent['n'] += 1
+            if self.drop_after and sent['n'] >= self.drop_after:
+                logger.info("Replay: dropping connection on purpose")
+                await ws.close()
+
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                req = json.loads(msg.data)
+                op = req.get('op')
+                if op == 'ping':
+                    await send({'op': 'pong', 'success': True})
+                elif op == 'auth':
+                    await send({'op': 'auth', 'success': True, 'ret_msg': ''})
+                elif op == 'subscribe':
+                    await send({'op': 'subscribe', 'success': True, 'ret_msg': ''})
+                    for topic in req.get('args', []):
+                        tasks.append(asyncio.create_task(self._stream(topic, send, private)))
+        finally:
+            for task in tasks:
+                task.cancel()
+        return ws
+
+    async def _stream(self, topic, send, private):
+        if topic.startswith('kline.'):
+            _, interval, symbol = topic.split('.', 2)
+            await self._stream_kline(topic, symbol, TIMEFRAMES[interval], send)
+        elif topic.startswith('tickers.'):
+            await self._stream_ticker(topic, topic.split('.', 1)[1], send)
+        elif topic == 'position' and private:
+            await self._stream_positions(send)
+
+    async def _stream_kline(self, topic, symbol, timeframe, send):
+        bars = self.series(symbol, timeframe)
+        tf_s = TF_SECONDS[timeframe]
+        tf_ms = tf_s * 1000
+        last_idx = None
+        while True:
+            pos = self.clock() / tf_s
+            idx = int(pos)
+            if idx >= len(bars):
+                return
+            if last_idx is not None and idx != last_idx:
+                await send(self._kline_msg(topic, timeframe, bars[last_idx], tf_ms, 1.0, True))
+            frac = pos - idx
+            await send(self._kline_msg(topic, timeframe, bars[idx], tf_ms, frac, False))
+            self.last_price[symbol] = bars[idx][1] + (bars[idx][4] - bars[idx][1]) * frac
+            last_idx = idx
+            await asyncio.sleep(tf_s / self.speed / self.ticks)
+
+    def _kline_msg(self, topic, timeframe, bar, tf_ms, frac, confirm):
+        ts, o, h, l, c, v = bar
+        if not confirm:
+            # Forming bar: walk the close from open towards the final close
+            c = o + (c - o) * frac
+            h, l, v = max(o, c), min(o, c), v * frac
+        now = int(time.time() * 1000)
+        return {
+            'topic': topic, 'type': 'snapshot', 'ts': now,
+            'data': [{
+                'start': int(ts), 'end': int(ts) + tf_ms - 1,
+                'interval': INTERVALS[timeframe],
+                'open': str(o), 'close': str(c), 'high': str(h), 'low': str(l),
+                'volume': str(v), 'turnover': str(v * c),
+                'confirm': confirm, 'timestamp': now,
+            }],
+        }
+
+    async def _stream_ticker(self, topic, symbol, send):
+        while True:
+            price = self.last_price.get(symbol)
+            if price is not None:
+                await send({
+                    'topic': topic, 'type': 'snapshot', 'ts': int(time.time() * 1000),
+                    'data': {'symbol': symbol, 'lastPrice': str(price), 'markPrice': str(price)},
+                })
+            await asyncio.sleep(1)
+
+    async def _stream_positions(self, send):
+        while True:
+            data = []
+            for pos in self.positions:
+                price = self.last_price.get(pos['symbol'])
+                data.append(dict(pos, markPrice=str(price)) if price else pos)
+            if data:
+                await send({'topic': 'position', 'creationTime': int(time.time() * 1000), 'data': data})
+            await asyncio.sleep(5)
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get('/v5/public/linear', self.handle)
+        app.router.add_get('/v5/private', self.handle)
+        return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay OHLCV over a Bybit V5 style websocket.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--data', help='directory of <SYMBOL>_<timeframe>.csv files')
+    parser.add_argument('--speed', type=float, default=60.0, help='replay seconds per wall second')
+    parser.add_argument('--ticks', type=int, default=4, help='forming-bar updates per bar')
+    parser.add_argument('--positions', help='JSON file with raw Bybit position rows')
+    parser.add_argument('--drop-after', type=int, help='close each connection after N messages')
+    args = parser.parse_args()
+
+    positions = None
+    if args.positions:
+        with open(args.positions) as f:
+            positions = json.load(f)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s:%(message)s')
+    server = ReplayServer(args.data, args.speed, args.ticks,
+                          positions=positions, drop_after=args.drop_after)
+    web.run_app(server.app(), host=args.host, port=args.port)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,594 @@
+## File: sim_exchange.py
+"""
+In-process simulated exchange for load testing the bot offline.
+
+SimExchange / AsyncSimExchange expose the subset of the ccxt bybit API the
+bot uses (OHLCV, tickers, balance, positions, orders, closed orders and the
+V5 trading-stop endpoint) on top of one shared SimMarket: synthetic 1m
+random walks per symbol, aggregated to any timeframe, with market/limit
+fills, SL/TP triggers and net (one-way) positions. Every call pays a
+simulated latency and is checked against a server-side request budget, so
+client-side rate limiting and back-pressure behave as they would live.
+
+Select it with EXCHANGE_ID=sim (init_exchange / init_async_exchange), or run
+the whole bot against it and report throughput, memory and rate-limit
+pressure:
+
+    python sim_exchange.py --symbols 500 --positions 100 --duration 300
+"""
+
+import argparse
+import asyncio
+import importlib
+import logging
+import os
+import resource
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+import ccxt
+import numpy as np
+import pandas as pd
+from config_setup import (
+    SIM_SYMBOLS, SIM_POSITIONS, SIM_BALANCE,
+    SIM_LATENCY_MS, SIM_RATE_LIMIT, SIM_SEED
+)
+
+logger = logging.getLogger(__name__)
+
+MINUTE_MS = 60_000
+HISTORY_MINUTES = 300 * 15  # enough 1m bars for FETCH_LIMIT bars of 15m
+GENERATE_CHUNK = 240        # 1m bars drawn per symbol at a time
+SLIPPAGE = 0.0002
+
+
+def market_id(symbol):
+    """'BTC/USDT:USDT' or 'BTCUSDT' -> 'BTCUSDT'."""
+    return symbol.split(':')[0].replace('/', '')
+
+
+def unified(symbol):
+    """'BTCUSDT' -> 'BTC/USDT:USDT' (linear perpetual)."""
+    mid = market_id(symbol)
+    return f'{mid[:-4]}/USDT:USDT'
+
+
+class _Series:
+    """Growing synthetic 1m bars for one symbol, trimmed to HISTORY_MINUTES."""
+
+    def __init__(self, rng, start_ms, price):
+        self.rng = rng
+        self.start = start_ms  # open time of row 0
+        self.bars = np.zeros((0, 5))
+        self.last_close = price
+
+    def extend_to(self, minute_ms):
+        need = (minute_ms - self.start) // MINUTE_MS + 1 - len(self.bars)
+        while need > 0:
+            n = max(need, GENERATE_CHUNK)
+            close = self.last_close * np.exp(np.cumsum(self.rng.normal(0, 0.0015, n)))
+            open_ = np.concatenate([[self.last_close], close[:-1]])
+            spread = np.abs(self.rng.normal(0, 0.0007, n)) * close
+            bars = np.column_stack([open_, np.maximum(open_, close) + spread,
+                                    np.minimum(open_, close) - spread, close,
+                                    self.rng.gamma(2.0, 500.0, n)])
+            self.bars = np.vstack([self.bars, bars])
+            self.last_close = close[-1]
+            need -= n
+        extra = len(self.bars) - 2 * HISTORY_MINUTES
+        if extra > 0:
+            self.bars = self.bars[extra:]
+            self.start += extra * MINUTE_MS
+
+    def window(self, start_ms, end_ms):
+        """1m (timestamps, rows) with open time in [start_ms, end_ms]."""
+        lo = max(0, (start_ms - self.start) // MINUTE_MS)
+        hi = (end_ms - self.start) // MINUTE_MS + 1
+        ts = self.start + np.arange(lo, hi) * MINUTE_MS
+        return ts, self.bars[lo:hi]
+
+
+class SimMarket:
+    """
+    Shared exchange state: prices, account, positions and order history.
+
+    Prices advance with the wall clock. The current 1m bar is revealed
+    progressively (its close walks from open to the pre-drawn close), so the
+    last price moves between calls. Stops and take-profits are checked
+    against the 1m highs/lows since a position was last looked at.
+    """
+
+    _shared = None
+
+    def __init__(self, symbols=SIM_SYMBOLS, positions=SIM_POSITIONS, balance=SIM_BALANCE,
+                 latency_ms=SIM_LATENCY_MS, rate_limit=SIM_RATE_LIMIT, seed=SIM_SEED):
+        self.rng = np.random.default_rng(seed)
+        self.symbols = [f'SIM{i:03d}USDT' for i in range(symbols)]
+        self.latency_ms = latency_ms
+        self.rate_limit = rate_limit
+        self.cash = float(balance)
+        self.positions = {}       # market id -> position dict
+        self.open_orders = {}     # order id -> resting limit order
+        self.closed_orders = []   # filled orders, oldest first
+        self._series = {}
+        self._next_id = 1
+        self._lock = threading.RLock()
+        self._tokens = float(rate_limit)
+        self._token_time = time.monotonic()
+        self.calls = Counter()
+        self.rejected = Counter()
+        self.latency = defaultdict(float)
+        self.started = time.time()
+        for symbol in self.symbols[:positions]:
+            self._seed_position(symbol)
+
+    @classmethod
+    def shared(cls):
+        """Process-wide market, so every exchange facade sees the same account."""
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    # ------------------------------------------------------------------
+    # Prices
+    # ------------------------------------------------------------------
+    def series(self, symbol):
+        mid = market_id(symbol)
+        s = self._series.get(mid)
+        if s is None:
+            if mid not in self.symbols:
+                raise ccxt.BadSymbol(f'sim: unknown symbol {symbol}')
+            now_min = self.now() // MINUTE_MS * MINUTE_MS
+            s = _Series(np.random.default_rng([SIM_SEED, self.symbols.index(mid)]),
+                        now_min - HISTORY_MINUTES * MINUTE_MS,
+                        float(10 ** self.rng.uniform(-1, 4)))
+            self._series[mid] = s
+        return s
+
+    @staticmethod
+    def now():
+        return int(time.time() * 1000)
+
+    def _minute_bars(self, symbol, start_ms, end_ms):
+        """1m bars in [start_ms, end_ms] with the current one partially formed."""
+        now = self.now()
+        current = now // MINUTE_MS * MINUTE_MS
+        s = self.series(symbol)
+        s.extend_to(current)
+        ts, bars = s.window(start_ms, min(end_ms, current))
+        if len(ts) and ts[-1] == current:
+            bars = bars.copy()
+            o, h, l, c, v = bars[-1]
+            frac = (now - current) / MINUTE_MS
+            c = o + (c - o) * frac
+            bars[-1] = [o, max(o, c, min(h, max(o, c) * 1.0002)), min(o, c, max(l, min(o, c) * 0.9998)), c, v * frac]
+        return ts, bars
+
+    def price(self, symbol):
+        now = self.now()
+        _, bars = self._minute_bars(symbol, now, now)
+        return float(bars[-1, 3])
+
+    def ohlcv(self, symbol, timeframe, since=None, limit=None):
+        tf_ms = ccxt.Exchange.parse_timeframe(timeframe) * 1000
+        limit = limit or 300
+        now = self.now()
+        last = now // tf_ms * tf_ms
+        start = since // tf_ms * tf_ms if since is not None else last - (limit - 1) * tf_ms
+        end = min(last, start + (limit - 1) * tf_ms)
+        ts, bars = self._minute_bars(symbol, start, end + tf_ms - 1)
+        if not len(ts):
+            return []
+        group = ts // tf_ms * tf_ms
+        starts = np.flatnonzero(np.concatenate([[True], group[1:] != group[:-1]]))
+        ends = np.concatenate([starts[1:], [len(ts)]]) - 1
+        out = np.column_stack([
+            group[starts],
+            bars[starts, 0],
+            np.maximum.reduceat(bars[:, 1], starts),
+            np.minimum.reduceat(bars[:, 2], starts),
+            bars[ends, 3],
+            np.add.reduceat(bars[:, 4], starts),
+        ])
+        return [[int(r[0]), *map(float, r[1:])] for r in out[-limit:]]
+
+    # ------------------------------------------------------------------
+    # Request budget / latency
+    # ------------------------------------------------------------------
+    def admit(self, method):
+        """Count a request and reject it when the server-side budget is spent."""
+        with self._lock:
+            self.calls[method] += 1
+            if not self.rate_limit:
+                return
+            now = time.monotonic()
+            self._tokens = min(self.rate_limit, self._tokens + (now - self._token_time) * self.rate_limit)
+            self._token_time = now
+            if self._tokens < 1:
+                self.rejected[method] += 1
+                raise ccxt.RateLimitExceeded(f'sim: too many visits ({method})')
+            self._tokens -= 1
+
+    def delay(self, method):
+        seconds = self.rng.lognormal(np.log(max(self.latency_ms, 1e-3) / 1000), 0.3) if self.latency_ms else 0.0
+        self.latency[method] += seconds
+        return seconds
+
+    # ------------------------------------------------------------------
+    # Account
+    # ------------------------------------------------------------------
+    def _new_id(self):
+        with self._lock:
+            oid = str(self._next_id)
+            self._next_id += 1
+            return oid
+
+    def _seed_position(self, symbol):
+        price = self.price(symbol)
+        side = 'long' if self.rng.random() < 0.5 else 'short'
+        sign = 1 if side == 'long' else -1
+        self.positions[symbol] = {
+            'symbol': symbol, 'side': side, 'contracts': round(100 / price, 6),
+            'entryPrice': price, 'stopLoss': price * (1 - sign * 0.02),
+            'takeProfit': price * (1 + sign * 0.04), 'checked': self.now(),
+        }
+
+    def _record(self, symbol, side, amount, price, kind, order_id=None):
+        order = {
+            'id': order_id or self._new_id(), 'clientOrderId': None,
+            'timestamp': self.now(), 'datetime': pd.Timestamp(self.now(), unit='ms').isoformat(),
+            'lastTradeTimestamp': self.now(), 'symbol': unified(symbol),
+            'type': 'market' if kind in ('Market', 'StopLoss', 'TakeProfit') else 'limit',
+            'side': side, 'price': price, 'average': price, 'amount': amount,
+            'filled': amount, 'remaining': 0.0, 'status': 'closed', 'fee': None,
+            'info': {'orderId': order_id, 'symbol': symbol, 'type': kind},
+        }
+        order['info']['orderId'] = order['id']
+        self.closed_orders.append(order)
+        if len(self.closed_orders) > 10_000:
+            del self.closed_orders[:5_000]
+        return order
+
+    def _fill(self, symbol, side, amount, price, kind='Market', order_id=None, sl=None, tp=None):
+        """Apply a fill to the net position and book realised PnL."""
+        sign = 1 if side == 'buy' else -1
+        pos = self.positions.get(symbol)
+        opened = amount  # what is left to open once the fill has netted against the position
+        if pos is not None:
+            pos_sign = 1 if pos['side'] == 'long' else -1
+            if pos_sign != sign:
+                closed = min(opened, pos['contracts'])
+                self.cash += closed * (price - pos['entryPrice']) * pos_sign
+                pos['contracts'] = round(pos['contracts'] - closed, 8)
+                opened = round(opened - closed, 8)
+                if pos['contracts'] <= 0:
+                    del self.positions[symbol]
+                    pos = None
+            else:
+                total = pos['contracts'] + opened
+                pos['entryPrice'] = (pos['entryPrice'] * pos['contracts'] + price * opened) / total
+                pos['contracts'] = total
+                opened = 0
+        if opened > 0:
+            pos = self.positions[symbol] = {
+                'symbol': symbol, 'side': 'long' if sign == 1 else 'short', 'contracts': opened,
+                'entryPrice': price, 'stopLoss': 0.0, 'takeProfit': 0.0, 'checked': self.now(),
+            }
+        if pos is not None:
+            if sl:
+                pos['stopLoss'] = float(sl)
+            if tp:
+                pos['takeProfit'] = float(tp)
+        return self._record(symbol, side, amount, price, kind, order_id)
+
+    def check_triggers(self, symbol=None):
+        """Fire stops/take-profits (and resting limits) hit since the last check."""
+        with self._lock:
+            for mid in [symbol] if symbol else list(self.positions):
+                pos = self.positions.get(mid)
+                if pos is None:
+                    continue
+                now = self.now()
+                _, bars = self._minute_bars(mid, pos['checked'], now)
+                pos['checked'] = now
+                if not len(bars):
+                    continue
+                low, high = bars[:, 2].min(), bars[:, 1].max()
+                close_side = 'sell' if pos['side'] == 'long' else 'buy'
+                sl, tp = pos['stopLoss'], pos['takeProfit']
+                if pos['side'] == 'long':
+                    hit = ('StopLoss', sl) if sl and low <= sl else ('TakeProfit', tp) if tp and high >= tp else None
+                else:
+                    hit = ('StopLoss', sl) if sl and high >= sl else ('TakeProfit', tp) if tp and low <= tp else None
+                if hit:
+                    self._fill(mid, close_side, pos['contracts'], hit[1], hit[0])
+            for oid, order in list(self.open_orders.items()):
+                if symbol and order['symbol'] != symbol:
+                    continue
+                price = self.price(order['symbol'])
+                if (order['side'] == 'buy' and price <= order['price']) or \
+                        (order['side'] == 'sell' and price >= order['price']):
+                    del self.open_orders[oid]
+                    self._fill(order['symbol'], order['side'], order['amount'], order['price'],
+                               'Limit', oid, order['sl'], order['tp'])
+
+    def equity(self):
+        unrealised = sum(p['contracts'] * (self.price(s) - p['entryPrice']) * (1 if p['side'] == 'long' else -1)
+                         for s, p in self.positions.items())
+        return self.cash + unrealised
+
+    def stats(self):
+        elapsed = max(time.time() - self.started, 1e-9)
+        total = sum(self.calls.values())
+        return {
+            'seconds': elapsed,
+            'requests': total,
+            'requests_per_sec': total / elapsed,
+            'rejected': sum(self.rejected.values()),
+            'calls': dict(self.calls),
+            'avg_latency_ms': {m: 1000 * self.latency[m] / (n - self.rejected[m])
+                               for m, n in self.calls.items() if n > self.rejected[m]},
+            'open_positions': len(self.positions),
+            'equity': self.equity(),
+        }
+
+
+class SimExchange:
+    """Synchronous ccxt-style facade over a SimMarket."""
+
+    id = 'sim'
+    timeframes = {tf: tf for tf in ('1m', '3m', '5m', '15m', '30m', '1h', '4h', '1d')}
+    parse_timeframe = staticmethod(ccxt.Exchange.parse_timeframe)
+
+    def __init__(self, market=None):
+        self.market = market or SimMarket.shared()
+        self.session = None
+        self.rateLimit = 1000 / self.market.rate_limit if self.market.rate_limit else 0
+        self.has = {'fetchClosedOrders': True, 'fetchTickers': True, 'fetchPositions': True}
+
+    def enable_demo_trading(self, enable=True):
+        pass
+
+    def milliseconds(self):
+        return self.market.now()
+
+    def _call(self, method, fn, *args, **kwargs):
+        self.market.admit(method)
+        time.sleep(self.market.delay(method))
+        with self.market._lock:
+            return fn(*args, **kwargs)
+
+    # ------------------------------------------------------------------
+    # Implementations (run under the market lock)
+    # ------------------------------------------------------------------
+    def _fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None, params=None):
+        return self.market.ohlcv(symbol, timeframe, since, limit)
+
+    def _ticker(self, mid):
+        price = self.market.price(mid)
+        return {
+            'symbol': unified(mid), 'timestamp': self.market.now(), 'last': price,
+            'bid': price * (1 - SLIPPAGE), 'ask': price * (1 + SLIPPAGE),
+            'info': {'symbol': mid, 'lastPrice': str(price), 'markPrice': str(price)},
+        }
+
+    def _fetch_ticker(self, symbol, params=None):
+        return self._ticker(market_id(symbol))
+
+    def _fetch_tickers(self, symbols=None, params=None):
+        mids = [market_id(s) for s in symbols] if symbols else self.market.symbols
+        return {unified(mid): self._ticker(mid) for mid in mids}
+
+    def _fetch_balance(self, params=None):
+        self.market.check_triggers()
+        total = self.market.equity()
+        used = sum(p['contracts'] * p['entryPrice'] for p in self.market.positions.values()) / 10
+        usdt = {'free': total - used, 'used': used, 'total': total}
+        return {'USDT': usdt, 'free': {'USDT': usdt['free']}, 'used': {'USDT': used},
+                'total': {'USDT': total}, 'info': {}}
+
+    def _position(self, pos):
+        mark = self.market.price(pos['symbol'])
+        sign = 1 if pos['side'] == 'long' else -1
+        return {
+            'symbol': unified(pos['symbol']), 'side': pos['side'],
+            'contracts': pos['contracts'], 'contractSize': 1.0,
+            'entryPrice': pos['entryPrice'], 'markPrice': mark,
+            'unrealizedPnl': pos['contracts'] * (mark - pos['entryPrice']) * sign,
+            'stopLossPrice': pos['stopLoss'], 'takeProfitPrice': pos['takeProfit'],
+            'info': {'symbol': pos['symbol'], 'side': 'Buy' if sign == 1 else 'Sell',
+                     'size': str(pos['contracts']), 'avgPrice': str(pos['entryPrice']),
+                     'markPrice': str(mark), 'stopLoss': str(pos['stopLoss']),
+                     'takeProfit': str(pos['takeProfit'])},
+        }
+
+    def _fetch_positions(self, symbols=None, params=None):
+        self.market.check_triggers()
+        wanted = {market_id(s) for s in symbols} if symbols else None
+        return [self._position(p) for mid, p in self.market.positions.items()
+                if wanted is None or mid in wanted]
+
+    def _create_order(self, symbol, type, side, amount, price=None, params=None):
+        params = params or {}
+        mid = market_id(symbol)
+        self.market.series(mid)
+        self.market.check_triggers(mid)
+        sl = (params.get('stopLoss') or {}).get('triggerPrice') if isinstance(params.get('stopLoss'), dict) else params.get('stopLoss')
+        tp = (params.get('takeProfit') or {}).get('triggerPrice') if isinstance(params.get('takeProfit'), dict) else params.get('takeProfit')
+        if amount is None or amount <= 0:
+            raise ccxt.InvalidOrder(f'sim: invalid amount {amount}')
+        last = self.market.price(mid)
+        if type == 'market' or (side == 'buy' and price >= last) or (side == 'sell' and price <= last):
+            fill = last * (1 + SLIPPAGE) if side == 'buy' else last * (1 - SLIPPAGE)
+            return self.market._fill(mid, side, float(amount), fill, 'Market', sl=sl, tp=tp)
+        oid = self.market._new_id()
+        self.market.open_orders[oid] = {'id': oid, 'symbol': mid, 'side': side, 'amount': float(amount),
+                                        'price': float(price), 'sl': sl, 'tp': tp}
+        return {'id': oid, 'symbol': unified(mid), 'type': 'limit', 'side': side, 'price': price,
+                'amount': amount, 'filled': 0.0, 'remaining': amount, 'status': 'open',
+                'timestamp': self.market.now(), 'info': {'orderId': oid, 'symbol': mid}}
+
+    def _fetch_open_orders(self, symbol=None, since=None, limit=None, params=None):
+        mid = market_id(symbol) if symbol else None
+        return [{'id': o['id'], 'symbol': unified(o['symbol']), 'type': 'limit', 'side': o['side'],
+                 'price': o['price'], 'amount': o['amount'], 'status': 'open', 'info': o}
+                for o in self.market.open_orders.values() if mid is None or o['symbol'] == mid]
+
+    def _fetch_closed_orders(self, symbol=None, since=None, limit=None, params=None):
+        self.market.check_triggers(market_id(symbol) if symbol else None)
+        mid = market_id(symbol) if symbol else None
+        orders = [o for o in self.market.closed_orders
+                  if (mid is None or o['info']['symbol'] == mid) and (since is None or o['timestamp'] >= since)]
+        return orders[:limit] if limit else orders
+
+    def _trading_stop(self, params):
+        mid = market_id(params['symbol'])
+        pos = self.market.positions.get(mid)
+        if pos is None:
+            return {'retCode': '10001', 'retMsg': 'can not set tp/sl/ts for zero position'}
+        sl, tp = float(params.get('stopLoss') or 0), float(params.get('takeProfit') or 0)
+        if sl == pos['stopLoss'] and tp == pos['takeProfit']:
+            return {'retCode': '34040', 'retMsg': 'not modified'}
+        pos['stopLoss'], pos['takeProfit'] = sl, tp
+        return {'retCode': '0', 'retMsg': 'OK', 'result': {}}
+
+    # ------------------------------------------------------------------
+    # ccxt surface
+    # ------------------------------------------------------------------
+    def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None, params=None):
+        return self._call('fetch_ohlcv', self._fetch_ohlcv, symbol, timeframe, since, limit, params)
+
+    def fetch_ticker(self, symbol, params=None):
+        return self._call('fetch_ticker', self._fetch_ticker, symbol, params)
+
+    def fetch_tickers(self, symbols=None, params=None):
+        return self._call('fetch_tickers', self._fetch_tickers, symbols, params)
+
+    def fetch_balance(self, params=None):
+        return self._call('fetch_balance', self._fetch_balance, params)
+
+    def fetch_positions(self, symbols=None, params=None):
+        return self._call('fetch_positions', self._fetch_positions, symbols, params)
+
+    def create_order(self, symbol, type, side, amount, price=None, params=None):
+        return self._call('create_order', self._create_order, symbol, type, side, amount, price, params)
+
+    def create_market_order(self, symbol, side, amount, price=None, params=None):
+        return self.create_order(symbol, 'market', side, amount, price, params)
+
+    def fetch_open_orders(self, symbol=None, since=None, limit=None, params=None):
+        return self._call('fetch_open_orders', self._fetch_open_orders, symbol, since, limit, params)
+
+    def fetch_closed_orders(self, symbol=None, since=None, limit=None, params=None):
+        return self._call('fetch_closed_orders', self._fetch_closed_orders, symbol, since, limit, params)
+
+    def private_post_v5_position_trading_stop(self, params=None):
+        return self._call('trading_stop', self._trading_stop, params or {})
+
+    def close(self):
+        pass
+
+
+class AsyncSimExchange(SimExchange):
+    """Async facade: the same calls as coroutines, with latency as asyncio.sleep."""
+
+    async def _call(self, method, fn, *args, **kwargs):
+        self.market.admit(method)
+        await asyncio.sleep(self.market.delay(method))
+        with self.market._lock:
+            return fn(*args, **kwargs)
+
+    async def create_market_order(self, symbol, side, amount, price=None, params=None):
+        return await self.create_order(symbol, 'market', side, amount, price, params)
+
+    async def close(self):
+        pass
+
+
+# ----------------------------------------------------------------------
+# Load test: the real bot against the simulated market
+# ----------------------------------------------------------------------
+def _rss_mb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def _report(market, every):
+    previous = Counter()
+    last = time.monotonic()
+    while True:
+        await asyncio.sleep(every)
+        now = time.monotonic()
+        window = Counter(market.calls)
+        window.subtract(previous)
+        previous, elapsed = Counter(market.calls), now - last
+        last = now
+        rates = ' '.join(f'{m}={n / elapsed:.1f}/s' for m, n in sorted(window.items()) if n)
+        print(f"sim: rss={_rss_mb():.0f}MB tasks={len(asyncio.all_tasks())} "
+              f"rejected={sum(market.rejected.values())} positions={len(market.positions)} | {rates}", flush=True)
+
+
+async def load_test(duration, report_every):
+    import main as bot
+    market = SimMarket.shared()
+    reporter = asyncio.create_task(_report(market, report_every))
+    rss_start = _rss_mb()
+    try:
+        await asyncio.wait_for(bot.main(), duration)
+    except asyncio.TimeoutError:
+        pass
+    finally:
+        reporter.cancel()
+    stats = market.stats()
+    stats['rss_start_mb'], stats['rss_end_mb'] = rss_start, _rss_mb()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the bot against the simulated exchange.')
+    parser.add_argument('--symbols', type=int, default=SIM_SYMBOLS)
+    parser.add_argument('--positions', type=int, default=SIM_POSITIONS)
+    parser.add_argument('--latency-ms', type=float, default=SIM_LATENCY_MS)
+    parser.add_argument('--rate-limit', type=float, default=SIM_RATE_LIMIT, help='server-side requests/s (0 = unlimited)')
+    parser.add_argument('--duration', type=float, default=300, help='seconds to run the bot')
+    parser.add_argument('--report', type=float, default=10, help='seconds between reports')
+    parser.add_argument('--model', help='model artifact (default: MODEL_PATH / newest in MODEL_DIR)')
+    args = parser.parse_args()
+
+    # Point the bot at the sim, and run it from a throwaway directory so its
+    # trade store, logs and balance file never touch the real ones
+    from config_setup import MODEL_PATH, MODEL_DIR
+    workdir = tempfile.mkdtemp(prefix='sim_')
+    os.environ['EXCHANGE_ID'] = 'sim'
+    os.environ['FEED_MODE'] = 'rest'
+    os.environ['LOG_FILE'] = os.path.join(workdir, 'bot.log')
+    os.environ['MODEL_PATH'] = os.path.abspath(args.model or MODEL_PATH) if (args.model or MODEL_PATH) else ''
+    os.environ['MODEL_DIR'] = os.path.abspath(MODEL_DIR)
+    for name in ('POSITIVE_CSV', 'NEGATIVE_CSV', 'SELECTED_CSV'):
+        os.environ[name] = os.path.join(workdir, f'{name.lower()}.csv')
+    SimMarket._shared = SimMarket(args.symbols, args.positions, latency_ms=args.latency_ms,
+                                  rate_limit=args.rate_limit)
+    symbols = pd.DataFrame({'symbol': SimMarket._shared.symbols,
+                            'retrieval_time': pd.Timestamp.now('UTC').isoformat()})
+    symbols.to_csv(os.environ['POSITIVE_CSV'], index=False)
+    symbols.iloc[:0].to_csv(os.environ['NEGATIVE_CSV'], index=False)
+    symbols.to_csv(os.environ['SELECTED_CSV'], index=False)
+    os.chdir(workdir)
+    print(f"sim: working directory {workdir}", flush=True)
+
+    # The overrides above must be visible to the bot's modules, which read
+    # config_setup at import time
+    importlib.reload(importlib.import_module('config_setup'))
+    stats = asyncio.run(load_test(args.duration, args.report))
+    for key, value in stats.items():
+        print(f'{key}: {value}')
+
+
+if __name__ == '__main__':
+    # Run the importable module, so exchange_setup shares this SimMarket
+    from sim_exchange import main
+    main()
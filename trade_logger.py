@@ -1,141 +1,190 @@
 ##File: trade_logger.py
 
+import asyncio
 import csv
 import os
 import json
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import pandas as pd
 import ccxt  # for exception handling
+from config_setup import (
+    TRADE_STORE, TRADE_DB,
+    RECONCILE_CONCURRENCY, RECONCILE_ACCOUNT_WIDE, RECONCILE_OVERLAP
+)
+from trade_store import CSVTradeStore, SQLiteTradeStore
 
 filename = 'logs/trades.csv'
 sl_tp_log = 'logs/sl_tp_updates.csv'
 
 class TradeLogger:
-    def __init__(self, exchange):
+    def __init__(self, exchange, initial_balance=None, store=TRADE_STORE):
         self.filename = filename
         self.sl_tp_log = sl_tp_log
         self.exchange = exchange
         self.config_file = 'balance_config.json'
         self._create_files()
-        self.initial_balance = self._initialize_balance()
+        if store == 'csv':
+            self.store = CSVTradeStore(self.filename, self.sl_tp_log)
+        else:
+            self.store = SQLiteTradeStore(TRADE_DB, self.filename, self.sl_tp_log)
+        self.initial_balance = self._initialize_balance(initial_balance)
         self.last_reconcile = None
 
     def _create_files(self):
         os.makedirs(os.path.dirname(self.filename), exist_ok=True)
-        if not os.path.exists(self.filename):
-            with open(self.filename, 'w', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow([
-                    'order_id', 'entry_time', 'exit_time', 'symbol', 'side', 'size',
-                    'entry_price', 'exit_price', 'pnl', 'duration',
-                    'atr', 'rr_ratio', 'confidence', 'close_type'
-                ])
-        if not os.path.exists(self.sl_tp_log):
-            with open(self.sl_tp_log, 'w', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow([
-                    'order_id', 'timestamp', 'old_sl', 'new_sl', 'old_tp', 'new_tp'
-                ])
         if not os.path.exists('cash_flows.csv'):
             with open('cash_flows.csv', 'w', newline='') as f:
                 writer = csv.writer(f)
                 writer.writerow(['timestamp', 'type', 'amount'])
 
-    def _initialize_balance(self):
+    def _initialize_balance(self, balance=None):
+        '''Load the recorded starting balance, recording it on first run.
+
+        Callers holding an async exchange pass `balance` in; otherwise it is
+        fetched through the (synchronous) exchange.
+        '''
         if os.path.exists(self.config_file):
             with open(self.config_file) as f:
                 return json.load(f)['initial_balance']
-        balance = self.exchange.fetch_balance()['USDT']['total']
+        if balance is None:
+            balance = self.exchange.fetch_balance()['USDT']['total']
         with open(self.config_file, 'w') as f:
             json.dump({'initial_balance': balance}, f)
         return balance
 
     def log_trade(self, order_id, **kwargs):
         '''Log a new trade entry with the exchange order ID.'''
-        with open(self.filename, 'a', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow([
-                order_id,
-                kwargs.get('entry_time', datetime.utcnow().isoformat()),
-                '',  # exit_time
-                kwargs['symbol'],
-                kwargs['side'],
-                kwargs['size'],
-                kwargs['entry_price'],
-                '',  # exit_price
-                '',  # pnl
-                '',  # duration
-                kwargs['atr'],
-                '',  # rr_ratio
-                kwargs['confidence'],
-                ''   # close_type
-            ])
+        self.store.add_trade({
+            'order_id': order_id,
+            'entry_time': kwargs.get('entry_time', datetime.utcnow().isoformat()),
+            'symbol': kwargs['symbol'],
+            'side': kwargs['side'],
+            'size': kwargs['size'],
+            'entry_price': kwargs['entry_price'],
+            'atr': kwargs['atr'],
+            'confidence': kwargs['confidence'],
+            'ack_latency': kwargs.get('ack_latency'),
+        })
 
     def update_trade_exit(self, order_id, exit_price, close_type='manual'):
-        df = pd.read_csv(self.filename)
-        mask = (df['order_id'] == order_id) & (df['exit_time'].isna())
-        if not mask.any():
+        trade = self.store.open_trade(order_id)
+        if trade is None:
             return False
-        idx = df[mask].index[0]
-        entry_time = datetime.fromisoformat(df.at[idx, 'entry_time'])
-        entry_price = df.at[idx, 'entry_price']
-        size = df.at[idx, 'size']
-        side = df.at[idx, 'side']
+        entry_time = datetime.fromisoformat(trade['entry_time'])
+        entry_price = float(trade['entry_price'])
+        size = float(trade['size'])
+        side = trade['side']
         pnl = size * (exit_price - entry_price) * (1 if side == 'buy' else -1)
         duration = (datetime.utcnow() - entry_time).total_seconds() / 3600
-        rr = abs(pnl) / (df.at[idx, 'atr'] * size)
-        df.at[idx, 'exit_time'] = datetime.utcnow().isoformat()
-        df.at[idx, 'exit_price'] = exit_price
-        df.at[idx, 'pnl'] = pnl
-        df.at[idx, 'duration'] = duration
-        df.at[idx, 'rr_ratio'] = rr
-        df.at[idx, 'close_type'] = close_type
-        df.to_csv(self.filename, index=False)
-        return True
+        rr = abs(pnl) / (float(trade['atr']) * size)
+        return self.store.close_trade(order_id, {
+            'exit_time': datetime.utcnow().isoformat(),
+            'exit_price': exit_price,
+            'pnl': pnl,
+            'duration': duration,
+            'rr_ratio': rr,
+            'close_type': close_type,
+        })
 
     def log_sl_tp_update(self, order_id, old_sl, new_sl, old_tp, new_tp):
         '''Log each SL/TP update for later auditing.'''
-        with open(self.sl_tp_log, 'a', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow([
-                order_id,
-                datetime.utcnow().isoformat(),
-                old_sl,
-                new_sl,
-                old_tp,
-                new_tp
-            ])
-
-    def reconcile_closed_orders(self):
-        '''Fetch closed orders from exchange and reconcile recent closures only.'''
-        if self.last_reconcile is None:
-            since = (datetime.utcnow() - timedelta(days=30)).timestamp() * 1000
-        else:
-            since = self.last_reconcile
-        symbols = set(pd.read_csv(self.filename)['symbol'])
-        for symbol in symbols:
+        self.store.add_sl_tp_update({
+            'order_id': order_id,
+            'timestamp': datetime.utcnow().isoformat(),
+            'old_sl': old_sl,
+            'new_sl': new_sl,
+            'old_tp': old_tp,
+            'new_tp': new_tp,
+        })
+
+    def _reconcile_since(self, symbol):
+        '''Persisted cursor for a symbol, else the entry time of its oldest open trade.'''
+        since = self.store.reconcile_cursor(symbol)
+        if since is not None:
+            return int(since)
+        entry_time = self.store.first_open_entry(symbol)
+        try:
+            entry = datetime.fromisoformat(str(entry_time)).replace(tzinfo=timezone.utc)
+        except ValueError:
+            entry = datetime.now(timezone.utc) - timedelta(days=30)
+        return int(entry.timestamp() * 1000) - RECONCILE_OVERLAP * 1000
+
+    async def _fetch_closed(self, symbols, since, limit):
+        '''Closed orders per symbol; a symbol maps to None if its fetch failed.'''
+        if RECONCILE_ACCOUNT_WIDE and self.exchange.has.get('fetchClosedOrders'):
             try:
-                orders = self.exchange.fetch_closed_orders(symbol, since=int(since), limit=100)
-                for order in orders:
-                    exit_price=order.get('average')
-                    print('exit_price', exit_price, type(exit_price))
-                    if order['status'] == 'closed':
-                        self.update_trade_exit(
-                            order_id=order['id'],
-                            exit_price=order.get('average'),
-                            close_type=order['info'].get('type', 'sl_tp')
-                        )
+                orders = await self.exchange.fetch_closed_orders(
+                    None, since=min(since.values()), limit=limit)
             except ccxt.BaseError:
-                continue
-        self.last_reconcile = datetime.utcnow().timestamp() * 1000
+                orders = None  # not supported without a symbol here; go per symbol
+            if orders is not None:
+                by_symbol = {s: [] for s in symbols}
+                for order in orders:
+                    for key in (order.get('symbol'), order['info'].get('symbol')):
+                        if key in by_symbol:
+                            by_symbol[key].append(order)
+                            break
+                # One page for the whole account: if it was full, every symbol
+                # may have more, so the page decides the cursor for all of them
+                return {s: orders if len(orders) >= limit else by_symbol[s] for s in symbols}
+
+        sem = asyncio.Semaphore(RECONCILE_CONCURRENCY)
+
+        async def fetch(symbol):
+            async with sem:
+                try:
+                    return await self.exchange.fetch_closed_orders(symbol, since=since[symbol], limit=limit)
+                except ccxt.BaseError:
+                    return None
+        results = await asyncio.gather(*(fetch(s) for s in symbols))
+        return dict(zip(symbols, results))
+
+    async def reconcile_closed_orders(self, limit=100):
+        '''
+        Reconcile exits for symbols that still have open trades.
+
+        Each symbol keeps a cursor (persisted in the trade store) of how far
+        its closed orders have been read, so restarts resume where they left
+        off and symbols with no open trades are never queried.
+        '''
+        started = int(datetime.now(timezone.utc).timestamp() * 1000)
+        symbols = sorted(self.store.open_symbols())
+        if not symbols:
+            self.last_reconcile = started
+            return
+        since = {s: self._reconcile_since(s) for s in symbols}
+        fetched = await self._fetch_closed(symbols, since, limit)
+
+        cursors = {}
+        for symbol, orders in fetched.items():
+            if orders is None:
+                continue  # keep the old cursor and retry next round
+            for order in orders:
+                if order.get('symbol') not in (symbol, None) and order['info'].get('symbol') != symbol:
+                    continue
+                if order['status'] == 'closed':
+                    self.update_trade_exit(
+                        order_id=order['id'],
+                        exit_price=order.get('average'),
+                        close_type=order['info'].get('type', 'sl_tp')
+                    )
+            cursor = started - RECONCILE_OVERLAP * 1000
+            if len(orders) >= limit:
+                # Full page: only advance as far as what was actually read
+                cursor = min(cursor, max(o.get('lastTradeTimestamp') or o.get('timestamp') or 0 for o in orders))
+            cursors[symbol] = max(cursor, since[symbol])
+        if cursors:
+            self.store.set_reconcile_cursors(cursors)
+        self.last_reconcile = started
 
     def get_open_trade_by_symbol(self, symbol):
         '''Fetch the most recent open trade for a symbol.'''
-        df = pd.read_csv(self.filename)
-        open_trades = df[(df['symbol'] == symbol) & (df['exit_time'].isna())]
-        if not open_trades.empty:
-            return open_trades.iloc[-1].to_dict()
-        return None
+        return self.store.open_trade_by_symbol(symbol)
+
+    def export_csv(self, path=None):
+        '''Write the full trade history as CSV (the sqlite store's export path).'''
+        if isinstance(self.store, SQLiteTradeStore):
+            self.store.export_csv(path or self.filename)
 
     def calculate_performance(self, start_time=None, end_time=None):
         """
@@ -148,7 +197,7 @@ class TradeLogger:
             dict: win_rate, max_drawdown, profit_factor, sharpe_ratio
         """
         # Load trades
-        trades = pd.read_csv(self.filename, parse_dates=['entry_time', 'exit_time'])
+        trades = self.store.trades_frame()
         # Filter by dates
         if start_time:
             start = pd.to_datetime(start_time)
@@ -157,26 +206,31 @@ class TradeLogger:
             end = pd.to_datetime(end_time)
             trades = trades[trades['entry_time'] <= end]
 
-        if trades.empty:
-            return {'win_rate': None, 'max_drawdown': None,
-                    'profit_factor': None, 'sharpe_ratio': None}
-
-        trades['pnl'] = trades['pnl'].fillna(0)
-        trades['cum_pnl'] = trades['pnl'].cumsum()
-        equity = self.initial_balance + trades['cum_pnl']
-
-        # Compute drawdown
-        peak = equity.cummax()
-        drawdown = (peak - equity) / peak
-
-        # Performance metrics
-        wins = trades[trades['pnl'] > 0]['pnl'].sum()
-        losses = abs(trades[trades['pnl'] < 0]['pnl'].sum())
-
-        return {
-            'win_rate': len(trades[trades['pnl'] > 0]) / len(trades),
-            'max_drawdown': drawdown.max(),
-            'profit_factor': wins / losses if losses > 0 else None,
-            'sharpe_ratio': trades['pnl'].mean() / trades['pnl'].std() if trades['pnl'].std() else None
-        }
+        return performance(trades, self.initial_balance)
+
+def performance(trades, initial_balance):
+    '''win_rate, max_drawdown, profit_factor and sharpe_ratio of a trades frame.'''
+    if trades.empty:
+        return {'win_rate': None, 'max_drawdown': None,
+                'profit_factor': None, 'sharpe_ratio': None}
+
+    trades = trades.copy()
+    trades['pnl'] = trades['pnl'].fillna(0)
+    trades['cum_pnl'] = trades['pnl'].cumsum()
+    equity = initial_balance + trades['cum_pnl']
+
+    # Compute drawdown
+    peak = equity.cummax()
+    drawdown = (peak - equity) / peak
+
+    # Performance metrics
+    wins = trades[trades['pnl'] > 0]['pnl'].sum()
+    losses = abs(trades[trades['pnl'] < 0]['pnl'].sum())
+
+    return {
+        'win_rate': len(trades[trades['pnl'] > 0]) / len(trades),
+        'max_drawdown': drawdown.max(),
+        'profit_factor': wins / losses if losses > 0 else None,
+        'sharpe_ratio': trades['pnl'].mean() / trades['pnl'].std() if trades['pnl'].std() else None
+    }
 
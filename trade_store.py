@@ -0,0 +1,281 @@
+## File: trade_store.py
+
+import csv
+import json
+import os
+import sqlite3
+import sys
+import threading
+import pandas as pd
+
+TRADE_COLUMNS = [
+    'order_id', 'entry_time', 'exit_time', 'symbol', 'side', 'size',
+    'entry_price', 'exit_price', 'pnl', 'duration',
+    'atr', 'rr_ratio', 'confidence', 'close_type',
+    'ack_latency'  # seconds from signal to the exchange acknowledging the entry
+]
+SL_TP_COLUMNS = ['order_id', 'timestamp', 'old_sl', 'new_sl', 'old_tp', 'new_tp']
+
+
+class CSVTradeStore:
+    """The original flat-file layout: every exit rewrites the whole CSV."""
+
+    def __init__(self, filename, sl_tp_log):
+        self.filename = filename
+        self.sl_tp_log = sl_tp_log
+        self.cursor_file = os.path.join(os.path.dirname(filename), 'reconcile_cursors.json')
+        os.makedirs(os.path.dirname(self.filename), exist_ok=True)
+        for path, columns in ((filename, TRADE_COLUMNS), (sl_tp_log, SL_TP_COLUMNS)):
+            if not os.path.exists(path):
+                with open(path, 'w', newline='') as f:
+                    csv.writer(f).writerow(columns)
+            else:
+                self._migrate(path, columns)
+
+    @staticmethod
+    def _migrate(path, columns):
+        """Rewrite a file written before a column was added in the current layout."""
+        with open(path, newline='') as f:
+            header = next(csv.reader(f), [])
+        if header != columns:
+            pd.read_csv(path, dtype={'order_id': str}).reindex(columns=columns).to_csv(path, index=False)
+
+    def add_trade(self, row):
+        with open(self.filename, 'a', newline='') as f:
+            csv.writer(f).writerow([row.get(c, '') for c in TRADE_COLUMNS])
+
+    def _open_rows(self, df):
+        return df[df['exit_time'].isna()]
+
+    def open_trade(self, order_id):
+        df = pd.read_csv(self.filename)
+        rows = self._open_rows(df)
+        rows = rows[rows['order_id'].astype(str) == str(order_id)]
+        return rows.iloc[0].to_dict() if not rows.empty else None
+
+    def open_trade_by_symbol(self, symbol):
+        df = pd.read_csv(self.filename)
+        rows = self._open_rows(df)
+        rows = rows[rows['symbol'] == symbol]
+        return rows.iloc[-1].to_dict() if not rows.empty else None
+
+    def close_trade(self, order_id, updates):
+        df = pd.read_csv(self.filename)
+        mask = (df['order_id'].astype(str) == str(order_id)) & (df['exit_time'].isna())
+        if not mask.any():
+            return False
+        idx = df[mask].index[0]
+        for col, value in updates.items():
+            df[col] = df[col].astype(object)
+            df.at[idx, col] = value
+        df.to_csv(self.filename, index=False)
+        return True
+
+    def symbols(self):
+        return set(pd.read_csv(self.filename)['symbol'])
+
+    def open_symbols(self):
+        return set(self._open_rows(pd.read_csv(self.filename))['symbol'])
+
+    def first_open_entry(self, symbol):
+        rows = self._open_rows(pd.read_csv(self.filename))
+        rows = rows[rows['symbol'] == symbol]
+        return rows.iloc[0]['entry_time'] if not rows.empty else None
+
+    def _cursors(self):
+        if not os.path.exists(self.cursor_file):
+            return {}
+        with open(self.cursor_file) as f:
+            return json.load(f)
+
+    def reconcile_cursor(self, symbol):
+        return self._cursors().get(symbol)
+
+    def set_reconcile_cursors(self, cursors):
+        merged = self._cursors()
+        merged.update(cursors)
+        with open(self.cursor_file, 'w') as f:
+            json.dump(merged, f)
+
+    def add_sl_tp_update(self, row):
+        with open(self.sl_tp_log, 'a', newline='') as f:
+            csv.writer(f).writerow([row[c] for c in SL_TP_COLUMNS])
+
+    def trades_frame(self):
+        return pd.read_csv(self.filename, parse_dates=['entry_time', 'exit_time'])
+
+
+class SQLiteTradeStore:
+    """
+    Trades in SQLite (WAL mode), indexed by order_id and symbol.
+
+    Open trades are also held in memory, so the per-update lookups the
+    position loop makes never touch disk, and an exit is a single indexed
+    UPDATE instead of a rewrite of the full history. An existing trades CSV
+    is imported the first time the database is created.
+    """
+
+    def __init__(self, path, csv_filename=None, csv_sl_tp_log=None):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._create_schema()
+        self._import_csv(csv_filename, csv_sl_tp_log)
+        self._open = {}            # order_id -> row
+        self._open_by_symbol = {}  # symbol -> [order_id, ...] in entry order
+        for row in self._conn.execute(
+                'SELECT * FROM trades WHERE exit_time IS NULL ORDER BY id'):
+            self._index(self._row(row))
+
+    def _create_schema(self):
+        with self._conn:
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS trades (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    order_id TEXT, entry_time TEXT, exit_time TEXT,
+                    symbol TEXT, side TEXT, size REAL,
+                    entry_price REAL, exit_price REAL, pnl REAL, duration REAL,
+                    atr REAL, rr_ratio REAL, confidence REAL, close_type TEXT,
+                    ack_latency REAL
+                )''')
+            # Databases created before a column existed get it added
+            existing = {r[1] for r in self._conn.execute('PRAGMA table_info(trades)')}
+            if 'ack_latency' not in existing:
+                self._conn.execute('ALTER TABLE trades ADD COLUMN ack_latency REAL')
+            self._conn.execute(
+                'CREATE INDEX IF NOT EXISTS idx_trades_order_id ON trades(order_id)')
+            self._conn.execute(
+                'CREATE INDEX IF NOT EXISTS idx_trades_symbol ON trades(symbol, exit_time)')
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS sl_tp_updates (
+                    order_id TEXT, timestamp TEXT,
+                    old_sl REAL, new_sl REAL, old_tp REAL, new_tp REAL
+                )''')
+            self._conn.execute(
+                'CREATE INDEX IF NOT EXISTS idx_sl_tp_order_id ON sl_tp_updates(order_id)')
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS reconcile_cursors (
+                    symbol TEXT PRIMARY KEY, since INTEGER
+                )''')
+
+    def _import_csv(self, csv_filename, csv_sl_tp_log):
+        if self._conn.execute('SELECT COUNT(*) FROM trades').fetchone()[0]:
+            return
+        for path, table, columns in ((csv_filename, 'trades', TRADE_COLUMNS),
+                                     (csv_sl_tp_log, 'sl_tp_updates', SL_TP_COLUMNS)):
+            if not path or not os.path.exists(path):
+                continue
+            df = pd.read_csv(path, dtype={'order_id': str})
+            if df.empty:
+                continue
+            df = df.reindex(columns=columns)
+            df = df.astype(object).where(df.notna(), None)
+            placeholders = ', '.join('?' * len(columns))
+            with self._conn:
+                self._conn.executemany(
+                    f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})",
+                    df.itertuples(index=False, name=None))
+
+    @staticmethod
+    def _row(row):
+        return {c: row[c] for c in TRADE_COLUMNS}
+
+    def _index(self, row):
+        self._open[row['order_id']] = row
+        self._open_by_symbol.setdefault(row['symbol'], []).append(row['order_id'])
+
+    def _unindex(self, order_id):
+        row = self._open.pop(order_id, None)
+        if row is not None:
+            ids = self._open_by_symbol.get(row['symbol'], [])
+            if order_id in ids:
+                ids.remove(order_id)
+            if not ids:
+                self._open_by_symbol.pop(row['symbol'], None)
+
+    def add_trade(self, row):
+        row = {c: row.get(c) for c in TRADE_COLUMNS}
+        row['order_id'] = str(row['order_id'])
+        placeholders = ', '.join('?' * len(TRADE_COLUMNS))
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT INTO trades ({', '.join(TRADE_COLUMNS)}) VALUES ({placeholders})",
+                [row[c] for c in TRADE_COLUMNS])
+            self._index(row)
+
+    def open_trade(self, order_id):
+        row = self._open.get(str(order_id))
+        return dict(row) if row else None
+
+    def open_trade_by_symbol(self, symbol):
+        ids = self._open_by_symbol.get(symbol)
+        return dict(self._open[ids[-1]]) if ids else None
+
+    def close_trade(self, order_id, updates):
+        order_id = str(order_id)
+        if order_id not in self._open:
+            return False
+        assignments = ', '.join(f'{col} = ?' for col in updates)
+        with self._lock, self._conn:
+            self._conn.execute(
+                f'UPDATE trades SET {assignments} WHERE id = ('
+                'SELECT id FROM trades WHERE order_id = ? AND exit_time IS NULL '
+                'ORDER BY id LIMIT 1)',
+                [*updates.values(), order_id])
+            self._unindex(order_id)
+        return True
+
+    def symbols(self):
+        return {r[0] for r in self._conn.execute('SELECT DISTINCT symbol FROM trades')}
+
+    def open_symbols(self):
+        return set(self._open_by_symbol)
+
+    def first_open_entry(self, symbol):
+        ids = self._open_by_symbol.get(symbol)
+        return self._open[ids[0]]['entry_time'] if ids else None
+
+    def reconcile_cursor(self, symbol):
+        row = self._conn.execute(
+            'SELECT since FROM reconcile_cursors WHERE symbol = ?', (symbol,)).fetchone()
+        return row[0] if row else None
+
+    def set_reconcile_cursors(self, cursors):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT INTO reconcile_cursors (symbol, since) VALUES (?, ?) '
+                'ON CONFLICT(symbol) DO UPDATE SET since = excluded.since',
+                cursors.items())
+
+    def add_sl_tp_update(self, row):
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT INTO sl_tp_updates ({', '.join(SL_TP_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?)",
+                [row[c] for c in SL_TP_COLUMNS])
+
+    def trades_frame(self):
+        return pd.read_sql_query(
+            f"SELECT {', '.join(TRADE_COLUMNS)} FROM trades ORDER BY id",
+            self._conn, parse_dates=['entry_time', 'exit_time'])
+
+    def export_csv(self, filename, sl_tp_log=None):
+        """Write the trade history (and optionally SL/TP updates) as CSV."""
+        pd.read_sql_query(
+            f"SELECT {', '.join(TRADE_COLUMNS)} FROM trades ORDER BY id", self._conn
+        ).to_csv(filename, index=False)
+        if sl_tp_log:
+            pd.read_sql_query(
+                f"SELECT {', '.join(SL_TP_COLUMNS)} FROM sl_tp_updates", self._conn
+            ).to_csv(sl_tp_log, index=False)
+
+
+if __name__ == '__main__':
+    from config_setup import TRADE_DB
+    if len(sys.argv) not in (2, 3):
+        print('[USAGE]: trade_store.py <trades.csv> [sl_tp_updates.csv]')
+    else:
+        SQLiteTradeStore(TRADE_DB).export_csv(*sys.argv[1:])